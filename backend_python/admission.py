@@ -0,0 +1,140 @@
+import functools
+import math
+import os
+import threading
+import time
+from flask import request
+from werkzeug.exceptions import TooManyRequests
+import metrics
+
+# --- KONFIGURASI ADMISSION CONTROL ---
+# Endpoint tulis (kirim transaksi ke node) dibatasi per kelas & per wallet supaya lonjakan donasi tidak
+# menghabiskan thread worker: request lain menunggu di antrean terbatas, sisanya langsung ditolak 429
+# dengan Retry-After. Batas berlaku per proses (per worker gunicorn).
+# Format ADMISSION_LIMITS: "kelas=slot,...", kelas yang tidak disebut memakai DEFAULT_CONCURRENCY
+DEFAULT_LIMITS = {'donate': 3, 'campaign': 1, 'withdraw': 1, 'moderation': 1}
+DEFAULT_CONCURRENCY = 1
+QUEUE_SIZE = int(os.environ.get('ADMISSION_QUEUE', '4'))                  # Total request yang boleh menunggu
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '2'))     # Detik maksimal menunggu slot
+WALLET_CONCURRENCY = int(os.environ.get('ADMISSION_WALLET', '1'))         # Request tulis bersamaan per wallet
+EWMA_ALPHA = 0.2   # Bobot durasi terbaru untuk estimasi Retry-After
+
+
+def parse_limits(value):
+    limits = dict(DEFAULT_LIMITS)
+    for part in (value or '').split(','):
+        name, _, slots = part.partition('=')
+        if name.strip() and slots.strip().isdigit():
+            limits[name.strip()] = max(int(slots), 1)
+    return limits
+
+LIMITS = parse_limits(os.environ.get('ADMISSION_LIMITS'))
+
+
+class Overloaded(TooManyRequests):
+    """429 dari admission controller; `reason` = wallet | queue_full | timeout."""
+
+    def __init__(self, endpoint_class, reason, retry_after):
+        super().__init__(retry_after=retry_after)
+        self.endpoint_class = endpoint_class
+        self.reason = reason
+
+
+class AdmissionController:
+    """Semaphore per kelas endpoint + per wallet dengan satu antrean tunggu terbatas.
+
+    Wallet yang sudah punya request tulis berjalan/menunggu langsung ditolak (klik ganda / skrip tidak
+    ikut mengantre). Jika slot kelasnya penuh, request menunggu paling lama `queue_timeout` selama
+    antrean belum penuh; di luar itu langsung 429.
+    """
+
+    def __init__(self, limits=LIMITS, queue_size=QUEUE_SIZE, queue_timeout=QUEUE_TIMEOUT, wallet_limit=WALLET_CONCURRENCY):
+        self.limits = dict(limits)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.wallet_limit = wallet_limit
+        self._cond = threading.Condition()
+        self._active = {}     # kelas -> slot terpakai
+        self._waiting = {}    # kelas -> request di antrean
+        self._wallets = {}    # wallet -> request tulis berjalan / menunggu
+        self._service = {}    # kelas -> rata-rata (EWMA) lama slot dipakai, detik
+
+    def _limit(self, endpoint_class):
+        return self.limits.get(endpoint_class, DEFAULT_CONCURRENCY)
+
+    def _free(self, endpoint_class):
+        return self._active.get(endpoint_class, 0) < self._limit(endpoint_class)
+
+    def _leave(self, wallet):
+        if wallet is not None:
+            self._wallets[wallet] -= 1
+            if not self._wallets[wallet]:
+                del self._wallets[wallet]
+
+    def retry_after(self, endpoint_class):
+        # Perkiraan waktu sampai antrean kelas ini kosong, minimal 1 detik
+        backlog = self._waiting.get(endpoint_class, 0) + 1
+        return max(1, math.ceil(self._service.get(endpoint_class, 1.0) * backlog / self._limit(endpoint_class)))
+
+    def _reject(self, endpoint_class, reason):
+        metrics.ADMISSION_REJECTED.inc((endpoint_class, reason))
+        raise Overloaded(endpoint_class, reason, self.retry_after(endpoint_class))
+
+    # --- SLOT ---
+    def acquire(self, endpoint_class, wallet=None):
+        start = time.monotonic()
+        with self._cond:
+            # Slot wallet dihitung sejak masuk antrean: wallet yang sama tidak bisa mengantre dua kali
+            if wallet is not None and self._wallets.get(wallet, 0) >= self.wallet_limit:
+                self._reject(endpoint_class, 'wallet')
+            if not self._free(endpoint_class) and sum(self._waiting.values()) >= self.queue_size:
+                self._reject(endpoint_class, 'queue_full')
+            if wallet is not None:
+                self._wallets[wallet] = self._wallets.get(wallet, 0) + 1
+            if not self._free(endpoint_class):
+                self._waiting[endpoint_class] = self._waiting.get(endpoint_class, 0) + 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self._free(endpoint_class), self.queue_timeout)
+                finally:
+                    self._waiting[endpoint_class] -= 1
+                if not admitted:
+                    self._leave(wallet)
+                    self._reject(endpoint_class, 'timeout')
+            self._active[endpoint_class] = self._active.get(endpoint_class, 0) + 1
+        metrics.ADMISSION_WAIT.observe((endpoint_class,), time.monotonic() - start)
+        return time.monotonic()
+
+    def release(self, endpoint_class, wallet=None, started=None):
+        with self._cond:
+            self._active[endpoint_class] -= 1
+            self._leave(wallet)
+            if started is not None:
+                held = time.monotonic() - started
+                self._service[endpoint_class] = held if endpoint_class not in self._service else \
+                    (1 - EWMA_ALPHA) * self._service[endpoint_class] + EWMA_ALPHA * held
+            self._cond.notify_all()
+
+    def guard(self, endpoint_class, wallet_fn=None, methods=None):
+        """Decorator view: request memakai satu slot kelas (dan wallet dari wallet_fn) selama view berjalan.
+
+        `methods` membatasi method yang dijaga (mis. hanya POST; GET form tetap bebas).
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if methods and request.method not in methods:
+                    return view(*args, **kwargs)
+                wallet = wallet_fn() if wallet_fn else None
+                started = self.acquire(endpoint_class, wallet)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    self.release(endpoint_class, wallet, started)
+            return wrapper
+        return decorator
+
+    # --- METRIK ---
+    def snapshot(self):
+        with self._cond:
+            return {name: {'active': self._active.get(name, 0), 'waiting': self._waiting.get(name, 0), 'limit': limit}
+                    for name, limit in sorted(self.limits.items())}
@@ -1,228 +1,252 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, abort, send_file
 from web3 import Web3
+import requests
 import sqlite3
 import os
+import db
+import hashlib
+import rollups
+import search_index
+import export
+import assets
+import fragment_cache
+import metrics
+from fragment_cache import LazyRows
 import time
 from datetime import datetime, timedelta
-import feedparser
-from time import mktime
+from decimal import Decimal, InvalidOperation
 
 # --- KONFIGURASI ---
 app = Flask(__name__)
 app.secret_key = 'rahasia_donasi_blockchain'
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
+app.config['MEDIA_FOLDER'] = os.path.abspath(os.path.join(app.config['UPLOAD_FOLDER'], 'media'))
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+MEDIA_MAX_AGE = 31536000   # Varian gambar bersifat immutable (URL = hash isi)
+
+# Metrik RPC/SQL/route/template di /metrics (format Prometheus); header X-Debug-Calls lewat env METRICS_DEBUG_HEADER=1
+metrics.init_app(app)
+
+# Aset statis ber-fingerprint (static/dist + manifest, dibangun ulang jika ada file yang berubah)
+assets.init_app(app)
+
+# Fragment cache template ({% cache %}), backend memory/disk lewat env FRAGMENT_CACHE
+fragments = fragment_cache.init_app(app)
+DASHBOARD_PAGE_SIZE = 12
+ADMIN_PAGE_SIZE = 50
+ADMIN_HISTORY_LIMIT = 200   # Audit Log di halaman admin; riwayat lengkap lewat /admin/export
+MAX_PAGE_SIZE = 100
+API_PAGE_SIZE = 20
 
 # Import Contract Data
 try:
-    from contract_data import contract, web3
+    from contract_data import contract, web3, ContractUnavailable
 except ImportError:
     contract = None
     web3 = None
+    ContractUnavailable = ConnectionError
     print("Warning: contract_data.py tidak ditemukan. Fitur blockchain tidak aktif.")
+# Node tidak bisa dihubungi: registry belum bisa me-resolve kontrak, atau node mati setelah kontrak ter-resolve
+NODE_ERRORS = (ContractUnavailable, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+if web3: metrics.instrument_web3(web3)
+
+from indexer import EventIndexer
+from campaign_loader import CampaignLoader, STATUS_MASK_ALL
+from read_model import CampaignReadModel
+from chain_status import ChainStatus
+from user_resolver import UsernameResolver, UNKNOWN_USER
+from news_service import NewsService
+from tx_pipeline import TxPipeline
+from moderation import BulkModerator
+from images import ImageStore, InvalidImage, VARIANTS, is_key
+from live_feed import EventBroker
+from cache_bus import InvalidationBus
+from admission import AdmissionController
+
+chain_status = ChainStatus(web3)
 
 # --- 1. CONTEXT PROCESSOR ---
 @app.context_processor
 def inject_blockchain_status():
-    status = {
-        'connected': False,
-        'user_balance': '0.0000',
-        'gas_price': '0',
-        'block_number': '0'
-    }
-    try:
-        if web3 and web3.is_connected():
-            status['connected'] = True
-            status['block_number'] = web3.eth.block_number
-            gas_wei = web3.eth.gas_price
-            status['gas_price'] = "{:.1f}".format(web3.from_wei(gas_wei, 'gwei'))
-            
-            if 'wallet' in session:
-                try:
-                    bal_wei = web3.eth.get_balance(session['wallet'])
-                    bal_eth = web3.from_wei(bal_wei, 'ether')
-                    status['user_balance'] = "{:.4f}".format(float(bal_eth))
-                except:
-                    status['user_balance'] = "Err"
-    except Exception as e:
-        pass
-    return dict(bc_stat=status)
+    # Status node di-cache (TTL + circuit breaker), bukan 3-4 RPC per render
+    return dict(bc_stat=chain_status.snapshot(session.get('wallet')))
+
+@app.template_global()
+def image_url(name, variant='card'):
+    # Upload baru disimpan per hash isi (/media/...), upload lama masih di static/uploads
+    if is_key(name): return url_for('media', key=name, variant=variant)
+    return url_for('static', filename='uploads/' + (name if name else 'default_user.png'))
 
 # --- 2. DATABASE SETUP ---
-def init_db():
-    if not os.path.exists('instance'):
-        os.makedirs('instance')
-        
-    conn = sqlite3.connect('instance/users.db')
-    c = conn.cursor()
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS users 
-                 (id INTEGER PRIMARY KEY, 
-                  username TEXT, email TEXT, password TEXT, role TEXT, 
-                  wallet_address TEXT, private_key TEXT,
-                  profile_pic TEXT, bio TEXT, last_username_change TEXT)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS campaign_details 
-                 (id INTEGER PRIMARY KEY, 
-                  blockchain_id INTEGER, 
-                  category TEXT, 
-                  usage_plan TEXT, 
-                  social_link TEXT,
-                  tagline TEXT)''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS campaign_updates 
-                 (id INTEGER PRIMARY KEY, blockchain_id INTEGER, 
-                  title TEXT, content TEXT, image TEXT, created_at TEXT)''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS donations 
-                 (id INTEGER PRIMARY KEY, blockchain_id INTEGER, 
-                  donor_name TEXT, amount REAL, message TEXT, timestamp TEXT)''')
-    
-    c.execute("SELECT * FROM users WHERE role='admin'")
-    if not c.fetchone():
+# Skema & migrasi ada di db.py (versi dicek lewat PRAGMA user_version)
+db.init_app(app)
+
+def seed_admin():
+    conn = db.connect()
+    if not conn.execute("SELECT 1 FROM users WHERE role='admin'").fetchone():
         try:
             admin_wallet = web3.eth.accounts[0] if web3 and web3.is_connected() else "0x0000000000000000000000000000000000000000"
         except:
             admin_wallet = "0x0000000000000000000000000000000000000000"
             
-        c.execute("INSERT INTO users (username, email, password, role, wallet_address, private_key, profile_pic) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                  ('SuperAdmin', 'admin@donasi.com', 'admin123', 'admin', admin_wallet, 'ADMIN_KEY', 'default_user.png'))
-    
-    conn.commit()
+        conn.execute("INSERT INTO users (username, email, password, role, wallet_address, private_key, profile_pic) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     ('SuperAdmin', 'admin@donasi.com', 'admin123', 'admin', admin_wallet, 'ADMIN_KEY', 'default_user.png'))
+        conn.commit()
     conn.close()
 
-init_db()
+db.ensure_schema()
+seed_admin()
+
+# Loader Kampanye (JSON-RPC batch, dipakai dashboard, admin & indeks pencarian)
+campaign_loader = CampaignLoader(web3, contract) if contract else None
+
+# Indexer Event Blockchain (Background Thread, dijalankan saat request pertama)
+indexer = EventIndexer(web3, contract, loader=campaign_loader) if contract else None
+
+# Read Model Kampanye (cache hasil decode, di-refresh hanya oleh event baru)
+read_model = CampaignReadModel(campaign_loader) if contract else None
+
+# Pipeline Transaksi (kirim lalu pantau receipt di background)
+tx_pipeline = TxPipeline(web3, gas_price_fn=chain_status.gas_price) if contract else None
+
+# Pipeline Gambar (validasi + simpan per hash, varian dibuat di background)
+image_store = ImageStore(app.config['MEDIA_FOLDER'])
+
+# Moderasi Batch Admin (approve/reject/delete banyak kampanye per transaksi)
+moderator = BulkModerator(web3, contract) if contract else None
+
+# Admission Control endpoint tulis (slot per kelas & per wallet, antrean terbatas, 429 + Retry-After saat penuh)
+admission = AdmissionController()
+
+def current_wallet():
+    return session.get('wallet')
+
+@app.before_request
+def start_background_services():
+    invalidation_bus.poll()
+    if indexer: indexer.start()
+    # Job transaksi tanpa pemantau (restart / worker lain mati) diklaim atomik, paling sering tiap RESUME_INTERVAL
+    if tx_pipeline: tx_pipeline.resume_pending()
 
 # --- 3. HELPER FUNCTIONS ---
 def get_db_connection():
-    conn = sqlite3.connect('instance/users.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Koneksi dipakai bersama selama satu request dan ditutup otomatis di teardown
+    return db.get_connection()
 
-def get_username_by_wallet(wallet_addr):
-    conn = get_db_connection()
-    user = conn.execute('SELECT username FROM users WHERE wallet_address = ?', (wallet_addr,)).fetchone()
-    conn.close()
-    if user:
-        return f"{user['username']}"
-    return "Unknown User"
+# Resolver Wallet -> Username (batch + cache LRU)
+username_resolver = UsernameResolver()
 
-def get_all_transactions():
+def get_username_by_wallet(wallet_addr):
+    return username_resolver.resolve(wallet_addr)
+
+# Live Feed SSE (satu thread membaca event baru dari SQLite lalu fan-out ke semua browser)
+live_feed = EventBroker(resolve_names=username_resolver.resolve_many)
+if indexer: indexer.add_listener(live_feed.wake)
+
+if fragments:
+    metrics.register_gauge('fragment_cache_lookups_total', 'Lookup fragment cache template per hasil.',
+                           lambda: {(k,): v for k, v in fragments.counters.items()}, ('result',), kind='counter')
+# Bus Invalidasi Cache antar worker gunicorn: perubahan dicatat di SQLite, worker lain membuang
+# entri yang sama di awal request berikutnya (read model kampanye, username, saldo wallet)
+invalidation_bus = InvalidationBus()
+invalidation_bus.subscribe('user', username_resolver.invalidate)
+invalidation_bus.subscribe('balance', chain_status.invalidate_wallet)
+if read_model: invalidation_bus.subscribe('campaign', lambda key: read_model.invalidate(int(key) if key is not None else None))
+metrics.register_gauge('cache_invalidations_total', 'Pesan bus invalidasi cache per arah (published/received/flushes).',
+                       lambda: {(k,): v for k, v in invalidation_bus.counters.items()}, ('direction',), kind='counter')
+
+metrics.register_gauge('admission_queue_depth', 'Request tulis yang sedang menunggu slot per kelas endpoint.',
+                       lambda: {(k,): v['waiting'] for k, v in admission.snapshot().items()}, ('endpoint_class',))
+metrics.register_gauge('admission_in_flight', 'Request tulis yang sedang berjalan per kelas endpoint.',
+                       lambda: {(k,): v['active'] for k, v in admission.snapshot().items()}, ('endpoint_class',))
+metrics.register_gauge('admission_limit', 'Batas request tulis bersamaan per kelas endpoint.',
+                       lambda: {(k,): v['limit'] for k, v in admission.snapshot().items()}, ('endpoint_class',))
+
+metrics.register_gauge('sse_subscribers', 'Browser yang sedang terhubung ke live feed SSE.', lambda: live_feed.subscriber_count)
+
+def get_page_args(default_limit):
+    # Keyset pagination: ?after=<id kampanye terakhir di halaman sebelumnya>&limit=<n>
+    after = max(request.args.get('after', -1, type=int), -1)
+    limit = min(max(request.args.get('limit', default_limit, type=int), 1), MAX_PAGE_SIZE)
+    return after, limit
+
+# Filter pencarian: ?q=<kata kunci>&category=<kategori>&status=<pending|approved|rejected|deleted|all>
+STATUS_NAMES = ('pending', 'approved', 'rejected', 'deleted')
+SEARCH_MAX_LENGTH = 100
+
+def get_search_args():
+    q = request.args.get('q', '').strip()[:SEARCH_MAX_LENGTH]
+    category = request.args.get('category', '').strip() or None
+    status = request.args.get('status', '').strip()
+    return q, category, status
+
+def get_status_mask(status, default):
+    # None = nama status tidak dikenal
+    if not status: return default
+    if status == 'all': return STATUS_MASK_ALL
+    if status in STATUS_NAMES: return 1 << STATUS_NAMES.index(status)
+    return None
+
+# Keranjang donasi di session: {"<id kampanye>": "<nominal ETH>"}, dibayar dengan satu transaksi donateToCampaigns
+BASKET_MAX_ITEMS = 20
+
+def has_basket_donation():
+    # Kontrak lama (belum migrate --reset) belum punya donateToCampaigns -> satu transaksi donasi per kampanye.
+    # Dibaca dari ABI saat dipakai: registry kontrak bisa memuat ABI baru tanpa restart.
+    return bool(contract) and any(f.get('name') == 'donateToCampaigns' for f in contract.abi)
+
+def get_basket():
+    return dict(session.get('basket') or {})
+
+def parse_eth_amount(amount):
+    # Nominal dari form -> (string ETH, wei); ValueError jika bukan angka positif
+    try: value = Decimal((amount or '').strip())
+    except InvalidOperation: raise ValueError("Nominal donasi tidak valid")
+    if not value.is_finite() or value <= 0: raise ValueError("Nominal donasi harus lebih dari 0")
+    return format(value.normalize(), 'f'), Web3.to_wei(value, 'ether')   # 'f': tanpa notasi ilmiah (1E-18)
+
+def get_fragment_keys(records):
+    # Versi fragment per kampanye: blok event terakhir + id kabar/donasi terakhir (semua lewat index),
+    # ditambah field read model yang bisa berubah tanpa event (mis. fundsWithdrawn)
+    ids = [c['id'] for c in records]
+    if not ids: return {}
+    conn = get_db_connection(); ph = ','.join('?' * len(ids))
+    blocks = dict(conn.execute(f"SELECT campaign_id, MAX(block_number) FROM chain_events WHERE campaign_id IN ({ph}) GROUP BY campaign_id", ids).fetchall())
+    updates = dict(conn.execute(f"SELECT blockchain_id, MAX(id) FROM campaign_updates WHERE blockchain_id IN ({ph}) GROUP BY blockchain_id", ids).fetchall())
+    donations = dict(conn.execute(f"SELECT blockchain_id, MAX(id) FROM donations WHERE blockchain_id IN ({ph}) GROUP BY blockchain_id", ids).fetchall())
+    return {c['id']: (c['id'], blocks.get(c['id'], 0), updates.get(c['id'], 0), donations.get(c['id'], 0),
+                      c['status_code'], c['collected_wei'], c['fundsWithdrawn'], c['detail']['id'] if c['detail'] else 0)
+            for c in records}
+
+def get_all_transactions(limit=ADMIN_HISTORY_LIMIT):
+    # Dibaca dari tabel hasil indexer (bukan eth_getLogs dari blok 0 setiap render)
     logs = []
     try:
-        if contract:
-            events = contract.events.DonationReceived().get_logs(fromBlock=0)
-            for e in events:
-                args = e['args']
-                logs.append({
-                    'type': 'Donasi Masuk',
-                    'campaign_id': args['campaignId'],
-                    'from': get_username_by_wallet(args['donor']),
-                    'from_addr': args['donor'],
-                    'amount': web3.from_wei(args['amount'], 'ether'),
-                    'timestamp': time.ctime(args['timestamp'])
-                })
-            
-            events_created = contract.events.CampaignCreated().get_logs(fromBlock=0)
-            for e in events_created:
-                args = e['args']
-                logs.append({
-                    'type': 'Campaign Dibuat',
-                    'campaign_id': args['id'],
-                    'from': get_username_by_wallet(args['creator']),
-                    'from_addr': args['creator'],
-                    'amount': '-',
-                    'timestamp': time.ctime(args['timestamp'])
-                })
-            logs.sort(key=lambda x: x['timestamp'], reverse=True)
+        conn = get_db_connection()
+        events = conn.execute('''SELECT event, campaign_id, actor, amount_wei, timestamp FROM chain_events
+                                 WHERE event IN ('DonationReceived', 'CampaignCreated')
+                                 ORDER BY timestamp DESC, id DESC LIMIT ?''', (limit,)).fetchall()
+        names = username_resolver.resolve_many({e['actor'] for e in events})
+        for e in events:
+            is_donation = e['event'] == 'DonationReceived'
+            logs.append({
+                'type': 'Donasi Masuk' if is_donation else 'Campaign Dibuat',
+                'campaign_id': e['campaign_id'],
+                'from': names.get(e['actor'], UNKNOWN_USER),
+                'from_addr': e['actor'],
+                'amount': Web3.from_wei(int(e['amount_wei']), 'ether') if is_donation else '-',
+                'timestamp': time.ctime(e['timestamp'])
+            })
     except Exception as e:
         print(f"Error fetching logs: {e}")
     return logs
 
 # --- FUNGSI FETCH BERITA (MULTI-SOURCE AGGREGATOR) ---
+# Berita diambil paralel di background (news_service.py); halaman hanya membaca cache
+news_service = NewsService()
+
 def get_humanitarian_news():
-    # Daftar Sumber RSS Terpercaya
-    rss_sources = [
-        {"url": "https://www.antaranews.com/rss/humaniora.xml", "name": "Antara News"},
-        {"url": "https://www.cnnindonesia.com/nasional/rss", "name": "CNN Indonesia"},
-        {"url": "https://www.republika.co.id/rss/nasional/umum", "name": "Republika"},
-        {"url": "https://www.viva.co.id/rss/berita/nasional", "name": "Viva News"}
-    ]
-    
-    # Kata Kunci Filter (Trigger Words)
-    keywords = [
-        "banjir", "gempa", "longsor", "kebakaran", "bencana", "tsunami", "erupsi",
-        "korban", "pengungsi", "bantuan", "donasi", "miskin", "kelaparan",
-        "difabel", "panti", "sosial", "kemanusiaan", "zakat", "galang dana",
-        "medis", "sakit", "warga", "desa", "peduli", "dampak", "rusak"
-    ]
-    
-    aggregated_news = []
-    
-    for source in rss_sources:
-        try:
-            feed = feedparser.parse(source["url"])
-            # Loop maksimal 10 berita per sumber untuk efisiensi
-            for entry in feed.entries[:10]:
-                title = entry.title.lower()
-                summary = entry.summary.lower() if hasattr(entry, 'summary') else ""
-                
-                # Cek Relevansi
-                if any(k in title for k in keywords) or any(k in summary for k in keywords):
-                    # Bersihkan summary
-                    clean_summary = entry.summary.split('<')[0] if hasattr(entry, 'summary') else entry.title
-                    
-                    # Ambil Waktu Publish (Unix Timestamp untuk sorting)
-                    pub_time = entry.published_parsed if hasattr(entry, 'published_parsed') else time.gmtime()
-                    timestamp = mktime(pub_time) if pub_time else 0
-                    
-                    aggregated_news.append({
-                        'title': entry.title,
-                        'link': entry.link,
-                        'published': entry.published if hasattr(entry, 'published') else "Baru saja",
-                        'timestamp': timestamp, # Untuk sorting
-                        'summary': clean_summary,
-                        'source': source["name"]
-                    })
-        except Exception as e:
-            print(f"Skip source {source['name']}: {e}")
-            continue
-
-    # Sorting: Urutkan dari yang paling baru (timestamp terbesar)
-    aggregated_news.sort(key=lambda x: x['timestamp'], reverse=True)
-    
-    # Ambil 4 Teratas
-    final_news = aggregated_news[:4]
-        
-    # FALLBACK MOCK DATA (Jika internet mati atau tidak ada berita relevan)
-    if not final_news:
-        final_news = [
-            {
-                'title': 'Banjir Bandang Terjang Pemukiman Warga, Ribuan Mengungsi', 
-                'link': '#', 'published': 'Hari ini', 
-                'summary': 'Hujan deras menyebabkan tanggul jebol. Warga membutuhkan bantuan logistik...', 
-                'source': 'Simulasi Bencana'
-            },
-            {
-                'title': 'Gempa M 5.6 Guncang Wilayah Cianjur, Rumah Rusak Berat', 
-                'link': '#', 'published': 'Kemarin', 
-                'summary': 'Gempa darat dangkal menyebabkan kerusakan infrastruktur...', 
-                'source': 'Simulasi Bencana'
-            },
-            {
-                'title': 'Kebakaran Hanguskan Ratusan Rumah di Kawasan Padat', 
-                'link': '#', 'published': '2 Hari lalu', 
-                'summary': 'Api dengan cepat menyebar. Warga kehilangan tempat tinggal...', 
-                'source': 'Simulasi Bencana'
-            },
-            {
-                'title': 'Krisis Air Bersih di Desa Terpencil Akibat Kemarau', 
-                'link': '#', 'published': '3 Hari lalu', 
-                'summary': 'Sumur warga kering. Mereka terpaksa berjalan jauh demi air...', 
-                'source': 'Simulasi Sosial'
-            }
-        ]
-        
-    return final_news
+    return news_service.get_news()
 
 # --- 4. ROUTES (HALAMAN UTAMA UPDATE) ---
 
@@ -231,6 +255,24 @@ def index():
     latest_news = get_humanitarian_news()
     return render_template('index.html', news=latest_news)
 
+@app.route('/media/<key>/<variant>')
+def media(key, variant):
+    if not is_key(key) or variant not in VARIANTS: abort(404)
+    fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpg'
+    path = image_store.variant_path(key, variant, fmt)
+    if os.path.exists(path):
+        resp = send_file(path, mimetype='image/webp' if fmt == 'webp' else 'image/jpeg', conditional=True, max_age=MEDIA_MAX_AGE)
+        resp.headers['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+    else:
+        # Varian belum selesai dibuat (atau hilang) -> kirim file sumber tanpa cache panjang
+        source = image_store.source_path(key)
+        if source is None: abort(404)
+        image_store.schedule(key)
+        resp = send_file(source, conditional=True, max_age=0)
+        resp.headers['Cache-Control'] = 'no-cache'
+    resp.vary.add('Accept')
+    return resp
+
 @app.route('/help')
 def help_page(): return render_template('help.html')
 
@@ -248,7 +290,6 @@ def login():
         email = request.form['email']; password = request.form['password']
         conn = get_db_connection()
         user = conn.execute('SELECT * FROM users WHERE email = ? AND password = ?', (email, password)).fetchone()
-        conn.close()
         if user:
             session['user_id'] = user['id']; session['username'] = user['username']
             session['role'] = user['role']; session['wallet'] = user['wallet_address']
@@ -277,13 +318,13 @@ def register():
             conn.execute('INSERT INTO users (username, email, password, role, wallet_address, private_key, profile_pic) VALUES (?, ?, ?, ?, ?, ?, ?)',
                          (username, email, password, role, wallet, pk, 'default_user.png'))
             conn.commit()
+            invalidation_bus.publish('user', wallet)
             flash('Registrasi berhasil! Setup Wallet selesai.', 'success')
             return redirect(url_for('login'))
         except sqlite3.IntegrityError:
             flash('Email atau Username sudah terdaftar.', 'error')
         except Exception as e:
             flash(f'Gagal Register: {e}', 'error')
-        finally: conn.close()
     return render_template('auth/register.html', accounts=ganache_accounts)
 
 @app.route('/logout')
@@ -297,7 +338,7 @@ def profile():
         new_username = request.form.get('username'); bio = request.form.get('bio')
         file = request.files.get('profile_pic')
         user = conn.execute("SELECT * FROM users WHERE id = ?", (session['user_id'],)).fetchone()
-        msg = []
+        msg = []; username_changed = False
         if new_username and new_username != user['username']:
             last_change = user['last_username_change']
             can_change = True
@@ -308,15 +349,16 @@ def profile():
                     flash(f"Gagal: Username hanya bisa diubah 14 hari sekali. Tunggu {days_left} hari lagi.", "error")
             if can_change:
                 conn.execute("UPDATE users SET username = ?, last_username_change = ? WHERE id = ?", (new_username, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), session['user_id']))
-                session['username'] = new_username; msg.append("Username berhasil diubah.")
+                session['username'] = new_username; msg.append("Username berhasil diubah."); username_changed = True
         conn.execute("UPDATE users SET bio = ? WHERE id = ?", (bio, session['user_id']))
         if file and file.filename != '':
-            if not os.path.exists(app.config['UPLOAD_FOLDER']): os.makedirs(app.config['UPLOAD_FOLDER'])
-            filename = f"user_{session['user_id']}_{int(time.time())}.jpg"
-            file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-            conn.execute("UPDATE users SET profile_pic = ? WHERE id = ?", (filename, session['user_id']))
-            session['profile_pic'] = filename; msg.append("Foto profil diperbarui.")
+            try:
+                filename = image_store.ingest(file)
+                conn.execute("UPDATE users SET profile_pic = ? WHERE id = ?", (filename, session['user_id']))
+                session['profile_pic'] = filename; msg.append("Foto profil diperbarui.")
+            except InvalidImage as e: flash(f"Foto profil ditolak: {e}", "error")
         conn.commit()
+        if username_changed: invalidation_bus.publish('user', user['wallet_address'])
         if msg: flash("Profil berhasil diperbarui!", "success")
         return redirect(url_for('profile'))
     user = conn.execute("SELECT * FROM users WHERE id = ?", (session['user_id'],)).fetchone()
@@ -327,9 +369,9 @@ def profile():
         if delta.days > 0: days_until_change = delta.days
     balance = "0"
     try: 
-        if web3: balance = "{:.4f}".format(web3.from_wei(web3.eth.get_balance(user['wallet_address']), 'ether'))
+        bal_wei = chain_status.get_balance(user['wallet_address'])
+        if bal_wei is not None: balance = "{:.4f}".format(web3.from_wei(bal_wei, 'ether'))
     except: pass
-    conn.close()
     return render_template('profile.html', user=user, balance=balance, days_wait=days_until_change)
 
 # --- 6. ROUTES (CAMPAIGN) ---
@@ -338,41 +380,48 @@ def profile():
 def dashboard():
     if session.get('role') == 'admin': return redirect(url_for('admin_dashboard'))
     campaigns = []
+    after, limit = get_page_args(DASHBOARD_PAGE_SIZE)
+    q, category, status = get_search_args()
+    statuses = get_status_mask(status, STATUS_MASK_ALL) or STATUS_MASK_ALL
+    next_after, has_more = after, False
+    categories = []
     if contract:
         try:
-            count = contract.functions.getCampaignCount().call()
-            conn = get_db_connection()
-            details_rows = conn.execute("SELECT * FROM campaign_details").fetchall()
-            conn.close()
-            details_map = {d['blockchain_id']: d for d in details_rows}
-            for i in range(count):
-                c = contract.functions.getCampaign(i).call()
-                status_code = c[8]; creator_address = c[1]
+            # APPROVED untuk semua orang, plus kampanye milik sendiri (kecuali DELETED)
+            if q or category or status:
+                # Dengan q: urut relevansi dan `after` = posisi hasil terakhir; tanpa q: urut id
+                ids, next_after, has_more = search_index.search(get_db_connection(), q, category, status_mask=1 << 1,
+                                                                creator=session.get('wallet'), statuses=statuses, after=after, limit=limit)
+                page = read_model.get_many(ids)
+            else:
+                page, next_after, has_more = read_model.page(after, limit, status_mask=1 << 1, creator=session.get('wallet'))
+            fragment_keys = get_fragment_keys(page)
+            for c in page:
+                status_code = c['status_code']; creator_address = c['creator']
                 is_owner = (creator_address == session.get('wallet'))
-                should_show = False
-                if status_code == 1: should_show = True
-                elif is_owner: should_show = True
-                if status_code == 3: should_show = False
-                if should_show:
-                    status_label = 'Unknown'
-                    if status_code == 0: status_label = 'Pending'
-                    elif status_code == 1: status_label = 'Active'
-                    elif status_code == 2: status_label = 'Rejected'
-                    elif status_code == 3: status_label = 'Deleted'
-                    detail = details_map.get(c[0])
-                    campaigns.append({
-                        'id': c[0], 'title': c[2], 'desc': c[3],
-                        'target': web3.from_wei(c[4], 'ether'),
-                        'collected': web3.from_wei(c[5], 'ether'),
-                        'image': c[6], 'status_code': status_code,
-                        'status_label': status_label, 'is_owner': is_owner,
-                        'tagline': detail['tagline'] if detail else c[3][:50] + "...",
-                        'category': detail['category'] if detail else "Umum"
-                    })
+                status_label = 'Unknown'
+                if status_code == 0: status_label = 'Pending'
+                elif status_code == 1: status_label = 'Active'
+                elif status_code == 2: status_label = 'Rejected'
+                elif status_code == 3: status_label = 'Deleted'
+                detail = c['detail']
+                campaigns.append({
+                    'id': c['id'], 'title': c['title'], 'desc': c['desc'],
+                    'target': c['target'], 'collected': c['collected'],
+                    'image': c['image'], 'status_code': status_code,
+                    'status_label': status_label, 'is_owner': is_owner,
+                    'fundsWithdrawn': c['fundsWithdrawn'],
+                    'tagline': detail['tagline'] if detail else (c['desc'] or c['title'])[:50] + "...",
+                    'category': detail['category'] if detail else "Umum",
+                    'fragment_key': fragment_keys[c['id']]
+                })
+            categories = search_index.categories(get_db_connection())
         except Exception as e: print(f"Dashboard Error: {e}")
-    return render_template('campaigns.html', campaigns=campaigns)
+    return render_template('campaigns.html', campaigns=campaigns, after=after, limit=limit, next_after=next_after, has_more=has_more,
+                           q=q, category=category, status=status, categories=categories, status_names=STATUS_NAMES[:3])
 
 @app.route('/create_campaign', methods=['GET', 'POST'])
+@admission.guard('campaign', current_wallet, methods=('POST',))
 def create_campaign():
     if 'user_id' not in session: flash("Silakan login terlebih dahulu.", "error"); return redirect(url_for('login'))
     if session.get('role') != 'kreator': flash("Hanya akun KREATOR yang bisa membuat kampanye!", "error"); return redirect(url_for('dashboard'))
@@ -387,162 +436,499 @@ def create_campaign():
         usage_plan = request.form.get('usage_plan', '')
         social_link = request.form.get('social_link', '')
         file = request.files['image']
-        if not os.path.exists(app.config['UPLOAD_FOLDER']): os.makedirs(app.config['UPLOAD_FOLDER'])
-        filename = f"{int(time.time())}_{file.filename}"
-        file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+        try: filename = image_store.ingest(file)
+        except InvalidImage as e:
+            flash(f"Gambar kampanye ditolak: {e}", "error"); return redirect(url_for('create_campaign', title=title))
         conn = get_db_connection()
         user_data = conn.execute("SELECT wallet_address, private_key FROM users WHERE id = ?", (session['user_id'],)).fetchone()
         if user_data is None or not user_data['wallet_address'] or not user_data['private_key']:
-            conn.close(); flash("Error: Data akun tidak lengkap.", "error"); return redirect(url_for('dashboard'))
+            flash("Error: Data akun tidak lengkap.", "error"); return redirect(url_for('dashboard'))
         try:
             target_wei = web3.to_wei(target, 'ether'); duration_minutes = duration_days * 1440 
-            nonce = web3.eth.get_transaction_count(user_data['wallet_address'])
-            txn = contract.functions.createCampaign(title, desc, target_wei, filename, duration_minutes).build_transaction({
-                'chainId': web3.eth.chain_id, 'gas': 2000000, 'gasPrice': web3.eth.gas_price, 'nonce': nonce
-            })
-            signed_txn = web3.eth.account.sign_transaction(txn, private_key=user_data['private_key'])
-            tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            web3.eth.wait_for_transaction_receipt(tx_hash)
-            new_count = contract.functions.getCampaignCount().call()
-            conn.execute('INSERT INTO campaign_details (blockchain_id, category, usage_plan, social_link, tagline) VALUES (?, ?, ?, ?, ?)',
-                         (new_count - 1, category, usage_plan, social_link, tagline))
-            conn.commit(); conn.close()
-            flash(f"Campaign '{title}' berhasil dibuat! Menunggu Admin.", "success"); return redirect(url_for('dashboard'))
-        except Exception as e: conn.close(); flash(f"Error Blockchain: {str(e)}", "error")
+            job_id = tx_pipeline.submit('create_campaign', user_data['wallet_address'], user_data['private_key'],
+                                        contract.functions.createCampaign(title, desc, target_wei, filename, duration_minutes),
+                                        payload={'category': category, 'usage_plan': usage_plan, 'social_link': social_link, 'tagline': tagline})
+            flash(f"Campaign '{title}' dikirim ke blockchain (ID pelacakan: {job_id}). Menunggu konfirmasi & Admin.", "success"); return redirect(url_for('dashboard'))
+        except Exception as e: flash(f"Error Blockchain: {str(e)}", "error")
     return render_template('create_campaign.html', prefill_title=prefill_title)
 
 @app.route('/campaign/<int:id>')
 def campaign_detail(id):
     try:
-        c = contract.functions.getCampaign(id).call()
+        c = read_model.get(id); detail = c['detail']
         conn = get_db_connection()
-        detail = conn.execute("SELECT * FROM campaign_details WHERE blockchain_id = ?", (id,)).fetchone()
-        updates = conn.execute("SELECT * FROM campaign_updates WHERE blockchain_id = ? ORDER BY id DESC", (id,)).fetchall()
-        donations = conn.execute("SELECT * FROM donations WHERE blockchain_id = ? ORDER BY id DESC", (id,)).fetchall()
-        conn.close()
-        target = web3.from_wei(c[4], 'ether'); collected = web3.from_wei(c[5], 'ether')
+        # Daftar kabar & donasi hanya di-query jika fragment-nya belum ada di cache
+        updates = LazyRows(lambda: conn.execute("SELECT * FROM campaign_updates WHERE blockchain_id = ? ORDER BY id DESC", (id,)).fetchall())
+        donations = LazyRows(lambda: conn.execute("SELECT * FROM donations WHERE blockchain_id = ? ORDER BY id DESC", (id,)).fetchall())
+        target = c['target']; collected = c['collected']
         percent = (float(collected) / float(target) * 100) if float(target) > 0 else 0
         status_map = {0: 'Pending', 1: 'Active', 2: 'Rejected', 3: 'Deleted'}
-        creator_name = get_username_by_wallet(c[1])
+        creator_name = get_username_by_wallet(c['creator'])
         campaign = {
-            'id': c[0], 'creator': c[1], 'creator_name': creator_name,
-            'title': c[2], 'desc': c[3], 'target': target, 'collected': collected,
-            'image': c[6], 'deadline': time.ctime(c[7]), 'status_code': c[8],
-            'percent': "{:.1f}".format(percent), 'fundsWithdrawn': c[9],
+            'id': c['id'], 'creator': c['creator'], 'creator_name': creator_name,
+            'title': c['title'], 'desc': c['desc'], 'target': target, 'collected': collected,
+            'image': c['image'], 'deadline': time.ctime(c['deadline']), 'status_code': c['status_code'],
+            'percent': "{:.1f}".format(percent), 'fundsWithdrawn': c['fundsWithdrawn'],
             'category': detail['category'] if detail else 'Umum',
             'tagline': detail['tagline'] if detail else '',
             'usage_plan': detail['usage_plan'] if detail else 'Tidak ada rincian.',
             'social_link': detail['social_link'] if detail else '#',
             'updates': updates, 'donations': donations
         }
-        return render_template('campaign_detail.html', campaign=campaign)
+        fragment_key = get_fragment_keys([c])[id] + (creator_name,)
+        return render_template('campaign_detail.html', campaign=campaign, fragment_key=fragment_key)
     except Exception as e: flash(f"Gagal memuat kampanye: {e}", "error"); return redirect(url_for('dashboard'))
 
 @app.route('/donate/<int:id>', methods=['POST'])
+@admission.guard('donate', current_wallet)
 def donate(id):
     if session.get('role') != 'donatur': flash("Hanya akun DONATUR yang bisa berdonasi!", "error"); return redirect(url_for('campaign_detail', id=id))
     amount = request.form.get('amount'); message = request.form.get('message')
     try:
-        amount_eth = float(amount); amount_wei = web3.to_wei(amount_eth, 'ether')
+        amount, amount_wei = parse_eth_amount(amount)   # Sama dengan keranjang: Decimal, tanpa pembulatan float
         conn = get_db_connection(); user_data = conn.execute("SELECT wallet_address, private_key, username FROM users WHERE id = ?", (session['user_id'],)).fetchone()
-        if not user_data['private_key']: flash("Error: Private Key tidak ditemukan.", "error"); conn.close(); return redirect(url_for('campaign_detail', id=id))
-        nonce = web3.eth.get_transaction_count(user_data['wallet_address'])
-        txn = contract.functions.donateToCampaign(id).build_transaction({
-            'chainId': web3.eth.chain_id, 'gas': 2000000, 'gasPrice': web3.eth.gas_price, 'nonce': nonce, 'value': amount_wei 
-        })
-        signed_txn = web3.eth.account.sign_transaction(txn, private_key=user_data['private_key'])
-        tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        web3.eth.wait_for_transaction_receipt(tx_hash)
-        conn.execute('INSERT INTO donations (blockchain_id, donor_name, amount, message, timestamp) VALUES (?, ?, ?, ?, ?)',
-                     (id, user_data['username'], amount, message, datetime.now().strftime("%d %b %Y, %H:%M")))
-        conn.commit(); conn.close()
-        flash(f"Terima kasih! Donasi {amount} ETH berhasil dikirim.", "success")
+        if not user_data['private_key']: flash("Error: Private Key tidak ditemukan.", "error"); return redirect(url_for('campaign_detail', id=id))
+        job_id = tx_pipeline.submit('donate', user_data['wallet_address'], user_data['private_key'],
+                                    contract.functions.donateToCampaign(id), value=amount_wei, campaign_id=id,
+                                    payload={'donor_name': user_data['username'], 'amount': amount, 'message': message})
+        invalidation_bus.publish('balance', user_data['wallet_address'])
+        flash(f"Terima kasih! Donasi {amount} ETH sedang diproses (ID pelacakan: {job_id}).", "success")
     except Exception as e: flash(f"Gagal Donasi: {e}", "error")
     return redirect(url_for('campaign_detail', id=id))
 
+@app.route('/basket/add/<int:id>', methods=['POST'])
+def basket_add(id):
+    if session.get('role') != 'donatur': flash("Hanya akun DONATUR yang bisa berdonasi!", "error"); return redirect(url_for('campaign_detail', id=id))
+    basket = get_basket()
+    try: amount, _ = parse_eth_amount(request.form.get('amount'))
+    except ValueError as e: flash(f"Gagal menambah ke keranjang: {e}", "error"); return redirect(url_for('campaign_detail', id=id))
+    if str(id) not in basket and len(basket) >= BASKET_MAX_ITEMS:
+        flash(f"Keranjang penuh (maksimal {BASKET_MAX_ITEMS} kampanye).", "error"); return redirect(url_for('campaign_detail', id=id))
+    basket[str(id)] = amount; session['basket'] = basket
+    flash(f"Donasi {amount} ETH ditambahkan ke keranjang.", "success")
+    return redirect(url_for('campaign_detail', id=id))
+
+@app.route('/basket/remove/<int:id>', methods=['POST'])
+def basket_remove(id):
+    basket = get_basket(); basket.pop(str(id), None); session['basket'] = basket
+    return redirect(url_for('basket'))
+
+@app.route('/basket')
+def basket():
+    if session.get('role') != 'donatur': return redirect(url_for('dashboard'))
+    items = get_basket(); records = {}
+    if read_model and items:
+        records = {c['id']: c for c in read_model.get_many(sorted(int(i) for i in items))}
+    entries = [{'id': int(i), 'amount': amount, 'campaign': records.get(int(i)),
+                'active': int(i) in records and records[int(i)]['status_code'] == 1 and records[int(i)]['deadline'] > time.time()}
+               for i, amount in items.items()]
+    total = sum((Decimal(e['amount']) for e in entries), Decimal(0))
+    return render_template('basket.html', entries=entries, total=total, max_items=BASKET_MAX_ITEMS, atomic=has_basket_donation())
+
+@app.route('/basket/checkout', methods=['POST'])
+@admission.guard('donate', current_wallet)
+def basket_checkout():
+    if session.get('role') != 'donatur': flash("Hanya akun DONATUR yang bisa berdonasi!", "error"); return redirect(url_for('dashboard'))
+    items = get_basket(); message = request.form.get('message')
+    if not items: flash("Keranjang donasi masih kosong.", "error"); return redirect(url_for('basket'))
+    try:
+        legs = [(int(i),) + parse_eth_amount(amount) for i, amount in sorted(items.items(), key=lambda kv: int(kv[0]))]
+        # Dicek dulu di sini: satu kampanye tidak aktif membuat seluruh transaksi keranjang revert
+        records = {c['id']: c for c in read_model.get_many([i for i, _, _ in legs])}
+        inactive = [i for i, _, _ in legs if i not in records or records[i]['status_code'] != 1 or records[i]['deadline'] <= time.time()]
+        if inactive:
+            flash(f"Kampanye berikut sudah tidak menerima donasi, hapus dari keranjang: ID {', '.join(map(str, inactive))}", "error")
+            return redirect(url_for('basket'))
+        conn = get_db_connection(); user_data = conn.execute("SELECT wallet_address, private_key, username FROM users WHERE id = ?", (session['user_id'],)).fetchone()
+        if not user_data['private_key']: flash("Error: Private Key tidak ditemukan.", "error"); return redirect(url_for('basket'))
+        if has_basket_donation():
+            job_ids = [tx_pipeline.submit('donate_basket', user_data['wallet_address'], user_data['private_key'],
+                                          contract.functions.donateToCampaigns([i for i, _, _ in legs], [wei for _, _, wei in legs]),
+                                          value=sum(wei for _, _, wei in legs),
+                                          payload={'donor_name': user_data['username'], 'message': message,
+                                                   'legs': [{'campaign_id': i, 'amount': amount} for i, amount, _ in legs]})]
+        else:
+            job_ids = [tx_pipeline.submit('donate', user_data['wallet_address'], user_data['private_key'],
+                                          contract.functions.donateToCampaign(i), value=wei, campaign_id=i,
+                                          payload={'donor_name': user_data['username'], 'amount': amount, 'message': message})
+                       for i, amount, wei in legs]
+        invalidation_bus.publish('balance', user_data['wallet_address'])
+        session['basket'] = {}
+        total = sum((Decimal(amount) for _, amount, _ in legs), Decimal(0))
+        flash(f"Terima kasih! Donasi {total} ETH untuk {len(legs)} kampanye sedang diproses (ID pelacakan: {', '.join(job_ids)}).", "success")
+    except Exception as e: flash(f"Gagal Donasi: {e}", "error"); return redirect(url_for('basket'))
+    return redirect(url_for('dashboard'))
+
 @app.route('/post_update/<int:id>', methods=['POST'])
 def post_update(id):
     if 'user_id' not in session: return redirect(url_for('login'))
     title = request.form['update_title']; content = request.form['update_content']
     file = request.files['update_image']; image_filename = ""
-    if file:
-        filename = f"update_{int(time.time())}_{file.filename}"
-        file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-        image_filename = filename
+    if file and file.filename != '':
+        try: image_filename = image_store.ingest(file)
+        except InvalidImage as e:
+            flash(f"Gambar kabar terbaru ditolak: {e}", "error"); return redirect(url_for('campaign_detail', id=id))
     conn = get_db_connection()
     conn.execute('INSERT INTO campaign_updates (blockchain_id, title, content, image, created_at) VALUES (?, ?, ?, ?, ?)',
                  (id, title, content, image_filename, time.ctime()))
-    conn.commit(); conn.close()
+    conn.commit()
+    live_feed.wake()
     flash("Kabar terbaru berhasil diposting!", "success"); return redirect(url_for('campaign_detail', id=id))
 
 @app.route('/withdraw/<int:id>')
+@admission.guard('withdraw', current_wallet)
 def withdraw_funds(id):
     if 'user_id' not in session: return redirect(url_for('login'))
     conn = get_db_connection(); user_data = conn.execute("SELECT wallet_address, private_key FROM users WHERE id = ?", (session['user_id'],)).fetchone()
-    conn.close()
     try:
-        nonce = web3.eth.get_transaction_count(user_data['wallet_address'])
-        txn = contract.functions.withdrawFunds(id).build_transaction({
-            'chainId': web3.eth.chain_id, 'gas': 2000000, 'gasPrice': web3.eth.gas_price, 'nonce': nonce
-        })
-        signed_txn = web3.eth.account.sign_transaction(txn, private_key=user_data['private_key'])
-        tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        web3.eth.wait_for_transaction_receipt(tx_hash)
-        flash("Dana berhasil ditarik ke dompet Anda!", "success")
+        job_id = tx_pipeline.submit('withdraw', user_data['wallet_address'], user_data['private_key'],
+                                    contract.functions.withdrawFunds(id), campaign_id=id)
+        flash(f"Penarikan dana sedang diproses (ID pelacakan: {job_id}).", "success")
     except Exception as e: flash(f"Gagal Tarik Dana: {e}", "error")
     return redirect(url_for('campaign_detail', id=id))
 
+# --- 7. STATUS TRANSAKSI (PIPELINE) ---
+# Handler bisa dipanggil ulang untuk job yang sama (crash sebelum job ditandai selesai, lease diambil alih),
+# jadi baris efek samping membawa tx_hash (UNIQUE) dan di-insert dengan INSERT OR IGNORE.
+def on_campaign_created(job, receipt):
+    # ID kampanye diambil dari event CampaignCreated di receipt (bukan getCampaignCount - 1)
+    new_id = contract.events.CampaignCreated().process_receipt(receipt)[0]['args']['id']
+    p = job['payload']
+    conn = get_db_connection()
+    conn.execute('INSERT OR IGNORE INTO campaign_details (blockchain_id, category, usage_plan, social_link, tagline, tx_hash) VALUES (?, ?, ?, ?, ?, ?)',
+                 (new_id, p['category'], p['usage_plan'], p['social_link'], p['tagline'], job['tx_hash']))
+    conn.execute('UPDATE tx_jobs SET campaign_id = ? WHERE id = ?', (new_id, job['id']))
+    conn.commit()
+    invalidation_bus.publish('campaign', new_id); invalidation_bus.publish('balance', job['wallet'])
+
+def on_donation_confirmed(job, receipt):
+    p = job['payload']
+    conn = get_db_connection()
+    conn.execute('INSERT OR IGNORE INTO donations (blockchain_id, donor_name, amount, message, timestamp, tx_hash) VALUES (?, ?, ?, ?, ?, ?)',
+                 (job['campaign_id'], p['donor_name'], p['amount'], p['message'], datetime.now().strftime("%d %b %Y, %H:%M"), job['tx_hash']))
+    conn.commit()
+    invalidation_bus.publish('campaign', job['campaign_id']); invalidation_bus.publish('balance', job['wallet'])
+
+def on_basket_confirmed(job, receipt):
+    # Transaksi keranjang atomik di kontrak -> semua baris donasi dicatat dalam satu transaksi SQLite
+    p = job['payload']; now = datetime.now().strftime("%d %b %Y, %H:%M")
+    conn = get_db_connection()
+    with conn:   # Commit sekali; gagal di tengah -> rollback, tidak ada donasi yang tercatat sebagian
+        conn.executemany('INSERT OR IGNORE INTO donations (blockchain_id, donor_name, amount, message, timestamp, tx_hash) VALUES (?, ?, ?, ?, ?, ?)',
+                         [(leg['campaign_id'], p['donor_name'], leg['amount'], p['message'], now, job['tx_hash']) for leg in p['legs']])
+    invalidation_bus.publish('campaign', *(leg['campaign_id'] for leg in p['legs'])); invalidation_bus.publish('balance', job['wallet'])
+
+def on_withdraw_confirmed(job, receipt):
+    invalidation_bus.publish('campaign', job['campaign_id'])  # withdrawFunds tidak memancarkan event
+    invalidation_bus.publish('balance', job['wallet'])
+
+if tx_pipeline:
+    tx_pipeline.register_handler('create_campaign', on_campaign_created)
+    tx_pipeline.register_handler('donate', on_donation_confirmed)
+    tx_pipeline.register_handler('donate_basket', on_basket_confirmed)
+    tx_pipeline.register_handler('withdraw', on_withdraw_confirmed)
+
+@app.route('/tx/<job_id>')
+def tx_status(job_id):
+    job = tx_pipeline.get(job_id) if tx_pipeline else None
+    if job is None: return jsonify({'error': 'Job tidak ditemukan'}), 404
+    return jsonify({'id': job['id'], 'kind': job['kind'], 'status': job['status'], 'tx_hash': job['tx_hash'],
+                    'campaign_id': job['campaign_id'], 'error': job['error'], 'created_at': job['created_at'], 'updated_at': job['updated_at']})
+
 # --- 8. ADMIN PANEL ---
 @app.route('/admin')
 def admin_dashboard():
     if 'role' not in session or session['role'] != 'admin': return "Akses Ditolak"
-    campaigns = []; stats = {'pending': 0, 'active': 0, 'rejected': 0, 'deleted': 0, 'total_campaigns': 0}
+    campaigns = []; top_donors = []
+    stats = {'pending': 0, 'active': 0, 'rejected': 0, 'deleted': 0, 'total_campaigns': 0, 'total_transactions': 0, 'unique_donors': 0, 'volume_24h': 0}
+    after, limit = get_page_args(ADMIN_PAGE_SIZE)
+    next_after, has_more = after, False
     if contract:
-        count = contract.functions.getCampaignCount().call()
-        stats['total_campaigns'] = count
-        for i in range(count):
-            c = contract.functions.getCampaign(i).call()
-            status_map = {0: 'Pending', 1: 'Approved', 2: 'Rejected', 3: 'Deleted'}
-            if c[8] == 0: stats['pending'] += 1
-            elif c[8] == 1: stats['active'] += 1
-            elif c[8] == 2: stats['rejected'] += 1
-            elif c[8] == 3: stats['deleted'] += 1
+        # Node mati: daftar kampanye kosong, statistik & audit log tetap dari SQLite
+        try: page, next_after, has_more = read_model.page(after, limit)
+        except NODE_ERRORS as e:
+            page = []; flash(f"Blockchain belum tersedia, daftar kampanye tidak dapat dimuat: {e}", "error")
+        # Statistik dari tabel rollup (diperbarui indexer), bukan iterasi semua kampanye
+        conn = get_db_connection()
+        counts = rollups.status_counts(conn)
+        stats.update(pending=counts[0], active=counts[1], rejected=counts[2], deleted=counts[3], total_campaigns=sum(counts.values()))
+        totals = rollups.totals(conn)
+        stats.update(total_transactions=totals['donations'] + stats['total_campaigns'], unique_donors=totals['donors'],
+                     volume_24h=Web3.from_wei(sum(b['total_wei'] for b in rollups.volume(conn, 'h')), 'ether'))
+        top = rollups.top_donors(conn, 5)
+        donor_names = username_resolver.resolve_many({d['donor'] for d in top})
+        top_donors = [dict(d, name=donor_names.get(d['donor'], UNKNOWN_USER), total=Web3.from_wei(d['total_wei'], 'ether')) for d in top]
+        per_campaign = rollups.campaign_stats(conn, [c['id'] for c in page])
+        errors = read_model.last_errors
+        if errors: flash(f"Gagal memuat {len(errors)} kampanye dari blockchain: ID {', '.join(map(str, sorted(errors)))}", "error")
+        names = username_resolver.resolve_many({c['creator'] for c in page})
+        status_map = {0: 'Pending', 1: 'Approved', 2: 'Rejected', 3: 'Deleted'}
+        for c in page:
             campaigns.append({
-                'id': c[0], 'creator_addr': c[1], 'creator_name': get_username_by_wallet(c[1]),
-                'title': c[2], 'target': web3.from_wei(c[4], 'ether'),
-                'status': status_map[c[8]], 'status_code': c[8]
+                'id': c['id'], 'creator_addr': c['creator'], 'creator_name': names.get(c['creator'], UNKNOWN_USER),
+                'title': c['title'], 'target': c['target'],
+                'status': status_map[c['status_code']], 'status_code': c['status_code'],
+                'donor_count': per_campaign.get(c['id'], {}).get('donor_count', 0)
             })
     conn = get_db_connection(); users = conn.execute('SELECT * FROM users WHERE role != "admin"').fetchall()
-    conn.close(); transactions = get_all_transactions() 
-    return render_template('admin_dashboard.html', campaigns=campaigns, users=users, transactions=transactions, stats=stats, total_users=len(users))
+    transactions = get_all_transactions() 
+    return render_template('admin_dashboard.html', campaigns=campaigns, users=users, transactions=transactions, stats=stats, total_users=len(users), top_donors=top_donors,
+                           after=after, limit=limit, next_after=next_after, has_more=has_more)
 
 @app.route('/admin/approve/<int:id>')
+@admission.guard('moderation', current_wallet)
 def approve_campaign(id):
+    if session.get('role') != 'admin': return "Akses Ditolak"
     try:
         tx = contract.functions.approveCampaign(id).transact({'from': web3.eth.accounts[0]})
-        web3.eth.wait_for_transaction_receipt(tx); flash(f"Campaign #{id} Approved!", "success")
+        web3.eth.wait_for_transaction_receipt(tx); invalidation_bus.publish('campaign', id); invalidation_bus.publish('balance', web3.eth.accounts[0])
+        flash(f"Campaign #{id} Approved!", "success")
     except: flash("Gagal approve", "error")
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/reject/<int:id>')
+@admission.guard('moderation', current_wallet)
+def reject_campaign(id):
+    if session.get('role') != 'admin': return "Akses Ditolak"
+    try:
+        tx = contract.functions.rejectCampaign(id).transact({'from': web3.eth.accounts[0]})
+        web3.eth.wait_for_transaction_receipt(tx); invalidation_bus.publish('campaign', id); invalidation_bus.publish('balance', web3.eth.accounts[0])
+        flash(f"Campaign #{id} Rejected.", "success")
+    except: flash("Gagal reject", "error")
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/bulk', methods=['POST'])
+@admission.guard('moderation', current_wallet)
+def bulk_moderate():
+    if session.get('role') != 'admin': return "Akses Ditolak"
+    action = request.form.get('action')
+    ids = [int(i) for i in request.form.getlist('ids') if i.isdigit()]
+    if not ids: flash("Pilih minimal satu kampanye.", "error"); return redirect(url_for('admin_dashboard'))
+    try:
+        admin_wallet = web3.eth.accounts[0]
+        succeeded, failed = moderator.run(action, ids, admin_wallet)
+        invalidation_bus.publish('campaign', *ids)
+        invalidation_bus.publish('balance', admin_wallet)
+        if succeeded: flash(f"{action.capitalize()} berhasil untuk {len(succeeded)} kampanye: ID {', '.join(map(str, succeeded))}", "success")
+        if failed: flash(f"Gagal untuk {len(failed)} kampanye: " + "; ".join(f"#{i} ({reason})" for i, reason in sorted(failed.items())), "error")
+    except Exception as e:
+        print(f"Bulk Moderation Error: {e}"); flash("Gagal menjalankan aksi massal", "error")
+    return redirect(url_for('admin_dashboard', after=request.form.get('after', -1, type=int)))
+
 @app.route('/admin/delete_campaign/<int:id>')
+@admission.guard('moderation', current_wallet)
 def delete_campaign(id):
+    if session.get('role') != 'admin': return "Akses Ditolak"
     try:
         tx = contract.functions.deleteCampaign(id).transact({'from': web3.eth.accounts[0]})
-        web3.eth.wait_for_transaction_receipt(tx); flash(f"Campaign #{id} Deleted.", "success")
+        web3.eth.wait_for_transaction_receipt(tx); invalidation_bus.publish('campaign', id); invalidation_bus.publish('balance', web3.eth.accounts[0])
+        flash(f"Campaign #{id} Deleted.", "success")
     except: flash("Gagal hapus", "error")
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/admin/delete_user/<int:user_id>')
 def delete_user(user_id):
     try:
-        conn = get_db_connection(); conn.execute('DELETE FROM users WHERE id = ?', (user_id,)); conn.commit(); conn.close()
+        conn = get_db_connection()
+        user = conn.execute('SELECT wallet_address FROM users WHERE id = ?', (user_id,)).fetchone()
+        conn.execute('DELETE FROM users WHERE id = ?', (user_id,)); conn.commit()
+        if user: invalidation_bus.publish('user', user['wallet_address'])
         flash(f"User ID {user_id} dihapus.", "success")
     except: flash("Gagal hapus user", "error")
     return redirect(url_for('admin_dashboard'))
 
+# Ekspor audit: /admin/export/<transactions|donations>.<csv|ndjson>?campaign=&donor=&from_block=&to_block=&since=&until=
+# Di-stream per chunk (memori konstan). Setiap baris membawa id; lanjutkan ekspor yang terputus dengan
+# ?after=<id terakhir>&upto=<header X-Export-Upto> agar rentangnya sama dengan ekspor awal.
+@app.route('/admin/export/<any(transactions, donations):kind>.<any(csv, ndjson):fmt>')
+def admin_export(kind, fmt):
+    if session.get('role') != 'admin': return "Akses Ditolak", 403
+    try:
+        if kind == 'transactions':
+            table, fields = 'chain_events', export.TRANSACTION_FIELDS
+            columns = "id, event, campaign_id, actor, amount_wei, title, timestamp, block_number, block_hash, tx_hash, log_index"
+            where, params = export.transaction_filters(request.args)
+        else:
+            table, fields = 'donations', export.DONATION_FIELDS
+            columns = "id, blockchain_id, donor_name, amount, message, timestamp, tx_hash"
+            where, params = export.donation_filters(request.args)
+        after = max(request.args.get('after', -1, type=int), -1)
+        upto = request.args.get('upto', type=int)
+    except export.ExportError as e:
+        return str(e), 400
+    if upto is None: upto = export.head_id(get_db_connection(), table)
+    chunks = export.iter_chunks(table, columns, where, params, after, upto)
+    rows = export.transaction_rows(chunks, username_resolver.resolve_many) if kind == 'transactions' else export.donation_rows(chunks)
+    resp = app.response_class(export.encode(rows, fmt, fields), mimetype=export.FORMATS[fmt])
+    resp.headers['Content-Disposition'] = f'attachment; filename="{kind}-{datetime.now().strftime("%Y%m%d-%H%M%S")}.{fmt}"'
+    resp.headers['X-Export-Upto'] = str(upto)
+    resp.headers['Cache-Control'] = 'no-store'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+# --- 9. JSON API (v1, READ-ONLY) ---
+# Cursor = id terakhir di halaman sebelumnya. ETag dihitung dari versi blok/baris SEBELUM body dibangun,
+# jadi polling tanpa perubahan cukup dibalas 304 tanpa serialisasi data.
+
+def get_cursor_args():
+    cursor = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    return cursor, limit
+
+def api_error(message, status):
+    return jsonify(error=message), status
+
+def api_conditional(version, build):
+    etag = hashlib.sha1(repr(version).encode()).hexdigest()
+    if etag in request.if_none_match:
+        resp = app.response_class(status=304)
+    else:
+        resp = jsonify(build())
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'   # Boleh disimpan, tapi selalu revalidasi dengan ETag
+    return resp
+
+def campaign_json(c, full=False):
+    out = {
+        'id': c['id'], 'creator': c['creator'], 'title': c['title'],
+        'status': STATUS_NAMES[c['status_code']], 'funds_withdrawn': c['fundsWithdrawn'],
+        'target_wei': str(c['target_wei']), 'collected_wei': str(c['collected_wei']),
+        'deadline': c['deadline'], 'image': image_url(c['image'], 'card'),
+        'category': c['detail']['category'] if c['detail'] else 'Umum'
+    }
+    if full:
+        detail = c['detail'] or {}
+        out.update(description=c['desc'], tagline=detail.get('tagline'), usage_plan=detail.get('usage_plan'),
+                   social_link=detail.get('social_link'), image_full=image_url(c['image'], 'full'))
+    return out
+
+def latest_event_version(conn, where='', params=()):
+    # id + block_hash event terbaru: berubah saat ada event baru maupun saat reorg mengganti event
+    row = conn.execute(f"SELECT id, block_hash FROM chain_events {where} ORDER BY id DESC LIMIT 1", params).fetchone()
+    return tuple(row) if row else (0, None)
+
+@app.route('/api/v1/campaigns')
+def api_campaigns():
+    if not contract: return api_error("Blockchain tidak aktif", 503)
+    cursor, limit = get_cursor_args()
+    q, category, status = get_search_args()
+    status = status or 'approved'
+    mask = get_status_mask(status, None)
+    if mask is None: return api_error("status harus salah satu dari: " + ', '.join(STATUS_NAMES + ('all',)), 400)
+    if q or category:
+        # Hasil pencarian q diurutkan relevansi: cursor = posisi hasil terakhir, bukan id kampanye
+        ids, next_after, has_more = search_index.search(get_db_connection(), q, category, status_mask=mask,
+                                                        after=cursor if cursor is not None else -1, limit=limit)
+        page = read_model.get_many(ids)
+    else:
+        page, next_after, has_more = read_model.page(cursor if cursor is not None else -1, limit, status_mask=mask)
+    keys = get_fragment_keys(page)
+    return api_conditional(('campaigns', status, q, category, cursor, limit, next_after, has_more, [keys[c['id']] for c in page]),
+                           lambda: {'data': [campaign_json(c) for c in page], 'next_cursor': next_after if has_more else None})
+
+@app.route('/api/v1/campaigns/<int:id>')
+def api_campaign(id):
+    if not contract: return api_error("Blockchain tidak aktif", 503)
+    read_model.sync()
+    if id < 0 or id >= read_model.count: return api_error("Kampanye tidak ditemukan", 404)
+    try: c = read_model.get(id)
+    except Exception as e: return api_error(f"Gagal memuat kampanye: {e}", 502)
+    conn = get_db_connection()
+    stats = rollups.campaign_stats(conn, [id]).get(id, {})
+    def build():
+        out = campaign_json(c, full=True)
+        out.update(creator_name=get_username_by_wallet(c['creator']),
+                   donation_count=stats.get('donation_count', 0), donor_count=stats.get('donor_count', 0))
+        return out
+    return api_conditional(('campaign', get_fragment_keys([c])[id], stats.get('donation_count'), stats.get('donor_count')), build)
+
+@app.route('/api/v1/campaigns/<int:id>/donations')
+def api_campaign_donations(id):
+    cursor, limit = get_cursor_args()
+    conn = get_db_connection()
+    where = "WHERE campaign_id = ? AND event = 'DonationReceived'"
+    version = latest_event_version(conn, where, (id,))
+    def build():
+        rows = conn.execute(f"SELECT id, actor, amount_wei, timestamp, tx_hash, block_number FROM chain_events {where} "
+                            "AND id < ? ORDER BY id DESC LIMIT ?", (id, cursor if cursor is not None else 2**62, limit + 1)).fetchall()
+        names = username_resolver.resolve_many({r['actor'] for r in rows})
+        data = [{'id': r['id'], 'donor': r['actor'], 'donor_name': names.get(r['actor'], UNKNOWN_USER), 'amount_wei': r['amount_wei'],
+                 'timestamp': r['timestamp'], 'tx_hash': r['tx_hash'], 'block_number': r['block_number']} for r in rows[:limit]]
+        return {'data': data, 'next_cursor': data[-1]['id'] if len(rows) > limit else None}
+    return api_conditional(('donations', id, cursor, limit, version), build)
+
+@app.route('/api/v1/transactions')
+def api_transactions():
+    cursor, limit = get_cursor_args()
+    conn = get_db_connection()
+    where = "WHERE event IN ('DonationReceived', 'CampaignCreated')"
+    version = latest_event_version(conn, where)
+    def build():
+        rows = conn.execute(f"SELECT id, event, campaign_id, actor, amount_wei, timestamp, tx_hash, block_number FROM chain_events {where} "
+                            "AND id < ? ORDER BY id DESC LIMIT ?", (cursor if cursor is not None else 2**62, limit + 1)).fetchall()
+        names = username_resolver.resolve_many({r['actor'] for r in rows})
+        data = [{'id': r['id'], 'type': 'donation' if r['event'] == 'DonationReceived' else 'campaign_created',
+                 'campaign_id': r['campaign_id'], 'from': r['actor'], 'from_name': names.get(r['actor'], UNKNOWN_USER),
+                 'amount_wei': r['amount_wei'], 'timestamp': r['timestamp'], 'tx_hash': r['tx_hash'], 'block_number': r['block_number']}
+                for r in rows[:limit]]
+        return {'data': data, 'next_cursor': data[-1]['id'] if len(rows) > limit else None}
+    return api_conditional(('transactions', cursor, limit, version), build)
+
+# --- 10. LIVE FEED (SERVER-SENT EVENTS) ---
+# Browser membuka EventSource; saat reconnect browser mengirim Last-Event-ID dan pesan yang
+# terlewat diputar ulang dari database sebelum stream live dilanjutkan.
+def sse_response(campaign_id):
+    sub, replay = live_feed.subscribe(campaign_id, request.headers.get('Last-Event-ID'))
+    resp = app.response_class(live_feed.stream(sub, replay), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'   # Nginx: jangan buffer stream
+    return resp
+
+@app.route('/stream/campaign/<int:id>')
+def stream_campaign(id):
+    return sse_response(id)
+
+@app.route('/stream/admin')
+def stream_admin():
+    if session.get('role') != 'admin': return "Akses Ditolak", 403
+    return sse_response(None)
+
+# --- 11. MULTI-PROSES (GUNICORN, lihat gunicorn.conf.py) ---
+# Dengan preload_app, modul ini di-import sekali di master: migrasi skema, seed admin & cache ABI
+# kontrak hanya dijalankan sekali, lalu setiap worker di-fork dari hasilnya.
+def preload():
+    # Resolve alamat kontrak sebelum fork, supaya worker tidak masing-masing menghubungi node saat start
+    if contract:
+        try: contract.address
+        except Exception as e: print(f"Preload: kontrak belum tersedia ({e}), di-resolve saat request pertama")
+
+def after_fork():
+    # Socket HTTP keep-alive & koneksi SQLite milik master tidak boleh dipakai bersama oleh worker
+    db.reset_after_fork()
+    if web3 and hasattr(web3.provider, 'reset'): web3.provider.reset()
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
 
+@app.errorhandler(ContractUnavailable)
+@app.errorhandler(requests.exceptions.ConnectionError)
+@app.errorhandler(requests.exceptions.Timeout)
+def contract_unavailable(e):
+    # Node/kontrak belum bisa dihubungi (registry lazy di contract_data): API 503, halaman kembali ke beranda
+    if request.path.startswith('/api/'):
+        resp, status = api_error(f"Blockchain tidak tersedia: {e}", 503)
+        resp.headers['Retry-After'] = '5'
+        return resp, status
+    if request.endpoint == 'index': return "Blockchain tidak tersedia", 503
+    flash(f"Blockchain belum tersedia: {e}", "error")
+    return redirect(url_for('index'))
+
+@app.errorhandler(429)
+def too_many_requests(e):
+    # Dari admission control: endpoint tulis sedang penuh, browser/klien diminta mencoba lagi
+    retry_after = getattr(e, 'retry_after', None) or 1
+    return render_template('429.html', retry_after=retry_after), 429, {'Retry-After': str(retry_after)}
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
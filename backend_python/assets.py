@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from flask import abort, request, send_file, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:   # Opsional: tanpa modul brotli hanya dibuat .gz
+    brotli = None
+
+# --- KONFIGURASI ASET STATIS ---
+DIST_DIR = 'dist'                                   # Output di dalam folder static
+MANIFEST_NAME = 'manifest.json'
+SKIP_DIRS = {DIST_DIR, os.path.join('uploads', 'media')}   # Hasil build & gambar per hash (sudah immutable)
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.map', '.html', '.xml', '.ico'}
+MIN_COMPRESS_BYTES = 256
+IMMUTABLE_MAX_AGE = 31536000
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))       # Urutan preferensi
+
+
+def _sources(static_root):
+    for folder, dirs, files in os.walk(static_root):
+        rel_folder = os.path.relpath(folder, static_root)
+        dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(rel_folder, d)) not in SKIP_DIRS]
+        for name in files:
+            yield os.path.normpath(os.path.join(rel_folder, name)).replace(os.sep, '/')
+
+def _fingerprint(rel_path, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    base, ext = os.path.splitext(rel_path)
+    return f"{base}.{digest}{ext}"
+
+
+# --- BUILD (python assets.py, atau otomatis saat start jika ada file yang berubah) ---
+def build(static_root):
+    """Salin setiap aset ke static/dist/<nama>.<hash>.<ext>, buat .gz/.br, tulis manifest."""
+    dist_root = os.path.join(static_root, DIST_DIR)
+    manifest = {}
+    for rel_path in _sources(static_root):
+        with open(os.path.join(static_root, rel_path), 'rb') as f:
+            data = f.read()
+        hashed = _fingerprint(rel_path, data)
+        manifest[rel_path] = f"{DIST_DIR}/{hashed}"
+        target = os.path.join(dist_root, hashed)
+        if os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        if os.path.splitext(rel_path)[1].lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+            with open(target + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + '.br', 'wb') as f:
+                    f.write(brotli.compress(data, quality=11))
+
+    # Hapus hasil build lama yang tidak lagi direferensikan
+    current = {os.path.join(static_root, *p.split('/')) for p in manifest.values()}
+    for folder, _, files in os.walk(dist_root):
+        for name in files:
+            path = os.path.join(folder, name)
+            original = path[:-3] if path.endswith(('.gz', '.br')) else path
+            if name != MANIFEST_NAME and original not in current:
+                os.remove(path)
+
+    tmp = os.path.join(dist_root, MANIFEST_NAME + '.tmp')
+    os.makedirs(dist_root, exist_ok=True)
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(dist_root, MANIFEST_NAME))
+    return manifest
+
+def is_stale(static_root):
+    manifest_path = os.path.join(static_root, DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return True
+    built_at = os.path.getmtime(manifest_path)
+    return any(os.path.getmtime(os.path.join(static_root, p)) > built_at for p in _sources(static_root))
+
+def load_manifest(static_root):
+    try:
+        with open(os.path.join(static_root, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# --- INTEGRASI FLASK ---
+def init_app(app):
+    static_root = app.static_folder
+    if is_stale(static_root):
+        try:
+            build(static_root)
+        except OSError as e:
+            print(f"Asset Build Error: {e}")
+    manifest = load_manifest(static_root)
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        # url_for('static', filename='css/style.css') -> /static/dist/css/style.<hash>.css
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def serve_static(filename):
+        if not filename.startswith(DIST_DIR + '/'):
+            return app.send_static_file(filename)
+        # Nama berisi hash -> aman di-cache selamanya; kirim versi terkompresi jika diterima browser
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        # safe_join menolak '..' / path absolut: yang disajikan hanya file di dalam static/dist
+        path = safe_join(os.path.join(static_root, DIST_DIR), filename[len(DIST_DIR) + 1:])
+        if path is None:
+            abort(404)
+        resp = None
+        for encoding, suffix in ENCODINGS:
+            if request.accept_encodings.quality(encoding) > 0 and os.path.isfile(path + suffix):
+                resp = send_file(path + suffix, mimetype=mimetype, conditional=True, max_age=IMMUTABLE_MAX_AGE)
+                resp.headers['Content-Encoding'] = encoding
+                break
+        if resp is None:
+            resp = send_from_directory(static_root, filename, max_age=IMMUTABLE_MAX_AGE)
+        resp.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        resp.vary.add('Accept-Encoding')
+        return resp
+
+    app.view_functions['static'] = serve_static
+    return manifest
+
+
+if __name__ == '__main__':
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    print(f"Aset: {len(build(root))} file di-fingerprint ke static/{DIST_DIR}/")
@@ -0,0 +1,302 @@
+"""Benchmark aplikasi Flask terhadap chain in-process (eth-tester), tanpa Ganache.
+
+Contoh (dari folder backend_python):
+    pip install "eth-tester[py-evm]"
+    python benchmark.py --campaigns 200 --donations 1000 --requests 300 --concurrency 8
+    python benchmark.py --compare instance/benchmarks/<hasil-lama>.json
+
+Kontrak DonationPlatform di-deploy dari artifact Truffle (build/contracts) ke chain baru, database
+memakai file sementara, lalu setiap skenario dijalankan bersamaan oleh beberapa thread. Hasil
+(p50/p99, throughput, RPC & SQL per request) ditulis sebagai JSON supaya bisa dibandingkan antar commit.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from web3 import EthereumTesterProvider
+    import eth_tester  # noqa: F401  (EthereumTesterProvider butuh eth-tester + py-evm)
+except ImportError:
+    EthereumTesterProvider = None
+
+# --- KONFIGURASI BENCHMARK ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, 'instance', 'benchmarks')
+CATEGORIES = ('Kemanusiaan', 'Pendidikan', 'Kesehatan', 'Bencana Alam', 'Hewan', 'Teknologi', 'Lainnya')
+TARGET_ETH = 50
+DONATION_ETH = 0.01
+CAMPAIGN_MINUTES = 60 * 24 * 30
+
+# Nama skenario -> (method, path, role sesi)
+SCENARIOS = {
+    'index': ('GET', '/', None),
+    'dashboard': ('GET', '/dashboard', 'donatur'),
+    'campaign_detail': ('GET', '/campaign/{id}', None),
+    'admin': ('GET', '/admin', 'admin'),
+    'donate': ('POST', '/donate/{id}', 'donatur'),
+    'basket_checkout': ('POST', '/basket/checkout', 'donatur'),
+}
+BASKET_SIZE = 3
+# Fungsi kontrak yang mempercepat jalur tertentu; artifact lama (belum truffle compile) mengukur fallback-nya
+CONTRACT_FEATURES = {
+    'getCampaignSummaries': 'daftar kampanye lewat view ringkasan',
+    'approveCampaigns': 'moderasi batch',
+    'donateToCampaigns': 'donasi keranjang satu transaksi',
+}
+
+
+def percentile(values, p):
+    # Nearest-rank: hasil selalu salah satu sampel asli
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+
+class LockedTesterProvider(EthereumTesterProvider or object):
+    """EthereumTesterProvider yang aman dipakai banyak thread (py-evm tidak thread-safe)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def make_request(self, method, params):
+        with self._lock:
+            return super().make_request(method, params)
+
+
+# --- SETUP CHAIN & APLIKASI ---
+def boot(db_path, artifact_path=None):
+    """Deploy kontrak ke chain in-process lalu import app yang memakai chain tersebut."""
+    os.environ['DATABASE_PATH'] = db_path
+    os.chdir(BASE_DIR)
+    sys.path.insert(0, BASE_DIR)
+    from web3 import Web3
+    import contract_data
+
+    w3 = Web3(LockedTesterProvider())
+    with open(artifact_path or contract_data.ARTIFACT_PATH) as f:
+        artifact = json.load(f)
+    factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+    receipt = w3.eth.wait_for_transaction_receipt(factory.constructor().transact({'from': w3.eth.accounts[0]}))
+    # app.py membaca `contract` & `web3` dari contract_data saat import
+    contract_data.web3 = w3
+    contract_data.contract = w3.eth.contract(address=receipt.contractAddress, abi=artifact['abi'])
+
+    import app
+    return app, w3, contract_data.contract
+
+def contract_features(contract):
+    names = {f.get('name') for f in contract.abi if f.get('type') == 'function'}
+    return {fn: fn in names for fn in CONTRACT_FEATURES}
+
+def seed(app, w3, contract, campaigns, donations, rng):
+    """Buat kampanye (semua di-approve) + donasi langsung ke chain, dan akun donatur di SQLite."""
+    accounts = w3.eth.accounts
+    admin, creator, donors = accounts[0], accounts[1], accounts[2:]
+    keys = {k.public_key.to_checksum_address(): k.to_hex() for k in w3.provider.ethereum_tester.backend.account_keys}
+    conn = app.db.connect()
+    for i in range(campaigns):
+        contract.functions.createCampaign(f'Kampanye Benchmark {i}', f'Deskripsi kampanye benchmark nomor {i}. ' * 5,
+                                          w3.to_wei(TARGET_ETH, 'ether'), '', CAMPAIGN_MINUTES).transact({'from': creator})
+        contract.functions.approveCampaign(i).transact({'from': admin})
+        conn.execute('INSERT INTO campaign_details (blockchain_id, category, usage_plan, social_link, tagline) VALUES (?, ?, ?, ?, ?)',
+                     (i, rng.choice(CATEGORIES), 'Rencana penggunaan dana', '', f'Tagline kampanye {i}'))
+    for n in range(donations):
+        cid = rng.randrange(campaigns)
+        contract.functions.donateToCampaign(cid).transact({'from': donors[n % len(donors)], 'value': w3.to_wei(DONATION_ETH, 'ether')})
+        conn.execute('INSERT INTO donations (blockchain_id, donor_name, amount, message, timestamp) VALUES (?, ?, ?, ?, ?)',
+                     (cid, f'donatur{n % len(donors)}', str(DONATION_ETH), 'Semangat!', time.strftime("%d %b %Y, %H:%M")))
+    users = {}
+    for n, wallet in enumerate(donors):
+        cur = conn.execute("INSERT INTO users (username, email, password, role, wallet_address, private_key, profile_pic) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (f'donatur{n}', f'donatur{n}@bench.local', 'bench', 'donatur', wallet, keys[wallet], 'default_user.png'))
+        users.setdefault('donatur', []).append({'user_id': cur.lastrowid, 'username': f'donatur{n}', 'role': 'donatur', 'wallet': wallet})
+    row = conn.execute("SELECT id, username, wallet_address FROM users WHERE role = 'admin'").fetchone()
+    users['admin'] = [{'user_id': row['id'], 'username': row['username'], 'role': 'admin', 'wallet': row['wallet_address']}]
+    conn.commit()
+    conn.close()
+    # Index semua event seed sebelum mengukur (indexer di background hanya menyusul blok baru)
+    if app.indexer:
+        app.indexer.poll_once()
+    return users
+
+
+# --- PENGUKURAN ---
+def install_call_capture(flask_app):
+    """Salin hitungan RPC/SQL per request dari metrics ke thread-local sebelum metrics membuangnya.
+
+    after_request dijalankan terbalik dari urutan pendaftaran, jadi hook ini jalan sebelum hook metrics.
+    """
+    from flask import g
+    local = threading.local()
+
+    @flask_app.after_request
+    def capture_calls(response):
+        tally = g.get('metrics_tally')
+        local.calls = (sum(tally['rpc'].values()), tally['sql']) if tally else (0, 0)
+        return response
+    return local
+
+def run_scenario(flask_app, captured, name, total, concurrency, campaign_ids, users, rng):
+    method, path, role = SCENARIOS[name]
+    clients = threading.local()
+    plan = [(path.format(id=rng.choice(campaign_ids)), rng.choice(users[role]) if role else None,
+             {str(i): str(DONATION_ETH) for i in rng.sample(campaign_ids, min(BASKET_SIZE, len(campaign_ids)))})
+            for _ in range(total)]
+
+    def one(item):
+        url, user, basket = item
+        client = getattr(clients, 'client', None)
+        if client is None:
+            client = clients.client = flask_app.test_client()
+        with client.session_transaction() as sess:
+            sess.clear()
+            if user: sess.update(user)
+            if name == 'basket_checkout': sess['basket'] = basket
+        data = {'amount': str(DONATION_ETH), 'message': 'benchmark'} if method == 'POST' else None
+        start = time.perf_counter()
+        resp = client.open(url, method=method, data=data)
+        elapsed = time.perf_counter() - start
+        resp.close()
+        rpc, sql = getattr(captured, 'calls', (0, 0))
+        return elapsed, resp.status_code, rpc, sql
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, plan))
+    wall = time.perf_counter() - started
+
+    latencies = [s[0] for s in samples]
+    rpc = [s[2] for s in samples]
+    sql = [s[3] for s in samples]
+    statuses = {}
+    for s in samples:
+        statuses[str(s[1])] = statuses.get(str(s[1]), 0) + 1
+    return {
+        'requests': total, 'concurrency': concurrency, 'wall_seconds': round(wall, 4),
+        'throughput_rps': round(total / wall, 2) if wall else None,
+        'latency_ms': {'p50': round(percentile(latencies, 50) * 1000, 3), 'p90': round(percentile(latencies, 90) * 1000, 3),
+                       'p99': round(percentile(latencies, 99) * 1000, 3), 'max': round(max(latencies) * 1000, 3),
+                       'mean': round(sum(latencies) / total * 1000, 3)},
+        'rpc_per_request': {'mean': round(sum(rpc) / total, 2), 'max': max(rpc)},
+        'sql_per_request': {'mean': round(sum(sql) / total, 2), 'max': max(sql)},
+        'status': statuses,
+        'errors': sum(n for code, n in statuses.items() if code.startswith('5')),
+    }
+
+
+def wait_for_jobs(app, timeout=60):
+    # Donasi dikonfirmasi di thread tx-receipt; tunggu sebelum database sementara dihapus
+    from tx_pipeline import STATUS_SUBMITTED
+    conn = app.db.connect()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            pending = conn.execute("SELECT COUNT(*) FROM tx_jobs WHERE status = ?", (STATUS_SUBMITTED,)).fetchone()[0]
+            if not pending or time.monotonic() > deadline:
+                return pending
+            time.sleep(0.2)
+    finally:
+        conn.close()
+
+
+# --- LAPORAN ---
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def print_table(results, baseline=None):
+    print(f"{'skenario':<16}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'rpc/req':>9}{'sql/req':>9}{'5xx':>6}")
+    for name, r in results.items():
+        line = (f"{name:<16}{r['throughput_rps']:>9}{r['latency_ms']['p50']:>10}{r['latency_ms']['p99']:>10}"
+                f"{r['rpc_per_request']['mean']:>9}{r['sql_per_request']['mean']:>9}{r['errors']:>6}")
+        old = (baseline or {}).get(name)
+        if old:
+            delta = lambda new, prev: f"{(new - prev) / prev * 100:+.0f}%" if prev else 'n/a'
+            line += (f"   (vs baseline: req/s {delta(r['throughput_rps'], old['throughput_rps'])}, "
+                     f"p50 {delta(r['latency_ms']['p50'], old['latency_ms']['p50'])}, p99 {delta(r['latency_ms']['p99'], old['latency_ms']['p99'])})")
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DonasiKuy terhadap chain in-process (eth-tester).")
+    parser.add_argument('--campaigns', type=int, default=100, help="Jumlah kampanye yang di-seed")
+    parser.add_argument('--donations', type=int, default=500, help="Jumlah donasi yang di-seed")
+    parser.add_argument('--requests', type=int, default=200, help="Request per skenario")
+    parser.add_argument('--concurrency', type=int, default=8, help="Thread klien bersamaan")
+    parser.add_argument('--warmup', type=int, default=20, help="Request pemanasan per skenario (tidak diukur)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Daftar skenario dipisah koma")
+    parser.add_argument('--seed', type=int, default=1, help="Seed acak (kampanye & urutan request)")
+    parser.add_argument('--output', help="File JSON hasil (default: instance/benchmarks/<commit>-<waktu>.json)")
+    parser.add_argument('--compare', help="File JSON hasil sebelumnya sebagai pembanding")
+    parser.add_argument('--artifact', help="Artifact Truffle yang di-deploy (default: build/contracts/DonationPlatform.json)")
+    args = parser.parse_args()
+
+    if EthereumTesterProvider is None:
+        sys.exit('Benchmark butuh eth-tester: pip install "eth-tester[py-evm]"')
+    names = [n.strip() for n in args.scenarios.split(',') if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Skenario tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(SCENARIOS)})")
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(prefix='donasikuy-bench-') as tmp:
+        app, w3, contract = boot(os.path.join(tmp, 'bench.db'), args.artifact)
+        features = contract_features(contract)
+        missing = [fn for fn, present in features.items() if not present]
+        if missing:
+            print("Peringatan: artifact belum memuat " + ', '.join(f"{fn} ({CONTRACT_FEATURES[fn]})" for fn in missing)
+                  + " -> yang diukur jalur fallback. Jalankan truffle compile atau pakai --artifact.")
+        print(f"Seed: {args.campaigns} kampanye, {args.donations} donasi ...")
+        started = time.perf_counter()
+        users = seed(app, w3, contract, args.campaigns, args.donations, rng)
+        print(f"Seed selesai dalam {time.perf_counter() - started:.1f} detik")
+
+        flask_app = app.app
+        captured = install_call_capture(flask_app)
+        campaign_ids = list(range(args.campaigns))
+        results = {}
+        for name in names:
+            if args.warmup:
+                run_scenario(flask_app, captured, name, args.warmup, args.concurrency, campaign_ids, users, rng)
+            results[name] = run_scenario(flask_app, captured, name, args.requests, args.concurrency, campaign_ids, users, rng)
+            print(f"  {name}: {results[name]['throughput_rps']} req/s, p99 {results[name]['latency_ms']['p99']} ms")
+        pending = wait_for_jobs(app)
+        if pending:
+            print(f"Peringatan: {pending} transaksi donasi belum terkonfirmasi saat benchmark selesai")
+
+    commit = git_commit()
+    report = {
+        'commit': commit, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+        'config': {k: getattr(args, k) for k in ('campaigns', 'donations', 'requests', 'concurrency', 'warmup', 'seed')},
+        'contract_features': features,
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'nocommit'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        baseline = previous.get('results')
+        if previous.get('contract_features', features) != features:
+            print(f"Catatan: fungsi kontrak berbeda dari baseline ({previous.get('contract_features')} vs {features})")
+    print()
+    print_table(results, baseline)
+    print(f"\nHasil: {output}")
+
+
+if __name__ == '__main__':
+    main()
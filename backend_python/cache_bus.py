@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+import uuid
+import db
+
+# --- KONFIGURASI BUS INVALIDASI ---
+# Cache in-process (read model kampanye, username, saldo) ada di setiap worker gunicorn. Perubahan
+# dicatat ke tabel SQLite `cache_invalidations`; worker lain membacanya di awal request (paling
+# sering sekali per BUS_POLL_INTERVAL) lalu membuang entri yang sama dari cache-nya sendiri.
+BUS_POLL_INTERVAL = float(os.environ.get('CACHE_BUS_INTERVAL', '0.5'))   # Detik
+BUS_RETENTION = 3600       # Detik; pesan lebih lama dihapus
+PRUNE_INTERVAL = 60        # Detik antar pembersihan
+POLL_BATCH = 1000
+
+
+class InvalidationBus:
+    """Pub/sub invalidasi antar proses lewat SQLite.
+
+    `publish` langsung menerapkan invalidasi di proses ini lalu mencatatnya untuk proses lain.
+    Handler menerima key (string) atau None = buang seluruh cache scope tersebut (dipakai jika
+    worker tertinggal lebih lama dari BUS_RETENTION sehingga sebagian pesan sudah terhapus).
+    """
+
+    def __init__(self, poll_interval=BUS_POLL_INTERVAL, retention=BUS_RETENTION):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._handlers = {}
+        self._pid = None
+        self._origin = None
+        self._cursor = 0
+        self._next_poll = 0
+        self._next_prune = 0
+        self._lock = threading.Lock()
+        self.counters = {'published': 0, 'received': 0, 'flushes': 0}
+
+    def subscribe(self, scope, handler):
+        self._handlers.setdefault(scope, []).append(handler)
+
+    def _apply(self, scope, key):
+        for handler in self._handlers.get(scope, ()):
+            try:
+                handler(key)
+            except Exception as e:
+                print(f"Cache Bus Error ({scope}): {e}")
+
+    def _flush_all(self):
+        self.counters['flushes'] += 1
+        for scope in self._handlers:
+            self._apply(scope, None)
+
+    def _ensure_process(self, conn):
+        # Objek dibuat sebelum fork (preload gunicorn) -> identitas & cursor ditetapkan per proses
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._origin = f"{self._pid}-{uuid.uuid4().hex[:8]}"
+        self._cursor = conn.execute("SELECT COALESCE(MAX(id), 0) FROM cache_invalidations").fetchone()[0]
+
+    # --- PUBLISH ---
+    def publish(self, scope, *keys):
+        keys = [str(k) for k in keys if k is not None]
+        for key in keys:
+            self._apply(scope, key)
+        if not keys:
+            return
+        try:
+            conn = db.get_connection()
+            with self._lock:
+                self._ensure_process(conn)
+            now = time.time()
+            conn.executemany("INSERT INTO cache_invalidations (scope, key, origin, created_at) VALUES (?, ?, ?, ?)",
+                             [(scope, key, self._origin, now) for key in keys])
+            conn.commit()
+            self.counters['published'] += len(keys)
+        except Exception as e:
+            # Cache lokal sudah bersih; worker lain menyusul lewat event indexer / TTL
+            print(f"Cache Bus Error (publish {scope}): {e}")
+
+    # --- POLL ---
+    def poll(self, force=False):
+        """Terapkan invalidasi dari proses lain. Mengembalikan jumlah pesan yang diterapkan."""
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return 0
+        if not self._lock.acquire(blocking=False):
+            return 0   # Thread lain di proses ini sedang polling
+        try:
+            self._next_poll = now + self.poll_interval
+            conn = db.get_connection()
+            self._ensure_process(conn)
+            applied = 0
+            while True:
+                rows = conn.execute("SELECT id, scope, key, origin FROM cache_invalidations WHERE id > ? ORDER BY id LIMIT ?",
+                                    (self._cursor, POLL_BATCH)).fetchall()
+                if not rows:
+                    break
+                if rows[0]['id'] > self._cursor + 1 and self._cursor:
+                    # Ada pesan yang sudah dihapus sebelum sempat dibaca -> anggap semua cache basi
+                    self._flush_all()
+                for r in rows:
+                    if r['origin'] != self._origin:
+                        self._apply(r['scope'], r['key'])
+                        applied += 1
+                self._cursor = rows[-1]['id']
+            self.counters['received'] += applied
+            if now >= self._next_prune:
+                self._next_prune = now + PRUNE_INTERVAL
+                conn.execute("DELETE FROM cache_invalidations WHERE created_at < ?", (time.time() - self.retention,))
+                conn.commit()
+            return applied
+        finally:
+            self._lock.release()
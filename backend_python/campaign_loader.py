@@ -0,0 +1,138 @@
+import os
+import time
+import requests
+import metrics
+from hexbytes import HexBytes
+from eth_utils import collapse_if_tuple
+
+# --- KONFIGURASI LOADER ---
+# Jumlah eth_call yang digabung dalam satu HTTP request (JSON-RPC batch)
+CHUNK_SIZE = int(os.environ.get('CAMPAIGN_BATCH_SIZE', '50'))
+BATCH_TIMEOUT = 15
+
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+STATUS_MASK_ALL = 0b1111   # PENDING | APPROVED | REJECTED | DELETED
+
+
+def is_listed(status, owner, status_mask, creator=None):
+    # Sama dengan DonationPlatform._isListed: status ada di mask, atau milik creator (kecuali DELETED)
+    if status_mask & (1 << status):
+        return True
+    return bool(creator) and owner == creator and status != 3
+
+
+class CampaignLoader:
+    """Membaca banyak struct Campaign sekaligus lewat JSON-RPC batch (1 round trip per chunk)."""
+
+    def __init__(self, web3, contract, chunk_size=CHUNK_SIZE):
+        self.web3 = web3
+        self.contract = contract
+        self.chunk_size = max(1, chunk_size)
+        self._session = requests.Session()
+        self._abi = None
+        self._output_types = None
+
+    # --- TURUNAN ABI ---
+    # Dibaca dari contract.abi saat dipakai (tanpa node): registry memuat ABI baru setelah truffle migrate --reset
+    @property
+    def output_types(self):
+        abi = self.contract.abi
+        if abi is not self._abi:
+            getter = next(f for f in abi if f.get('type') == 'function' and f.get('name') == 'getCampaign')
+            self._output_types = [collapse_if_tuple(o) for o in getter['outputs']]   # mis. ['(uint256,address,string,...)']
+            self._abi = abi
+        return self._output_types
+
+    @property
+    def has_summaries(self):
+        # View getCampaignSummaries hanya ada setelah kontrak di-deploy ulang (truffle migrate --reset)
+        return any(f.get('name') == 'getCampaignSummaries' for f in self.contract.abi)
+
+    def _endpoint(self):
+        # Batch hanya bisa lewat provider HTTP; provider lain (IPC, tester) pakai fallback sekuensial.
+        # NodePool (providers.py) memilih endpoint baca yang sehat & memakai pool keep-alive-nya.
+        provider = self.web3.provider
+        if hasattr(provider, 'batch_endpoint'):
+            return provider.batch_endpoint()
+        uri = getattr(provider, 'endpoint_uri', None)
+        return (uri, self._session) if uri else None
+
+    def load(self, ids, block_identifier='latest'):
+        """Mengembalikan (campaigns, errors): dict id -> tuple Campaign dan dict id -> pesan error."""
+        ids = list(ids)
+        campaigns, errors = {}, {}
+        if block_identifier == 'latest' and len(ids) > self.chunk_size:
+            # Semua chunk dibaca pada blok yang sama agar hasilnya konsisten
+            block_identifier = self.web3.eth.block_number
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            try:
+                endpoint = self._endpoint()
+                if endpoint:
+                    self._load_batch(endpoint, chunk, block_identifier, campaigns, errors)
+                else:
+                    self._load_sequential(chunk, block_identifier, campaigns, errors)
+            except Exception as e:
+                # Seluruh chunk gagal (node mati / timeout) -> tandai per kampanye
+                for i in chunk:
+                    if i not in campaigns: errors[i] = str(e)
+        return campaigns, errors
+
+    def load_page(self, after, limit, count, status_mask=STATUS_MASK_ALL, creator=None):
+        """Keyset pagination lewat view getCampaignSummaries: kampanye yang lolos filter dengan id > after.
+
+        Mengembalikan (rows, next_after, has_more). Baris ringkasan tidak membawa description
+        (index 3 bernilai None). Hanya tersedia jika `has_summaries`.
+        """
+        summaries, next_id = self.contract.functions.getCampaignSummaries(
+            after + 1, limit, status_mask, creator or ZERO_ADDRESS).call()
+        rows = [(s[0], s[1], s[2], None, s[3], s[4], s[5], s[6], s[7], s[8]) for s in summaries]
+        return rows, next_id - 1, next_id < count
+
+    def load_one(self, campaign_id):
+        campaigns, errors = self.load([campaign_id])
+        if campaign_id in errors:
+            raise RuntimeError(errors[campaign_id])
+        return campaigns[campaign_id]
+
+    def _load_sequential(self, chunk, block_identifier, campaigns, errors):
+        for i in chunk:
+            try:
+                campaigns[i] = self.contract.functions.getCampaign(i).call(block_identifier=block_identifier)
+            except Exception as e:
+                errors[i] = str(e)
+
+    def _load_batch(self, endpoint, chunk, block_identifier, campaigns, errors):
+        block_param = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+        payload = [{
+            'jsonrpc': '2.0', 'id': i, 'method': 'eth_call',
+            'params': [{'to': self.contract.address, 'data': self.contract.encodeABI(fn_name='getCampaign', args=[i])}, block_param]
+        } for i in chunk]
+        # Batch dikirim langsung lewat HTTP (bukan provider web3) -> dicatat manual ke metrik
+        start = time.perf_counter()
+        try:
+            uri, session = endpoint
+            resp = session.post(uri, json=payload, timeout=BATCH_TIMEOUT)
+            resp.raise_for_status()
+        except Exception:
+            metrics.record_rpc('eth_call(batch)', time.perf_counter() - start, error=True, calls=len(chunk))
+            raise
+        metrics.record_rpc('eth_call(batch)', time.perf_counter() - start, calls=len(chunk))
+        replies = resp.json()
+        if isinstance(replies, dict):
+            # Node tidak mendukung batch -> satu error untuk seluruh request
+            raise RuntimeError(replies.get('error', {}).get('message', 'Batch JSON-RPC ditolak node'))
+        by_id = {r.get('id'): r for r in replies}
+        for i in chunk:
+            reply = by_id.get(i)
+            if reply is None:
+                errors[i] = 'Tidak ada respons dari node'
+            elif 'error' in reply:
+                errors[i] = reply['error'].get('message', str(reply['error']))
+            else:
+                try:
+                    c = list(self.web3.codec.decode(self.output_types, HexBytes(reply['result']))[0])
+                    c[1] = self.web3.to_checksum_address(c[1])  # Samakan format dengan contract.call()
+                    campaigns[i] = tuple(c)
+                except Exception as e:
+                    errors[i] = f"Gagal decode: {e}"
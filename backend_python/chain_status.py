@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+# --- KONFIGURASI CACHE STATUS CHAIN ---
+STATUS_TTL = float(os.environ.get('CHAIN_STATUS_TTL', '3'))      # Block number & gas price
+BALANCE_TTL = float(os.environ.get('BALANCE_CACHE_TTL', '15'))   # Saldo per wallet
+BREAKER_THRESHOLD = 3     # Jumlah kegagalan beruntun sebelum circuit breaker terbuka
+BREAKER_COOLDOWN = 15     # Detik sebelum mencoba node lagi
+
+
+class CircuitBreaker:
+    """Setelah beberapa kegagalan beruntun, tolak panggilan ke node sampai cooldown habis."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # Half-open: izinkan satu percobaan, buka lagi jika masih gagal
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+class ChainStatus:
+    """Status node (block, gas, saldo) yang dibagikan ke semua render template."""
+
+    def __init__(self, web3, status_ttl=STATUS_TTL, balance_ttl=BALANCE_TTL):
+        self.web3 = web3
+        self.status_ttl = status_ttl
+        self.balance_ttl = balance_ttl
+        self.breaker = CircuitBreaker()
+        self._status = None
+        self._status_expires = 0
+        self._balances = {}
+        self._lock = threading.Lock()
+
+    def _node_status(self):
+        now = time.monotonic()
+        if self._status is not None and now < self._status_expires:
+            return self._status
+        with self._lock:
+            if self._status is not None and time.monotonic() < self._status_expires:
+                return self._status
+            if not self.breaker.allow():
+                return None
+            try:
+                block_number = self.web3.eth.block_number
+                gas_wei = self.web3.eth.gas_price
+                self.breaker.success()
+            except Exception:
+                self.breaker.failure()
+                self._status = None
+                return None
+            if self._status is None or block_number != self._status['block_number']:
+                # Blok baru -> saldo di cache mungkin sudah berubah
+                self._balances.clear()
+            self._status = {'block_number': block_number, 'gas_wei': gas_wei}
+            self._status_expires = time.monotonic() + self.status_ttl
+            return self._status
+
+    def gas_price(self):
+        """Gas price (wei) dari cache; jatuh ke RPC langsung jika cache kosong."""
+        node = self._node_status()
+        return node['gas_wei'] if node else self.web3.eth.gas_price
+
+    def get_balance(self, wallet):
+        """Saldo wallet dalam wei (None jika node tidak tersedia)."""
+        cached = self._balances.get(wallet)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
+        if not self.breaker.allow():
+            return None
+        try:
+            balance = self.web3.eth.get_balance(wallet)
+            self.breaker.success()
+        except Exception:
+            self.breaker.failure()
+            return None
+        self._balances[wallet] = (balance, time.monotonic() + self.balance_ttl)
+        return balance
+
+    def invalidate_wallet(self, wallet):
+        # Dipanggil setelah wallet mengirim transaksi lewat aplikasi; None = semua wallet
+        if wallet is None:
+            self._balances.clear()
+        else:
+            self._balances.pop(wallet, None)
+
+    def snapshot(self, wallet=None):
+        status = {'connected': False, 'user_balance': '0.0000', 'gas_price': '0', 'block_number': '0'}
+        if self.web3 is None:
+            return status
+        node = self._node_status()
+        if node is None:
+            return status
+        status['connected'] = True
+        status['block_number'] = node['block_number']
+        status['gas_price'] = "{:.1f}".format(self.web3.from_wei(node['gas_wei'], 'gwei'))
+        if wallet:
+            bal_wei = self.get_balance(wallet)
+            status['user_balance'] = "{:.4f}".format(float(self.web3.from_wei(bal_wei, 'ether'))) if bal_wei is not None else "Err"
+        return status
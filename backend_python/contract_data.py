@@ -1,81 +1,187 @@
 import json
 import os
+import threading
+import time
+from dotenv import load_dotenv
 from web3 import Web3
 
 # --- KONFIGURASI PENTING ---
-# Cek di Aplikasi Ganache bagian atas "RPC SERVER"
-# Jika di aplikasi tertulis 8545, ganti angka di bawah jadi 8545
-GANACHE_URL = "http://127.0.0.1:7545" 
-
-# Setup Koneksi Web3
-web3 = Web3(Web3.HTTPProvider(GANACHE_URL))
-
-def get_contract_info():
-    print("-" * 50)
-    print(f"🔍 DEBUGGING SMART CONTRACT CONNECTION ke {GANACHE_URL}...")
-    
-    # 1. Cek Koneksi Ganache
-    if not web3.is_connected():
-        print("❌ GAGAL: Tidak bisa terhubung ke Ganache.")
-        print(f"   Pastikan Ganache menyala dan RPC SERVER di aplikasi sama dengan {GANACHE_URL}")
-        return None, None
-    else:
-        print(f"✅ Ganache Terhubung. Network ID: {web3.eth.chain_id}")
-
-    # 2. Mencari File JSON (Logika Path Absolut yang Lebih Kuat)
-    # Mencari folder 'build' di folder utama (donation_truffle)
-    # Struktur: donation_truffle/build/contracts/DonationPlatform.json
-    
-    current_dir = os.path.dirname(os.path.abspath(__file__)) # Folder backend_python
-    root_dir = os.path.dirname(current_dir) # Folder donation_truffle
-    json_path = os.path.join(root_dir, 'build', 'contracts', 'DonationPlatform.json')
-    
-    print(f"📂 Mencari file JSON di: {json_path}")
-
-    if not os.path.exists(json_path):
-        print("❌ GAGAL: File JSON tidak ditemukan!")
-        print("👉 SOLUSI: Buka terminal baru di folder 'donation_truffle', lalu ketik:")
-        print("   truffle migrate --reset")
-        return None, None
-    
-    print("✅ File JSON ditemukan.")
-
-    # 3. Membaca JSON & Mencocokkan Network
+# Diatur lewat backend_python/.env (lihat GANACHE_URL di aplikasi Ganache bagian "RPC SERVER")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))                       # Folder backend_python
+load_dotenv(os.path.join(BASE_DIR, '.env'))
+from providers import build_provider   # Setelah .env dimuat: konfigurasi WEB3_* dibaca saat import
+
+GANACHE_URL = os.environ.get('GANACHE_URL', 'http://127.0.0.1:7545')
+CONTRACT_ADDRESS = os.environ.get('CONTRACT_ADDRESS') or None              # Kosong = ambil dari artifact Truffle
+ARTIFACT_PATH = os.environ.get('CONTRACT_ARTIFACT') or os.path.join(os.path.dirname(BASE_DIR), 'build', 'contracts', 'DonationPlatform.json')
+ABI_CACHE_PATH = os.environ.get('CONTRACT_ABI_CACHE') or os.path.join(BASE_DIR, 'instance', 'contract_abi.json')
+ARTIFACT_CHECK_INTERVAL = 5     # Detik; cek apakah artifact berubah (truffle migrate --reset)
+BACKOFF_INITIAL = 1             # Detik; jeda setelah gagal menghubungi node, dilipatgandakan
+BACKOFF_MAX = 30
+
+
+class ContractUnavailable(ConnectionError):
+    pass
+
+
+# --- CACHE ABI + ALAMAT ---
+# Artifact Truffle (~800 KB: bytecode, AST, source map) hanya dibaca saat berubah; yang disimpan
+# ke cache cukup ABI + alamat per network, sehingga start worker tidak mem-parse artifact penuh.
+def _artifact_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def build_abi_cache(artifact_path=ARTIFACT_PATH, cache_path=ABI_CACHE_PATH):
+    with open(artifact_path) as f:
+        artifact = json.load(f)
+    info = {
+        'abi': artifact['abi'],
+        'networks': {chain_id: net['address'] for chain_id, net in artifact.get('networks', {}).items() if net.get('address')},
+        'artifact_mtime': _artifact_mtime(artifact_path),
+    }
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = f"{cache_path}.tmp.{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(info, f, separators=(',', ':'))
+    os.replace(tmp, cache_path)
+    return info
+
+def load_abi_cache(artifact_path=ARTIFACT_PATH, cache_path=ABI_CACHE_PATH):
+    """Kembalikan {'abi', 'networks', 'artifact_mtime'} atau None jika artifact & cache tidak ada."""
+    artifact_mtime = _artifact_mtime(artifact_path)
+    cached = None
     try:
-        with open(json_path) as f:
-            contract_json = json.load(f)
-            
-        abi = contract_json['abi']
-        networks = contract_json['networks']
-        chain_id = str(web3.eth.chain_id)
-        
+        with open(cache_path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if cached is not None and (artifact_mtime is None or cached.get('artifact_mtime') == artifact_mtime):
+        return cached
+    if artifact_mtime is not None:
+        try:
+            return build_abi_cache(artifact_path, cache_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Contract Registry: artifact {artifact_path} tidak bisa dibaca ({e})")
+    return cached
+
+
+# --- REGISTRY KONTRAK (LAZY) ---
+class ContractRegistry:
+    """Membuat objek Contract saat pertama dipakai, bukan saat import.
+
+    Alamat di-resolve dari chain id node; jika node mati, percobaan berikutnya ditunda dengan
+    backoff eksponensial dan objek dibuat ulang otomatis saat node kembali atau artifact berubah.
+    """
+
+    def __init__(self, web3, artifact_path=ARTIFACT_PATH, cache_path=ABI_CACHE_PATH, address=CONTRACT_ADDRESS):
+        self.web3 = web3
+        self.artifact_path = artifact_path
+        self.cache_path = cache_path
+        self.address = address
+        self.info = load_abi_cache(artifact_path, cache_path)
+        self._contract = None
+        self._failures = 0
+        self._retry_at = 0
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def abi(self):
+        return self.info['abi'] if self.info else None
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < ARTIFACT_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        mtime = _artifact_mtime(self.artifact_path)
+        if mtime is not None and self.info and mtime != self.info.get('artifact_mtime'):
+            # Kontrak di-deploy ulang -> alamat (dan mungkin ABI) baru
+            with self._lock:
+                self.info = load_abi_cache(self.artifact_path, self.cache_path)
+                self._contract = None
+                self._failures = self._retry_at = 0
+
+    def _resolve_address(self):
+        if self.address:
+            return Web3.to_checksum_address(self.address)
+        networks = self.info['networks']
+        if not networks:
+            raise ContractUnavailable("Kontrak belum dideploy (jalankan: truffle migrate --reset)")
+        chain_id = str(self.web3.eth.chain_id)
         if chain_id in networks:
-            address = networks[chain_id]['address']
-            print(f"✅ MATCH! Kontrak ditemukan di address: {address}")
-            return address, abi
-        else:
-            # Fallback: Ambil network terakhir yang tersedia
-            if len(networks) > 0:
-                latest_net = list(networks.keys())[-1]
-                address = networks[latest_net]['address']
-                print(f"⚠️  Network ID {chain_id} tidak ada di JSON.")
-                print(f"⚠️  Menggunakan fallback network {latest_net} -> Address: {address}")
-                return address, abi
-            else:
-                print("❌ GAGAL: JSON ada, tapi 'networks' kosong. Belum dideploy!")
-                return None, None
-
-    except Exception as e:
-        print(f"❌ ERROR SYSTEM: {str(e)}")
-        return None, None
-    finally:
-        print("-" * 50)
-
-# Inisialisasi Global Variable
-address, abi = get_contract_info()
-
-if address and abi:
-    contract = web3.eth.contract(address=address, abi=abi)
+            return networks[chain_id]
+        # Fallback: network terakhir di artifact (mis. network id Ganache berbeda dari saat migrate)
+        latest = list(networks)[-1]
+        print(f"Contract Registry: network {chain_id} tidak ada di artifact, memakai network {latest}")
+        return networks[latest]
+
+    def get(self):
+        self._reload_if_changed()
+        contract = self._contract
+        if contract is not None:
+            return contract
+        if self.info is None:
+            raise ContractUnavailable("ABI kontrak tidak ditemukan (jalankan: truffle migrate --reset)")
+        with self._lock:
+            if self._contract is not None:
+                return self._contract
+            wait = self._retry_at - time.monotonic()
+            if wait > 0:
+                raise ContractUnavailable(f"Node {GANACHE_URL} belum tersedia, dicoba lagi dalam {wait:.0f} detik")
+            try:
+                address = self._resolve_address()
+            except ContractUnavailable:
+                raise
+            except Exception as e:
+                self._failures += 1
+                delay = min(BACKOFF_MAX, BACKOFF_INITIAL * 2 ** (self._failures - 1))
+                self._retry_at = time.monotonic() + delay
+                print(f"Contract Registry: node {GANACHE_URL} tidak dapat dihubungi ({e}), dicoba lagi dalam {delay} detik")
+                raise ContractUnavailable(str(e)) from e
+            self._failures = 0
+            self._contract = self.web3.eth.contract(address=address, abi=self.abi)
+            return self._contract
+
+
+class LazyContract:
+    """Pengganti objek Contract untuk modul lain: `abi` tersedia tanpa node, atribut lain di-resolve saat dipakai."""
+
+    def __init__(self, registry):
+        self._registry = registry
+
+    @property
+    def abi(self):
+        return self._registry.abi
+
+    def __getattr__(self, name):
+        return getattr(self._registry.get(), name)
+
+    def __repr__(self):
+        return f"<LazyContract {self._registry.address or self._registry.artifact_path}>"
+
+
+# Inisialisasi Global Variable (tidak menghubungi node; koneksi dibuka saat request pertama).
+# Provider: pool keep-alive + failover WEB3_PROVIDER_URIS (default GANACHE_URL), baca ke WEB3_READ_URIS jika ada.
+web3 = Web3(build_provider(GANACHE_URL))
+registry = ContractRegistry(web3)
+
+if registry.abi:
+    contract = LazyContract(registry)
 else:
     contract = None
-    print("⚠️  PERINGATAN: Aplikasi berjalan TANPA koneksi Smart Contract.")
\ No newline at end of file
+    print("⚠️  PERINGATAN: ABI kontrak tidak ditemukan, aplikasi berjalan TANPA Smart Contract (jalankan: truffle migrate --reset).")
+
+
+if __name__ == '__main__':
+    # Diagnostik manual: python contract_data.py
+    print(f"Node     : {GANACHE_URL} ({'terhubung' if web3.is_connected() else 'TIDAK terhubung'})")
+    info = build_abi_cache() if _artifact_mtime(ARTIFACT_PATH) is not None else registry.info
+    print(f"Artifact : {ARTIFACT_PATH}")
+    print(f"Cache ABI: {ABI_CACHE_PATH} ({len(info['abi']) if info else 0} entri, network {list(info['networks']) if info else []})")
+    try:
+        print(f"Kontrak  : {contract.address}")
+    except (ContractUnavailable, AttributeError) as e:
+        print(f"Kontrak  : tidak tersedia ({e})")
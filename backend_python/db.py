@@ -0,0 +1,225 @@
+import os
+import sqlite3
+import threading
+from flask import g, has_app_context
+from metrics import TimedConnection
+
+# --- KONFIGURASI DATABASE ---
+DB_PATH = os.environ.get('DATABASE_PATH', 'instance/users.db')
+
+# Pragma per koneksi. journal_mode=WAL tersimpan di file, sisanya harus di-set setiap connect.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",      # Aman untuk WAL, fsync jauh lebih sedikit
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",       # Tunggu writer lain, jangan langsung 'database is locked'
+    "PRAGMA cache_size = -16000",       # ~16 MB page cache
+    "PRAGMA temp_store = MEMORY",
+)
+
+# --- MIGRASI SKEMA ---
+# Versi disimpan di PRAGMA user_version. Tambahkan migrasi baru di akhir list, jangan ubah yang lama.
+MIGRATIONS = [
+    # 1: Skema awal (IF NOT EXISTS agar database lama dari init_db() ikut terpakai)
+    ['''CREATE TABLE IF NOT EXISTS users
+        (id INTEGER PRIMARY KEY,
+         username TEXT, email TEXT, password TEXT, role TEXT,
+         wallet_address TEXT, private_key TEXT,
+         profile_pic TEXT, bio TEXT, last_username_change TEXT)''',
+     '''CREATE TABLE IF NOT EXISTS campaign_details
+        (id INTEGER PRIMARY KEY,
+         blockchain_id INTEGER,
+         category TEXT,
+         usage_plan TEXT,
+         social_link TEXT,
+         tagline TEXT)''',
+     '''CREATE TABLE IF NOT EXISTS campaign_updates
+        (id INTEGER PRIMARY KEY, blockchain_id INTEGER,
+         title TEXT, content TEXT, image TEXT, created_at TEXT)''',
+     '''CREATE TABLE IF NOT EXISTS donations
+        (id INTEGER PRIMARY KEY, blockchain_id INTEGER,
+         donor_name TEXT, amount REAL, message TEXT, timestamp TEXT)'''],
+
+    # 2: Indexer event blockchain (indexer.py)
+    ['''CREATE TABLE IF NOT EXISTS chain_events
+        (id INTEGER PRIMARY KEY, event TEXT, campaign_id INTEGER,
+         actor TEXT, amount_wei TEXT, status INTEGER, title TEXT, timestamp INTEGER,
+         block_number INTEGER, block_hash TEXT, tx_hash TEXT, log_index INTEGER,
+         UNIQUE (block_number, log_index))''',
+     'CREATE INDEX IF NOT EXISTS idx_chain_events_event_ts ON chain_events (event, timestamp)',
+     'CREATE INDEX IF NOT EXISTS idx_chain_events_campaign ON chain_events (campaign_id, block_number)',
+     '''CREATE TABLE IF NOT EXISTS indexer_state
+        (id INTEGER PRIMARY KEY, contract_address TEXT, last_block INTEGER)''',
+     '''CREATE TABLE IF NOT EXISTS indexer_checkpoints
+        (block_number INTEGER PRIMARY KEY, block_hash TEXT)'''],
+
+    # 3: Job transaksi asinkron (tx_pipeline.py)
+    ['''CREATE TABLE IF NOT EXISTS tx_jobs
+        (id TEXT PRIMARY KEY, kind TEXT, wallet TEXT, campaign_id INTEGER,
+         tx_hash TEXT, status TEXT, error TEXT, payload TEXT,
+         created_at TEXT, updated_at TEXT)''',
+     'CREATE INDEX IF NOT EXISTS idx_tx_jobs_status ON tx_jobs (status)'],
+
+    # 4: Index untuk query per kampanye & lookup user
+    ['CREATE INDEX IF NOT EXISTS idx_users_wallet ON users (wallet_address)',
+     'CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)',
+     'CREATE INDEX IF NOT EXISTS idx_campaign_details_bid ON campaign_details (blockchain_id)',
+     'CREATE INDEX IF NOT EXISTS idx_campaign_updates_bid ON campaign_updates (blockchain_id, id)',
+     'CREATE INDEX IF NOT EXISTS idx_donations_bid ON donations (blockchain_id, id)'],
+
+    # 5: Rollup statistik (rollups.py), nominal dalam wei sebagai TEXT ber-padding
+    ['''CREATE TABLE IF NOT EXISTS campaign_stats
+        (campaign_id INTEGER PRIMARY KEY, status INTEGER, total_wei TEXT,
+         donation_count INTEGER, donor_count INTEGER, message_count INTEGER)''',
+     '''CREATE TABLE IF NOT EXISTS donor_stats
+        (campaign_id INTEGER, donor TEXT, total_wei TEXT, donation_count INTEGER,
+         PRIMARY KEY (campaign_id, donor))''',
+     '''CREATE TABLE IF NOT EXISTS donor_totals
+        (donor TEXT PRIMARY KEY, total_wei TEXT, donation_count INTEGER, campaign_count INTEGER)''',
+     'CREATE INDEX IF NOT EXISTS idx_donor_totals_total ON donor_totals (total_wei)',
+     '''CREATE TABLE IF NOT EXISTS volume_buckets
+        (bucket TEXT, start INTEGER, total_wei TEXT, donation_count INTEGER,
+         PRIMARY KEY (bucket, start))''',
+     'CREATE TABLE IF NOT EXISTS status_counts (status INTEGER PRIMARY KEY, n INTEGER)',
+     'INSERT OR IGNORE INTO status_counts (status, n) VALUES (0, 0), (1, 0), (2, 0), (3, 0)',
+     '''CREATE TABLE IF NOT EXISTS rollup_state
+        (id INTEGER PRIMARY KEY, last_event_id INTEGER, last_donation_id INTEGER,
+         donation_count INTEGER, donor_count INTEGER)''',
+     'INSERT OR IGNORE INTO rollup_state (id, last_event_id, last_donation_id, donation_count, donor_count) VALUES (1, 0, 0, 0, 0)'],
+
+    # 6: Indeks pencarian kampanye (search_index.py): tabel isi + FTS5 external content
+    ['''CREATE TABLE IF NOT EXISTS campaign_search
+        (campaign_id INTEGER PRIMARY KEY, creator TEXT, status INTEGER, category TEXT,
+         title TEXT, description TEXT, tagline TEXT, usage_plan TEXT, needs_refresh INTEGER NOT NULL DEFAULT 0)''',
+     'CREATE INDEX IF NOT EXISTS idx_campaign_search_status ON campaign_search (status, campaign_id)',
+     'CREATE INDEX IF NOT EXISTS idx_campaign_search_category ON campaign_search (category, status, campaign_id)',
+     'CREATE INDEX IF NOT EXISTS idx_campaign_search_creator ON campaign_search (creator)',
+     'CREATE INDEX IF NOT EXISTS idx_campaign_search_refresh ON campaign_search (campaign_id) WHERE needs_refresh = 1',
+     '''CREATE VIRTUAL TABLE IF NOT EXISTS campaign_fts USING fts5
+        (title, description, tagline, category, usage_plan,
+         content='campaign_search', content_rowid='campaign_id',
+         tokenize='unicode61 remove_diacritics 2', prefix='2 3')''',
+     '''CREATE TRIGGER IF NOT EXISTS campaign_search_ai AFTER INSERT ON campaign_search BEGIN
+        INSERT INTO campaign_fts (rowid, title, description, tagline, category, usage_plan)
+        VALUES (new.campaign_id, new.title, new.description, new.tagline, new.category, new.usage_plan); END''',
+     '''CREATE TRIGGER IF NOT EXISTS campaign_search_ad AFTER DELETE ON campaign_search BEGIN
+        INSERT INTO campaign_fts (campaign_fts, rowid, title, description, tagline, category, usage_plan)
+        VALUES ('delete', old.campaign_id, old.title, old.description, old.tagline, old.category, old.usage_plan); END''',
+     # Hanya kolom teks yang memicu update FTS (perubahan status/needs_refresh tidak menyentuh indeks)
+     '''CREATE TRIGGER IF NOT EXISTS campaign_search_au AFTER UPDATE OF title, description, tagline, category, usage_plan ON campaign_search BEGIN
+        INSERT INTO campaign_fts (campaign_fts, rowid, title, description, tagline, category, usage_plan)
+        VALUES ('delete', old.campaign_id, old.title, old.description, old.tagline, old.category, old.usage_plan);
+        INSERT INTO campaign_fts (rowid, title, description, tagline, category, usage_plan)
+        VALUES (new.campaign_id, new.title, new.description, new.tagline, new.category, new.usage_plan); END''',
+     '''CREATE TABLE IF NOT EXISTS search_state
+        (id INTEGER PRIMARY KEY, last_event_id INTEGER, last_detail_id INTEGER)''',
+     'INSERT OR IGNORE INTO search_state (id, last_event_id, last_detail_id) VALUES (1, 0, 0)'],
+
+    # 7: Bus invalidasi cache antar worker (cache_bus.py); AUTOINCREMENT agar id tidak dipakai ulang setelah pembersihan
+    ['''CREATE TABLE IF NOT EXISTS cache_invalidations
+        (id INTEGER PRIMARY KEY AUTOINCREMENT, scope TEXT, key TEXT, origin TEXT, created_at REAL)''',
+     'CREATE INDEX IF NOT EXISTS idx_cache_invalidations_created ON cache_invalidations (created_at)'],
+
+    # 8: Klaim job transaksi antar worker (lease), efek samping idempoten per tx_hash, nonce bersama per wallet
+    ['ALTER TABLE tx_jobs ADD COLUMN owner TEXT',
+     'ALTER TABLE tx_jobs ADD COLUMN lease_until REAL',
+     'ALTER TABLE donations ADD COLUMN tx_hash TEXT',
+     # Satu transaksi keranjang = beberapa baris donasi (satu per kampanye)
+     'CREATE UNIQUE INDEX IF NOT EXISTS idx_donations_tx ON donations (tx_hash, blockchain_id) WHERE tx_hash IS NOT NULL',
+     'ALTER TABLE campaign_details ADD COLUMN tx_hash TEXT',
+     'CREATE UNIQUE INDEX IF NOT EXISTS idx_campaign_details_tx ON campaign_details (tx_hash) WHERE tx_hash IS NOT NULL',
+     'CREATE TABLE IF NOT EXISTS wallet_nonces (wallet TEXT PRIMARY KEY, next_nonce INTEGER)'],
+
+    # 9: Nonce yang dilepas pengiriman gagal (tidak bisa dikembalikan ke next_nonce karena sudah ada alokasi sesudahnya)
+    ['CREATE TABLE IF NOT EXISTS wallet_nonce_gaps (wallet TEXT, nonce INTEGER, PRIMARY KEY (wallet, nonce))'],
+
+    # 10: Filter ekspor donasi (alamat donor / blok / waktu) lewat event DonationReceived dengan tx_hash yang sama
+    ['CREATE INDEX IF NOT EXISTS idx_chain_events_tx ON chain_events (tx_hash)'],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def connect(path=None):
+    path = path or DB_PATH
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False, factory=TimedConnection)   # Statement tercatat di /metrics
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# --- KONEKSI PER REQUEST / PER THREAD ---
+_local = threading.local()
+
+def get_connection():
+    """Satu koneksi per request Flask (ditutup di teardown); di luar request, satu per thread."""
+    if has_app_context():
+        if 'db' not in g:
+            g.db = connect()
+        return g.db
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = connect()
+    return conn
+
+def reset_after_fork():
+    # Worker hasil fork (gunicorn preload) tidak boleh memakai koneksi SQLite milik proses master
+    global _local
+    _local = threading.local()
+
+def close_connection(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.close()
+
+def init_app(app):
+    app.teardown_appcontext(close_connection)
+
+
+# --- CEK & JALANKAN MIGRASI ---
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(path=None):
+    conn = connect(path)
+    try:
+        current = schema_version(conn)
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            # BEGIN eksplisit: modul sqlite3 tidak membuka transaksi untuk DDL, jadi tanpa ini migrasi yang
+            # gagal di tengah meninggalkan ALTER TABLE yang sudah jalan tanpa menaikkan user_version.
+            # IMMEDIATE: worker lain yang bermigrasi bersamaan menunggu, lalu melihat versi yang sudah naik.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if schema_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                for statement in MIGRATIONS[version - 1]:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"DB: migrasi skema ke versi {version}")
+        return schema_version(conn)
+    finally:
+        conn.close()
+
+def ensure_schema(path=None):
+    # Cek cepat (1 PRAGMA); migrasi hanya dijalankan jika versi database tertinggal
+    conn = connect(path)
+    try:
+        current = schema_version(conn)
+    finally:
+        conn.close()
+    if current < SCHEMA_VERSION:
+        return migrate(path)
+    return current
+
+
+if __name__ == '__main__':
+    print(f"Skema database: versi {migrate()}")
@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from web3 import Web3
+import db
+
+# --- KONFIGURASI EKSPOR ---
+# Baris dibaca per chunk dengan keyset (id > cursor), setiap chunk query & transaksi baca sendiri,
+# lalu langsung ditulis ke response -> memori konstan berapa pun jumlah barisnya, dan WAL tidak
+# tertahan oleh satu transaksi baca yang panjang.
+EXPORT_CHUNK = 1000
+FORMATS = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+CSV_UNSAFE_PREFIX = ('=', '+', '-', '@', '\t', '\r')   # Formula injection saat dibuka di spreadsheet
+
+TRANSACTION_EVENTS = ('DonationReceived', 'CampaignCreated')
+TRANSACTION_FIELDS = ('id', 'event', 'campaign_id', 'actor', 'actor_name', 'amount_wei', 'amount_eth', 'title',
+                      'timestamp', 'time_utc', 'block_number', 'block_hash', 'tx_hash', 'log_index')
+DONATION_FIELDS = ('id', 'campaign_id', 'donor_name', 'amount', 'message', 'timestamp', 'tx_hash')
+# Event DonationReceived milik satu baris donasi (transaksi keranjang: satu event per kampanye)
+DONATION_EVENT = ("SELECT 1 FROM chain_events e WHERE e.event = 'DonationReceived' AND e.tx_hash = donations.tx_hash "
+                  "AND e.campaign_id = donations.blockchain_id")
+
+
+class ExportError(ValueError):
+    pass
+
+
+# --- FILTER ---
+def parse_time(value):
+    """Unix timestamp atau tanggal ISO (YYYY-MM-DD[THH:MM], UTC)."""
+    if value is None or value == '':
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+    except ValueError:
+        raise ExportError(f"Format waktu tidak valid: {value}")
+
+def _int_arg(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ExportError(f"Parameter {name} harus berupa angka")
+
+def transaction_filters(args):
+    """WHERE + parameter untuk chain_events dari query string (campaign, donor, from_block, to_block, since, until)."""
+    where, params = [f"event IN ({','.join('?' * len(TRANSACTION_EVENTS))})"], list(TRANSACTION_EVENTS)
+    event = args.get('event')
+    if event:
+        if event not in TRANSACTION_EVENTS:
+            raise ExportError("event harus salah satu dari: " + ', '.join(TRANSACTION_EVENTS))
+        where, params = ["event = ?"], [event]
+    campaign = _int_arg(args, 'campaign')
+    if campaign is not None:
+        where.append("campaign_id = ?"); params.append(campaign)
+    donor = args.get('donor')
+    if donor:
+        if not Web3.is_address(donor):
+            raise ExportError("Parameter donor harus alamat wallet")
+        where.append("actor = ?"); params.append(Web3.to_checksum_address(donor))
+    for name, sql in (('from_block', "block_number >= ?"), ('to_block', "block_number <= ?")):
+        value = _int_arg(args, name)
+        if value is not None:
+            where.append(sql); params.append(value)
+    for name, sql in (('since', "timestamp >= ?"), ('until', "timestamp < ?")):
+        value = parse_time(args.get(name))
+        if value is not None:
+            where.append(sql); params.append(value)
+    return ' AND '.join(where), params
+
+def donation_filters(args):
+    """WHERE + parameter untuk tabel donations (campaign, donor, from_block, to_block, since, until).
+
+    Alamat donor, blok & waktu diambil dari event DonationReceived yang di-join lewat tx_hash
+    (kolom timestamp donasi hanya teks tampilan). Donasi lama tanpa tx_hash hanya cocok dengan
+    filter donor lewat wallet pemilik username-nya, dan tidak ikut filter blok/waktu.
+    """
+    where, params = [], []
+    campaign = _int_arg(args, 'campaign')
+    if campaign is not None:
+        where.append("blockchain_id = ?"); params.append(campaign)
+    donor = args.get('donor')
+    if donor:
+        if not Web3.is_address(donor):
+            raise ExportError("Parameter donor harus alamat wallet")
+        donor = Web3.to_checksum_address(donor)
+        where.append(f"(EXISTS ({DONATION_EVENT} AND e.actor = ?) OR "
+                     "(tx_hash IS NULL AND donor_name IN (SELECT username FROM users WHERE wallet_address = ?)))")
+        params += [donor, donor]
+    ranges, range_params = [], []
+    for name, sql in (('from_block', "e.block_number >= ?"), ('to_block', "e.block_number <= ?")):
+        value = _int_arg(args, name)
+        if value is not None:
+            ranges.append(sql); range_params.append(value)
+    for name, sql in (('since', "e.timestamp >= ?"), ('until', "e.timestamp < ?")):
+        value = parse_time(args.get(name))
+        if value is not None:
+            ranges.append(sql); range_params.append(value)
+    if ranges:
+        where.append(f"EXISTS ({DONATION_EVENT} AND {' AND '.join(ranges)})"); params += range_params
+    return ' AND '.join(where) or '1', params
+
+
+# --- PEMBACA BERTAHAP ---
+def head_id(conn, table):
+    # Batas atas dikunci saat ekspor dimulai: baris baru selama ekspor tidak membuat ekspor tak berujung,
+    # dan resume dengan ?after=&upto= yang sama menghasilkan rentang yang sama
+    return conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+def iter_chunks(table, columns, where, params, after, upto, chunk=EXPORT_CHUNK):
+    """Generator list baris (dict) per chunk, urut id, dari koneksi sendiri (request sudah selesai saat body di-stream)."""
+    conn = db.connect()
+    try:
+        while after < upto:
+            rows = conn.execute(f"SELECT {columns} FROM {table} WHERE id > ? AND id <= ? AND {where} ORDER BY id LIMIT ?",
+                                (after, upto, *params, chunk)).fetchall()
+            if not rows:
+                return
+            yield [dict(r) for r in rows]
+            after = rows[-1]['id']
+    finally:
+        conn.close()
+
+def transaction_rows(chunks, resolve_names=None):
+    for rows in chunks:
+        names = resolve_names({r['actor'] for r in rows if r['actor']}) if resolve_names else {}
+        for r in rows:
+            r['actor_name'] = names.get(r['actor'])
+            r['amount_eth'] = str(Web3.from_wei(int(r['amount_wei']), 'ether')) if r['amount_wei'] else None
+            r['time_utc'] = datetime.fromtimestamp(r['timestamp'], timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') if r['timestamp'] else None
+        yield rows
+
+def donation_rows(chunks):
+    for rows in chunks:
+        for r in rows:
+            r['campaign_id'] = r.pop('blockchain_id')
+        yield rows
+
+
+# --- ENCODER ---
+def _csv_value(value):
+    if isinstance(value, str) and value.startswith(CSV_UNSAFE_PREFIX):
+        return "'" + value
+    return value
+
+def encode(chunks, fmt, fields):
+    """Generator bytes: satu write per chunk (bukan per baris) supaya overhead WSGI kecil."""
+    if fmt == 'csv':
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(fields)
+        yield buf.getvalue().encode('utf-8')
+        for rows in chunks:
+            buf.seek(0); buf.truncate()
+            writer.writerows([_csv_value(r[f]) for f in fields] for r in rows)
+            yield buf.getvalue().encode('utf-8')
+    else:
+        for rows in chunks:
+            yield ''.join(json.dumps({f: r[f] for f in fields}, separators=(',', ':'), default=str) + '\n' for r in rows).encode('utf-8')
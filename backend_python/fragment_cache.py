@@ -0,0 +1,185 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+# --- KONFIGURASI FRAGMENT CACHE ---
+FRAGMENT_BACKEND = os.environ.get('FRAGMENT_CACHE', 'memory')          # memory | disk | off
+FRAGMENT_CACHE_DIR = os.environ.get('FRAGMENT_CACHE_DIR', 'instance/fragments')
+FRAGMENT_CACHE_BYTES = int(os.environ.get('FRAGMENT_CACHE_MB', '32')) * 1024 * 1024
+
+
+# --- BACKEND ---
+class MemoryBackend:
+    """LRU di memori proses, dibatasi total ukuran (byte) bukan jumlah entri."""
+
+    def __init__(self, max_bytes=FRAGMENT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        cost = len(value.encode('utf-8'))
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old.encode('utf-8'))
+            self._data[key] = value
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted.encode('utf-8'))
+
+
+class DiskBackend:
+    """Satu file per fragment di FRAGMENT_CACHE_DIR; bertahan saat restart & dibagi antar worker.
+
+    Eviction berdasarkan mtime (di-touch saat hit) sampai total ukuran di bawah batas.
+    """
+
+    def __init__(self, path=FRAGMENT_CACHE_DIR, max_bytes=FRAGMENT_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.html')
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = f.read()
+            os.utime(path)
+            return value
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        data = value.encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+        path = self._file(key)
+        tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for e in os.scandir(self.path):
+            if e.is_file() and e.name.endswith('.html'):
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+        entries.sort()
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_bytes * 0.9:   # Sisakan ruang agar tidak evict di setiap set
+                break
+            try:
+                os.remove(path)
+                self.size -= size
+            except OSError:
+                pass
+
+
+class FragmentCache:
+    def __init__(self, backend, version=''):
+        self.backend = backend
+        self.version = version
+        self.counters = {'hits': 0, 'misses': 0}
+
+    def get_or_render(self, name, parts, render):
+        key = f"{self.version}|{name}|" + '|'.join(map(str, parts))
+        value = self.backend.get(key)
+        if value is not None:
+            self.counters['hits'] += 1
+            return value
+        self.counters['misses'] += 1
+        value = render()
+        self.backend.set(key, value)
+        return value
+
+
+# --- TAG JINJA: {% cache "nama", bagian_key... %} ... {% endcache %} ---
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        cache = self.environment.fragment_cache
+        name, parts = args[0], args[1:]
+        # Key None = jangan cache (mis. data pendukung key tidak tersedia)
+        if cache is None or any(p is None for p in parts):
+            return caller()
+        return Markup(cache.get_or_render(name, parts, lambda: str(caller())))
+
+
+class LazyRows:
+    """Daftar baris yang baru di-query saat dipakai template (tidak di-query jika fragment hit)."""
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self._rows = None
+
+    def _load(self):
+        if self._rows is None:
+            self._rows = self._fetch()
+        return self._rows
+
+    def __iter__(self): return iter(self._load())
+    def __len__(self): return len(self._load())
+    def __bool__(self): return bool(self._load())
+    def __getitem__(self, i): return self._load()[i]
+
+
+def _version(app):
+    # Template / aset berubah -> key lama otomatis tidak terpakai (penting untuk backend disk)
+    digest = hashlib.sha1()
+    roots = [app.template_folder and os.path.join(app.root_path, app.template_folder),
+             app.static_folder and os.path.join(app.static_folder, 'dist')]
+    for root in filter(None, roots):
+        for folder, _, files in os.walk(root):
+            for name in sorted(files):
+                path = os.path.join(folder, name)
+                digest.update(f"{path}:{os.path.getmtime(path)}".encode())
+    return digest.hexdigest()[:12]
+
+def init_app(app, backend=FRAGMENT_BACKEND):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if backend == 'off':
+        return None
+    store = DiskBackend() if backend == 'disk' else MemoryBackend()
+    cache = FragmentCache(store, version=_version(app))
+    app.jinja_env.fragment_cache = cache
+    return cache
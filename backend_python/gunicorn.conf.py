@@ -0,0 +1,25 @@
+import os
+
+# --- KONFIGURASI GUNICORN ---
+# Jalankan dari folder backend_python: gunicorn -c gunicorn.conf.py app:app
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '4'))
+# Worker berbasis thread: koneksi SSE (/stream/...) & ekspor panjang menahan satu thread, bukan satu proses
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '16'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+
+# Import app sekali di master sebelum fork: migrasi skema, seed admin & cache ABI kontrak
+# tidak dijalankan ulang oleh setiap worker
+preload_app = True
+
+
+def when_ready(server):
+    import app
+    app.preload()
+
+
+def post_fork(server, worker):
+    import app
+    app.after_fork()
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# --- KONFIGURASI PIPELINE GAMBAR ---
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_MB', '10')) * 1024 * 1024
+MAX_PIXELS = 40_000_000                   # Tolak "decompression bomb"
+ALLOWED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+
+# Varian: nama -> (sisi terpanjang dalam px, crop persegi?)
+VARIANTS = {
+    'thumb': (320, True),     # Avatar & daftar kecil (cukup untuk layar 2x)
+    'card': (640, False),     # Grid kampanye
+    'full': (1600, False),    # Halaman detail
+}
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}), 'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})}
+
+KEY_RE = re.compile(r'^[0-9a-f]{32}$')
+Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def is_key(name):
+    return bool(name) and bool(KEY_RE.match(name))
+
+
+class ImageStore:
+    """Simpan upload berdasarkan hash isi, lalu buat varian thumb/card/full (WebP + JPEG) di background.
+
+    Nama yang disimpan ke database/kontrak adalah key (32 hex sha256), sehingga file identik
+    hanya disimpan sekali dan nama tidak pernah bentrok.
+    """
+
+    def __init__(self, root, workers=IMAGE_WORKERS):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def source_path(self, key):
+        folder = self._dir(key)
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                if name.startswith('source.'):
+                    return os.path.join(folder, name)
+        return None
+
+    def variant_path(self, key, variant, fmt):
+        return os.path.join(self._dir(key), f"{variant}.{fmt}")
+
+    # --- UPLOAD (di thread request: validasi + simpan sumber saja) ---
+    def ingest(self, file_storage):
+        data = file_storage.stream.read(MAX_UPLOAD_BYTES + 1)
+        if not data:
+            raise InvalidImage("File kosong.")
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise InvalidImage(f"Ukuran gambar maksimal {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+        try:
+            with Image.open(io.BytesIO(data)) as probe:
+                fmt = probe.format
+                probe.verify()
+            with Image.open(io.BytesIO(data)) as img:
+                img.load()   # verify() tidak men-decode piksel
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+            raise InvalidImage(f"File bukan gambar yang valid ({e}).")
+        if fmt not in ALLOWED_FORMATS:
+            raise InvalidImage("Format gambar harus JPEG, PNG, WebP atau GIF.")
+
+        key = hashlib.sha256(data).hexdigest()[:32]
+        if self.source_path(key) is None:
+            folder = self._dir(key)
+            os.makedirs(folder, exist_ok=True)
+            self._write_atomic(os.path.join(folder, f"source.{ALLOWED_FORMATS[fmt]}"), data)
+        self.schedule(key)
+        return key
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp = f"{path}.tmp.{threading.get_ident()}"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # --- VARIAN (worker) ---
+    def has_variants(self, key):
+        return all(os.path.exists(self.variant_path(key, v, fmt)) for v in VARIANTS for fmt in FORMATS)
+
+    def schedule(self, key):
+        with self._lock:
+            if key in self._pending or self.has_variants(key):
+                return
+            self._pending.add(key)
+        self._executor.submit(self._generate, key)
+
+    def _generate(self, key):
+        try:
+            source = self.source_path(key)
+            if source is None:
+                return
+            with Image.open(source) as img:
+                img = ImageOps.exif_transpose(img)
+                img.load()
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+            for variant, (size, square) in VARIANTS.items():
+                resized = ImageOps.fit(img, (size, size), Image.LANCZOS) if square else img.copy()
+                if not square:
+                    resized.thumbnail((size, size), Image.LANCZOS)   # Tidak pernah memperbesar
+                for fmt, (pil_format, options) in FORMATS.items():
+                    out = resized
+                    if pil_format == 'JPEG' and out.mode == 'RGBA':
+                        # JPEG tidak punya alpha -> tempel di latar putih
+                        background = Image.new('RGB', out.size, (255, 255, 255))
+                        background.paste(out, mask=out.split()[3])
+                        out = background
+                    buffer = io.BytesIO()
+                    out.save(buffer, pil_format, **options)
+                    self._write_atomic(self.variant_path(key, variant, fmt), buffer.getvalue())
+        except Exception as e:
+            print(f"Image Variant Error ({key}): {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
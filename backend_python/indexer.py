@@ -0,0 +1,188 @@
+import os
+import threading
+import db
+import rollups
+import search_index
+from eth_utils import event_abi_to_log_topic
+from web3.exceptions import BlockNotFound
+
+# --- KONFIGURASI INDEXER ---
+# Event kontrak yang disalin ke tabel lokal `chain_events`
+INDEXED_EVENTS = ('DonationReceived', 'CampaignCreated', 'CampaignStatusChanged', 'CampaignEdited')
+
+# Blok baru dianggap final setelah N konfirmasi. Ganache (automine) hanya membuat
+# blok saat ada transaksi, jadi default 0 agar donasi langsung terlihat di admin.
+CONFIRMATIONS = int(os.environ.get('INDEXER_CONFIRMATIONS', '0'))
+POLL_INTERVAL = float(os.environ.get('INDEXER_POLL_INTERVAL', '2'))
+BATCH_BLOCKS = 2000   # Maksimal rentang blok per panggilan eth_getLogs
+REORG_WINDOW = 128    # Jumlah checkpoint hash blok yang disimpan untuk deteksi reorg
+
+
+class EventIndexer:
+    """Menyalin event kontrak secara bertahap dari blok terakhir yang sudah diproses ke SQLite."""
+
+    def __init__(self, web3, contract, confirmations=CONFIRMATIONS, poll_interval=POLL_INTERVAL, loader=None):
+        self.web3 = web3
+        self.contract = contract
+        self.loader = loader   # CampaignLoader, untuk mengisi description di indeks pencarian
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._listeners = []   # Dipanggil (dari thread indexer) setelah ada event baru ter-commit
+
+        self._abi = None
+        self._events_by_topic = {}
+        self._decoders = {}
+
+    def _events(self):
+        # Peta topic0 -> nama event, supaya cukup 1x eth_getLogs untuk semua event.
+        # Dibangun dari ABI saja (tanpa node); objek event dibuat saat log pertama di-decode.
+        # Dibangun ulang jika registry memuat ABI baru (truffle migrate --reset tanpa restart).
+        abi = self.contract.abi
+        if abi is not self._abi:
+            self._events_by_topic = {self.web3.to_hex(event_abi_to_log_topic(e)): e['name'] for e in abi
+                                     if e.get('type') == 'event' and e['name'] in INDEXED_EVENTS}
+            self._decoders = {}
+            self._abi = abi
+        return self._events_by_topic
+
+    # --- STATE (BLOK TERAKHIR) ---
+    def _load_state(self, conn):
+        row = conn.execute("SELECT contract_address, last_block FROM indexer_state WHERE id = 1").fetchone()
+        if row is None or row['contract_address'] != self.contract.address:
+            # Kontrak baru (truffle migrate --reset) -> index lama tidak berlaku lagi
+            conn.execute("DELETE FROM chain_events")
+            conn.execute("DELETE FROM indexer_checkpoints")
+            conn.execute("INSERT OR REPLACE INTO indexer_state (id, contract_address, last_block) VALUES (1, ?, -1)",
+                         (self.contract.address,))
+            rollups.rebuild(conn)
+            search_index.rebuild(conn)
+            conn.commit()
+            return -1
+        return row['last_block']
+
+    def _rewind_if_reorg(self, conn, last_block):
+        # Cocokkan hash checkpoint dengan chain; mundur sampai menemukan leluhur yang sama
+        checkpoints = conn.execute("SELECT block_number, block_hash FROM indexer_checkpoints ORDER BY block_number DESC").fetchall()
+        for cp in checkpoints:
+            # Error RPC lain (node mati, timeout) diteruskan: poll dibatalkan & dicoba lagi, index tidak disentuh
+            try:
+                block = self.web3.eth.get_block(cp['block_number'])
+            except BlockNotFound:
+                block = None   # Chain baru lebih pendek dari checkpoint ini -> bukan leluhur yang sama
+            if block is not None and self.web3.to_hex(block['hash']) == cp['block_hash']:
+                if cp['block_number'] < last_block:
+                    self._rollback(conn, cp['block_number'])
+                return cp['block_number'] if cp['block_number'] < last_block else last_block
+        if checkpoints:
+            # Reorg lebih dalam dari jendela checkpoint -> index ulang dari awal
+            self._rollback(conn, -1)
+            return -1
+        return last_block
+
+    def _rollback(self, conn, block_number):
+        print(f"Indexer: reorg terdeteksi, rollback ke blok {block_number}")
+        conn.execute("DELETE FROM chain_events WHERE block_number > ?", (block_number,))
+        conn.execute("DELETE FROM indexer_checkpoints WHERE block_number > ?", (block_number,))
+        conn.execute("UPDATE indexer_state SET last_block = ? WHERE id = 1", (block_number,))
+        rollups.rebuild(conn)
+        search_index.rebuild(conn)
+        conn.commit()
+
+    # --- PROSES LOG ---
+    def _decode(self, log):
+        topic = self.web3.to_hex(log['topics'][0])
+        name = self._events().get(topic)
+        if name is None:
+            return None
+        if name not in self._decoders:
+            self._decoders[name] = getattr(self.contract.events, name)()
+        e = self._decoders[name].process_log(log)
+        args = e['args']
+        row = {
+            'event': e['event'], 'campaign_id': None, 'actor': None, 'amount_wei': None,
+            'status': None, 'title': None, 'timestamp': args['timestamp'],
+            'block_number': e['blockNumber'], 'block_hash': self.web3.to_hex(e['blockHash']),
+            'tx_hash': self.web3.to_hex(e['transactionHash']), 'log_index': e['logIndex']
+        }
+        if e['event'] == 'DonationReceived':
+            row.update(campaign_id=args['campaignId'], actor=args['donor'], amount_wei=str(args['amount']))
+        elif e['event'] == 'CampaignCreated':
+            row.update(campaign_id=args['id'], actor=args['creator'], title=args['title'])
+        elif e['event'] == 'CampaignStatusChanged':
+            row.update(campaign_id=args['id'], status=int(args['status']))
+        elif e['event'] == 'CampaignEdited':
+            row.update(campaign_id=args['id'], title=args['newTitle'])
+        return row
+
+    def poll_once(self):
+        """Proses semua blok yang sudah terkonfirmasi. Mengembalikan jumlah event baru."""
+        if not self._lock.acquire(blocking=False):
+            return 0
+        conn = db.get_connection()
+        try:
+            last_block = self._load_state(conn)
+            last_block = self._rewind_if_reorg(conn, last_block)
+            safe_head = self.web3.eth.block_number - self.confirmations
+            total = 0
+            while last_block < safe_head:
+                from_block = last_block + 1
+                to_block = min(safe_head, from_block + BATCH_BLOCKS - 1)
+                logs = self.web3.eth.get_logs({
+                    'address': self.contract.address, 'fromBlock': from_block, 'toBlock': to_block,
+                    'topics': [list(self._events())]
+                })
+                rows = [r for r in (self._decode(log) for log in logs) if r]
+                conn.executemany('''INSERT OR IGNORE INTO chain_events
+                    (event, campaign_id, actor, amount_wei, status, title, timestamp, block_number, block_hash, tx_hash, log_index)
+                    VALUES (:event, :campaign_id, :actor, :amount_wei, :status, :title, :timestamp, :block_number, :block_hash, :tx_hash, :log_index)''', rows)
+
+                tip = self.web3.eth.get_block(to_block)
+                conn.execute("INSERT OR REPLACE INTO indexer_checkpoints (block_number, block_hash) VALUES (?, ?)",
+                             (to_block, self.web3.to_hex(tip['hash'])))
+                conn.execute("DELETE FROM indexer_checkpoints WHERE block_number NOT IN "
+                             "(SELECT block_number FROM indexer_checkpoints ORDER BY block_number DESC LIMIT ?)", (REORG_WINDOW,))
+                conn.execute("UPDATE indexer_state SET last_block = ? WHERE id = 1", (to_block,))
+                rollups.catch_up(conn)
+                search_index.catch_up(conn)
+                conn.commit()
+                last_block = to_block
+                total += len(rows)
+            # Pesan donasi & campaign_details baru tetap masuk rollup / indeks walau tidak ada blok baru
+            rollups.catch_up(conn)
+            search_index.catch_up(conn)
+            conn.commit()
+            if self.loader:
+                search_index.fill_descriptions(conn, self.loader)
+            return total
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._lock.release()
+
+    # --- BACKGROUND THREAD ---
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='event-indexer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.poll_once():
+                    for callback in self._listeners:
+                        callback()
+            except Exception as e:
+                print(f"Indexer Error: {e}")
+            self._stop.wait(self.poll_interval)
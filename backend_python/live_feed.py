@@ -0,0 +1,199 @@
+import json
+import os
+import queue
+import threading
+import db
+
+# --- KONFIGURASI LIVE FEED (SERVER-SENT EVENTS) ---
+SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', '1'))      # Cadangan jika tidak ada wake() (mis. worker lain)
+SSE_CLIENT_BUFFER = int(os.environ.get('SSE_CLIENT_BUFFER', '100'))      # Pesan tertunda per browser sebelum diputus
+SSE_KEEPALIVE = 15        # Detik; komentar kosong agar proxy tidak menutup koneksi idle
+SSE_RETRY_MS = 3000       # Jeda reconnect EventSource
+SSE_REPLAY_LIMIT = 500    # Maksimal pesan yang diputar ulang per sumber saat resume
+
+UPDATE_EVENT = 'CampaignUpdatePosted'     # Baris baru di campaign_updates
+CAMPAIGN_EVENTS = ('DonationReceived', 'CampaignStatusChanged', UPDATE_EVENT)
+ADMIN_EVENTS = ('DonationReceived', 'CampaignCreated', 'CampaignStatusChanged')
+
+
+def parse_event_id(value):
+    """Last-Event-ID berbentuk '<id chain_events>-<id campaign_updates>'; None jika tidak valid."""
+    try:
+        event_id, update_id = (int(part) for part in (value or '').split('-'))
+    except ValueError:
+        return None
+    return (event_id, update_id) if event_id >= 0 and update_id >= 0 else None
+
+def _chunk(msg_id, event, data):
+    return f"id: {msg_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+class Subscriber:
+    """Satu browser yang terhubung; buffer dibatasi supaya klien lambat tidak menahan memori."""
+
+    def __init__(self, campaign_id, buffer=SSE_CLIENT_BUFFER):
+        self.campaign_id = campaign_id   # None = feed admin (semua kampanye)
+        self.queue = queue.Queue(maxsize=buffer)
+        self.overflowed = False
+
+    def wants(self, campaign_id, event):
+        if self.campaign_id is None:
+            return event in ADMIN_EVENTS
+        return campaign_id == self.campaign_id and event in CAMPAIGN_EVENTS
+
+    def offer(self, chunk):
+        try:
+            self.queue.put_nowait(chunk)
+            return True
+        except queue.Full:
+            # Tidak menunggu klien lambat: stream ditutup, browser reconnect & resume dari Last-Event-ID
+            self.overflowed = True
+            return False
+
+
+class EventBroker:
+    """Satu thread membaca event baru dari SQLite (hasil indexer) lalu menyebarkannya ke semua subscriber.
+
+    Tidak ada subscription chain per browser: indexer tetap satu-satunya pembaca chain, broker
+    hanya mengikuti cursor id chain_events & campaign_updates dan men-serialisasi tiap pesan sekali.
+    """
+
+    def __init__(self, resolve_names=None, poll_interval=SSE_POLL_INTERVAL, buffer=SSE_CLIENT_BUFFER):
+        self.resolve_names = resolve_names
+        self.poll_interval = poll_interval
+        self.buffer = buffer
+        self.cursor = None           # (id chain_events, id campaign_updates) terakhir yang sudah disebar
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # --- MEMBACA SUMBER ---
+    @staticmethod
+    def _head(conn):
+        row = conn.execute("SELECT (SELECT COALESCE(MAX(id), 0) FROM chain_events), "
+                           "(SELECT COALESCE(MAX(id), 0) FROM campaign_updates)").fetchone()
+        return row[0], row[1]
+
+    def _messages(self, conn, after, upto, campaign_id=None, admin=False, newest=None):
+        """Pesan di rentang (after, upto] dalam urutan id; newest=N -> hanya N terbaru per sumber.
+
+        campaign_id None = semua kampanye (fan-out & admin); admin=True tanpa kabar terbaru.
+        """
+        (event_after, update_after), (event_upto, update_upto) = after, upto
+        kinds = ADMIN_EVENTS if campaign_id is None else CAMPAIGN_EVENTS
+        kinds = [k for k in kinds if k != UPDATE_EVENT]
+        where, params = f"id > ? AND id <= ? AND event IN ({','.join('?' * len(kinds))})", [event_after, event_upto, *kinds]
+        if campaign_id is not None:
+            where += " AND campaign_id = ?"; params.append(campaign_id)
+        order, limit = ("DESC", newest) if newest else ("ASC", -1)
+        events = conn.execute(f"SELECT * FROM chain_events WHERE {where} ORDER BY id {order} LIMIT ?", (*params, limit)).fetchall()
+
+        updates = []
+        if not admin:
+            where, params = "id > ? AND id <= ?", [update_after, update_upto]
+            if campaign_id is not None:
+                where += " AND blockchain_id = ?"; params.append(campaign_id)
+            updates = conn.execute(f"SELECT * FROM campaign_updates WHERE {where} ORDER BY id {order} LIMIT ?", (*params, limit)).fetchall()
+        if newest:
+            events, updates = events[::-1], updates[::-1]
+
+        names = self.resolve_names({e['actor'] for e in events if e['actor']}) if self.resolve_names and events else {}
+        # id pesan = posisi cursor setelah pesan itu, jadi resume dari id mana pun tidak melewatkan apa pun
+        out, update_pos = [], update_after
+        for e in events:
+            data = {'id': e['id'], 'campaign_id': e['campaign_id'], 'actor': e['actor'], 'actor_name': names.get(e['actor']),
+                    'amount_wei': e['amount_wei'], 'status': e['status'], 'title': e['title'], 'timestamp': e['timestamp'],
+                    'tx_hash': e['tx_hash'], 'block_number': e['block_number']}
+            out.append((e['campaign_id'], e['event'], _chunk(f"{e['id']}-{update_pos}", e['event'], data)))
+        for u in updates:
+            data = {'id': u['id'], 'campaign_id': u['blockchain_id'], 'title': u['title'], 'content': u['content'],
+                    'image': u['image'], 'created_at': u['created_at']}
+            out.append((u['blockchain_id'], UPDATE_EVENT, _chunk(f"{event_upto}-{u['id']}", UPDATE_EVENT, data)))
+        return out
+
+    # --- SUBSCRIBE ---
+    def subscribe(self, campaign_id=None, last_event_id=None):
+        """Daftarkan subscriber; kembalikan (subscriber, pesan replay sejak Last-Event-ID)."""
+        conn = db.get_connection()
+        sub = Subscriber(campaign_id, self.buffer)
+        with self._lock:
+            if self.cursor is None or not self._subscribers:
+                # Broker idle tidak mengikuti cursor -> mulai dari posisi terbaru
+                self.cursor = self._head(conn)
+            self._subscribers.add(sub)
+            cursor = self.cursor
+        self._wake.set()
+        self.start()
+
+        resume = parse_event_id(last_event_id)
+        if resume is None:
+            return sub, [b"retry: %d\n\n" % SSE_RETRY_MS]
+        # Pesan > cursor akan datang lewat queue; yang <= cursor diputar ulang dari database
+        after = (min(resume[0], cursor[0]), min(resume[1], cursor[1]))
+        replay = self._messages(conn, after, cursor, campaign_id, admin=campaign_id is None, newest=SSE_REPLAY_LIMIT)
+        return sub, [b"retry: %d\n\n" % SSE_RETRY_MS] + [chunk for _, _, chunk in replay]
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stream(self, sub, replay):
+        """Generator body response text/event-stream."""
+        try:
+            yield from replay
+            while True:
+                if sub.overflowed and sub.queue.empty():
+                    return
+                try:
+                    yield sub.queue.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield b": keepalive\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    # --- FAN-OUT ---
+    def poll_once(self):
+        """Sebar pesan baru sejak cursor. Mengembalikan jumlah pesan."""
+        conn = db.get_connection()
+        with self._lock:
+            if self.cursor is None or not self._subscribers:
+                return 0
+            cursor = self.cursor
+        head = self._head(conn)
+        # Reset kontrak / rollback reorg menghapus chain_events -> id bisa dipakai ulang, ikuti head baru
+        cursor = (min(cursor[0], head[0]), min(cursor[1], head[1]))
+        messages = self._messages(conn, cursor, head) if head != cursor else []
+        with self._lock:
+            for campaign_id, event, chunk in messages:
+                for sub in list(self._subscribers):
+                    if sub.wants(campaign_id, event) and not sub.offer(chunk):
+                        self._subscribers.discard(sub)
+            self.cursor = head
+        return len(messages)
+
+    def wake(self):
+        self._wake.set()
+
+    # --- BACKGROUND THREAD ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Live Feed Error: {e}")
@@ -0,0 +1,255 @@
+import bisect
+import hmac
+import os
+import re
+import sqlite3
+import threading
+import time
+from flask import abort, g, has_request_context, request, session, template_rendered, before_render_template
+
+# --- KONFIGURASI METRIK ---
+# Header X-Debug-Calls berisi ringkasan RPC/SQL per request (jangan aktifkan di produksi publik)
+DEBUG_HEADER = os.environ.get('METRICS_DEBUG_HEADER', '0') == '1'
+# /metrics memuat trafik & latensi per route / method RPC: hanya admin (login), scraper dengan
+# header "Authorization: Bearer <METRICS_TOKEN>", atau IP di METRICS_ALLOW_IPS (dipisah koma)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+METRICS_ALLOW_IPS = {ip.strip() for ip in os.environ.get('METRICS_ALLOW_IPS', '').split(',') if ip.strip()}
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SQL_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?)\s+(\w+)', re.IGNORECASE)
+
+
+# --- TIPE METRIK (format teks Prometheus, tanpa dependensi tambahan) ---
+def _labels(names, values):
+    if not names:
+        return ''
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{n}="{escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help_text, labelnames, buckets
+        self._values = {}   # labels -> [jumlah per bucket..., +Inf, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            slot = self._values.get(labels)
+            if slot is None:
+                slot = self._values[labels] = [0] * (len(self.buckets) + 2)
+            slot[bisect.bisect_left(self.buckets, value)] += 1
+            slot[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ('le',)
+        with self._lock:
+            for labels, slot in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ('+Inf',), slot):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {slot[-1]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Nilai dibaca saat /metrics di-scrape; fn mengembalikan angka atau dict label -> angka."""
+
+    def __init__(self, name, help_text, fn, labelnames=(), kind='gauge'):
+        self.name, self.help, self.fn, self.labelnames, self.kind = name, help_text, fn, labelnames, kind
+
+    def render(self):
+        try:
+            values = self.fn()
+        except Exception as e:
+            print(f"Metrics Gauge Error ({self.name}): {e}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in sorted(values.items())]
+        return lines
+
+
+# --- REGISTRY ---
+RPC_CALLS = Counter('rpc_calls_total', 'Panggilan JSON-RPC per method dan sumber (endpoint / thread background).', ('method', 'source'))
+RPC_ERRORS = Counter('rpc_errors_total', 'Panggilan JSON-RPC yang gagal (exception atau error dari node).', ('method',))
+RPC_FAILOVERS = Counter('rpc_failovers_total', 'Panggilan JSON-RPC yang gagal di satu endpoint lalu dicoba ulang / dialihkan.', ('method',))
+RPC_SECONDS = Histogram('rpc_request_duration_seconds', 'Latensi JSON-RPC per method.', ('method',))
+SQL_QUERIES = Counter('sql_queries_total', 'Statement SQLite per operasi, tabel dan sumber.', ('op', 'table', 'source'))
+SQL_SECONDS = Histogram('sql_query_duration_seconds', 'Latensi statement SQLite per operasi.', ('op',))
+HTTP_REQUESTS = Counter('http_requests_total', 'Request HTTP per endpoint, method dan status.', ('endpoint', 'method', 'status'))
+HTTP_SECONDS = Histogram('http_request_duration_seconds', 'Waktu proses request per endpoint (tanpa body streaming).', ('endpoint',))
+HTTP_RPC_PER_REQUEST = Histogram('http_request_rpc_calls', 'Jumlah panggilan JSON-RPC per request.', ('endpoint',), COUNT_BUCKETS)
+HTTP_SQL_PER_REQUEST = Histogram('http_request_sql_queries', 'Jumlah statement SQLite per request.', ('endpoint',), COUNT_BUCKETS)
+TEMPLATE_SECONDS = Histogram('template_render_duration_seconds', 'Waktu render template Jinja (termasuk fragment cache).', ('template',))
+ADMISSION_REJECTED = Counter('admission_rejected_total', 'Request tulis yang ditolak 429 per kelas endpoint dan alasan.', ('endpoint_class', 'reason'))
+ADMISSION_WAIT = Histogram('admission_wait_seconds', 'Waktu tunggu request tulis di antrean admission sebelum mendapat slot.', ('endpoint_class',))
+
+REGISTRY = [RPC_CALLS, RPC_ERRORS, RPC_FAILOVERS, RPC_SECONDS, SQL_QUERIES, SQL_SECONDS, HTTP_REQUESTS, HTTP_SECONDS,
+            HTTP_RPC_PER_REQUEST, HTTP_SQL_PER_REQUEST, TEMPLATE_SECONDS, ADMISSION_REJECTED, ADMISSION_WAIT]
+
+def register_gauge(name, help_text, fn, labelnames=(), kind='gauge'):
+    REGISTRY.append(Gauge(name, help_text, fn, labelnames, kind))
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return '\n'.join(lines) + '\n'
+
+
+# --- PENCATATAN ---
+def _tally():
+    # Ringkasan per request (untuk histogram per request & header debug); None di thread background
+    if has_request_context():
+        return g.get('metrics_tally')
+    return None
+
+def _source():
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    # Nama thread background (event-indexer, live-feed, image-variants_0 -> image-variants, ...)
+    return threading.current_thread().name.rstrip('_0123456789') or 'background'
+
+def record_rpc(method, seconds, error=False, calls=1):
+    RPC_CALLS.inc((method, _source()), calls)
+    RPC_SECONDS.observe((method,), seconds)
+    if error:
+        RPC_ERRORS.inc((method,))
+    tally = _tally()
+    if tally is not None:
+        tally['rpc'][method] = tally['rpc'].get(method, 0) + calls
+        tally['rpc_seconds'] += seconds
+
+def record_sql(sql, seconds):
+    op = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else 'EMPTY'
+    match = SQL_TABLE_RE.search(sql)
+    SQL_QUERIES.inc((op, match.group(1) if match else '-', _source()))
+    SQL_SECONDS.observe((op,), seconds)
+    tally = _tally()
+    if tally is not None:
+        tally['sql'] += 1
+        tally['sql_seconds'] += seconds
+
+
+# --- INSTRUMENTASI WEB3 & SQLITE ---
+def rpc_metrics_middleware(make_request, web3):
+    """Middleware web3: setiap panggilan (contract.call, eth.*) dicatat per method."""
+    def timed_make_request(method, params):
+        start = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception:
+            record_rpc(method, time.perf_counter() - start, error=True)
+            raise
+        record_rpc(method, time.perf_counter() - start, error=isinstance(response, dict) and 'error' in response)
+        return response
+    return timed_make_request
+
+def instrument_web3(web3):
+    # Layer terdalam -> latensi yang diukur adalah round trip ke node, bukan overhead middleware lain
+    if 'metrics' not in web3.middleware_onion:
+        web3.middleware_onion.inject(rpc_metrics_middleware, name='metrics', layer=0)
+    return web3
+
+
+class TimedConnection(sqlite3.Connection):
+    """Koneksi SQLite yang mencatat jumlah & latensi statement (dipakai db.connect lewat factory=).
+
+    Latensi SELECT mencakup langkah pertama eksekusi; baris sisanya dibaca saat fetch.
+    """
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            record_sql(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            record_sql(sql, time.perf_counter() - start)
+
+    def executescript(self, sql):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql)
+        finally:
+            record_sql(sql, time.perf_counter() - start)
+
+
+# --- INTEGRASI FLASK ---
+def init_app(app):
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_tally = {'start': time.perf_counter(), 'rpc': {}, 'rpc_seconds': 0.0, 'sql': 0, 'sql_seconds': 0.0,
+                           'templates': []}
+
+    @app.after_request
+    def finish_request_metrics(response):
+        tally = g.pop('metrics_tally', None)
+        if tally is None:
+            return response
+        endpoint = request.endpoint or 'unknown'
+        HTTP_REQUESTS.inc((endpoint, request.method, response.status_code))
+        HTTP_SECONDS.observe((endpoint,), time.perf_counter() - tally['start'])
+        rpc_calls = sum(tally['rpc'].values())
+        HTTP_RPC_PER_REQUEST.observe((endpoint,), rpc_calls)
+        HTTP_SQL_PER_REQUEST.observe((endpoint,), tally['sql'])
+        if DEBUG_HEADER:
+            methods = ', '.join(f"{m}={n}" for m, n in sorted(tally['rpc'].items()))
+            response.headers['X-Debug-Calls'] = (f"rpc={rpc_calls} ({methods}) rpc_ms={tally['rpc_seconds'] * 1000:.1f}; "
+                                                 f"sql={tally['sql']} sql_ms={tally['sql_seconds'] * 1000:.1f}")
+        return response
+
+    def template_started(sender, template, context, **extra):
+        tally = _tally()
+        if tally is not None:
+            tally['templates'].append(time.perf_counter())
+
+    def template_finished(sender, template, context, **extra):
+        tally = _tally()
+        if tally is not None and tally['templates']:
+            TEMPLATE_SECONDS.observe((template.name or 'string',), time.perf_counter() - tally['templates'].pop())
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        if not scrape_allowed():
+            abort(403)
+        return app.response_class(render(), mimetype='text/plain; version=0.0.4')
+
+
+def scrape_allowed():
+    if session.get('role') == 'admin':
+        return True
+    if METRICS_TOKEN and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}"):
+        return True
+    return request.remote_addr in METRICS_ALLOW_IPS
@@ -0,0 +1,79 @@
+import os
+
+# --- KONFIGURASI MODERASI BATCH ---
+BULK_CHUNK_SIZE = int(os.environ.get('MODERATION_CHUNK_SIZE', '50'))   # Id per transaksi
+RECEIPT_TIMEOUT = 120
+
+# aksi -> (fungsi batch, fungsi satuan, status tujuan)
+ACTIONS = {
+    'approve': ('approveCampaigns', 'approveCampaign', 1),
+    'reject': ('rejectCampaigns', 'rejectCampaign', 2),
+    'delete': ('deleteCampaigns', 'deleteCampaign', 3),
+}
+
+
+class BulkModerator:
+    """Moderasi banyak kampanye sekaligus: satu transaksi per chunk id, receipt ditunggu bersamaan.
+
+    Id yang berhasil dibaca dari event CampaignStatusChanged di receipt, sehingga id yang
+    dilewati kontrak (tidak ada / status sudah sama) atau chunk yang revert ikut dilaporkan.
+    """
+
+    def __init__(self, web3, contract, chunk_size=BULK_CHUNK_SIZE):
+        self.web3 = web3
+        self.contract = contract
+        self.chunk_size = chunk_size
+
+    @property
+    def has_batch(self):
+        # Kontrak lama (belum migrate --reset) belum punya fungsi batch -> satu transaksi per id.
+        # Dibaca dari ABI saat dipakai: registry kontrak bisa memuat ABI baru tanpa restart.
+        names = {f.get('name') for f in self.contract.abi}
+        return all(batch in names for batch, _, _ in ACTIONS.values())
+
+    def _chunks(self, ids, batch):
+        if batch:
+            return [ids[i:i + self.chunk_size] for i in range(0, len(ids), self.chunk_size)]
+        return [[i] for i in ids]
+
+    def _send(self, action, chunk, sender, batch):
+        batch_fn, single_fn, _ = ACTIONS[action]
+        if batch:
+            return getattr(self.contract.functions, batch_fn)(chunk).transact({'from': sender})
+        return getattr(self.contract.functions, single_fn)(chunk[0]).transact({'from': sender})
+
+    def run(self, action, ids, sender):
+        """Kembalikan (succeeded, failed) — failed: dict id -> alasan."""
+        if action not in ACTIONS:
+            raise ValueError(f"Aksi moderasi tidak dikenal: {action}")
+        target_status = ACTIONS[action][2]
+        succeeded, failed = [], {}
+        count = self.contract.functions.getCampaignCount().call()
+        ids = sorted(set(ids))
+        failed.update({i: "Id kampanye tidak ada" for i in ids if i >= count})
+        ids = [i for i in ids if i < count]
+
+        # Kirim semua transaksi dulu, baru tunggu receipt (bukan kirim-tunggu per id)
+        sent = []
+        batch = self.has_batch
+        for chunk in self._chunks(ids, batch):
+            try:
+                sent.append((chunk, self._send(action, chunk, sender, batch)))
+            except Exception as e:
+                failed.update({i: f"Gagal dikirim: {e}" for i in chunk})
+
+        for chunk, tx_hash in sent:
+            try:
+                receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=RECEIPT_TIMEOUT)
+            except Exception as e:
+                failed.update({i: f"Receipt tidak diterima: {e}" for i in chunk})
+                continue
+            if receipt['status'] != 1:
+                failed.update({i: "Transaksi di-revert oleh kontrak" for i in chunk})
+                continue
+            changed = {ev['args']['id'] for ev in self.contract.events.CampaignStatusChanged().process_receipt(receipt)
+                       if ev['args']['status'] == target_status}
+            for i in chunk:
+                if i in changed: succeeded.append(i)
+                else: failed[i] = "Dilewati (status sudah sama)"
+        return succeeded, failed
@@ -0,0 +1,154 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from time import mktime
+import feedparser
+
+# --- KONFIGURASI BERITA ---
+# Daftar Sumber RSS Terpercaya
+RSS_SOURCES = [
+    {"url": "https://www.antaranews.com/rss/humaniora.xml", "name": "Antara News"},
+    {"url": "https://www.cnnindonesia.com/nasional/rss", "name": "CNN Indonesia"},
+    {"url": "https://www.republika.co.id/rss/nasional/umum", "name": "Republika"},
+    {"url": "https://www.viva.co.id/rss/berita/nasional", "name": "Viva News"}
+]
+
+# Kata Kunci Filter (Trigger Words)
+KEYWORDS = [
+    "banjir", "gempa", "longsor", "kebakaran", "bencana", "tsunami", "erupsi",
+    "korban", "pengungsi", "bantuan", "donasi", "miskin", "kelaparan",
+    "difabel", "panti", "sosial", "kemanusiaan", "zakat", "galang dana",
+    "medis", "sakit", "warga", "desa", "peduli", "dampak", "rusak"
+]
+
+NEWS_TTL = 600        # Detik sebelum cache dianggap basi (tetap disajikan sambil di-refresh)
+SOURCE_TIMEOUT = 5    # Timeout per sumber RSS
+USER_AGENT = "DonasiKuy/1.0 (+news-aggregator)"
+
+# FALLBACK MOCK DATA (Jika internet mati atau tidak ada berita relevan)
+FALLBACK_NEWS = [
+    {
+        'title': 'Banjir Bandang Terjang Pemukiman Warga, Ribuan Mengungsi',
+        'link': '#', 'published': 'Hari ini',
+        'summary': 'Hujan deras menyebabkan tanggul jebol. Warga membutuhkan bantuan logistik...',
+        'source': 'Simulasi Bencana'
+    },
+    {
+        'title': 'Gempa M 5.6 Guncang Wilayah Cianjur, Rumah Rusak Berat',
+        'link': '#', 'published': 'Kemarin',
+        'summary': 'Gempa darat dangkal menyebabkan kerusakan infrastruktur...',
+        'source': 'Simulasi Bencana'
+    },
+    {
+        'title': 'Kebakaran Hanguskan Ratusan Rumah di Kawasan Padat',
+        'link': '#', 'published': '2 Hari lalu',
+        'summary': 'Api dengan cepat menyebar. Warga kehilangan tempat tinggal...',
+        'source': 'Simulasi Bencana'
+    },
+    {
+        'title': 'Krisis Air Bersih di Desa Terpencil Akibat Kemarau',
+        'link': '#', 'published': '3 Hari lalu',
+        'summary': 'Sumur warga kering. Mereka terpaksa berjalan jauh demi air...',
+        'source': 'Simulasi Sosial'
+    }
+]
+
+
+def extract_news(feed, source_name):
+    news = []
+    # Loop maksimal 10 berita per sumber untuk efisiensi
+    for entry in feed.entries[:10]:
+        title = entry.title.lower()
+        summary = entry.summary.lower() if hasattr(entry, 'summary') else ""
+
+        # Cek Relevansi
+        if any(k in title for k in KEYWORDS) or any(k in summary for k in KEYWORDS):
+            # Bersihkan summary
+            clean_summary = entry.summary.split('<')[0] if hasattr(entry, 'summary') else entry.title
+
+            # Ambil Waktu Publish (Unix Timestamp untuk sorting)
+            pub_time = entry.published_parsed if hasattr(entry, 'published_parsed') else time.gmtime()
+            timestamp = mktime(pub_time) if pub_time else 0
+
+            news.append({
+                'title': entry.title,
+                'link': entry.link,
+                'published': entry.published if hasattr(entry, 'published') else "Baru saja",
+                'timestamp': timestamp, # Untuk sorting
+                'summary': clean_summary,
+                'source': source_name
+            })
+    return news
+
+
+class NewsService:
+    """Agregator RSS paralel dengan cache TTL + stale-while-revalidate dan conditional GET."""
+
+    def __init__(self, sources=RSS_SOURCES, ttl=NEWS_TTL, timeout=SOURCE_TIMEOUT):
+        self.sources = sources
+        self.ttl = ttl
+        self.timeout = timeout
+        self._news = None
+        self._fetched_at = 0
+        self._per_source = {}     # url -> {'etag', 'modified', 'news'}
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='rss')
+
+    def _fetch_source(self, source):
+        url = source['url']
+        previous = self._per_source.get(url, {})
+        req = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        if previous.get('etag'): req.add_header('If-None-Match', previous['etag'])
+        if previous.get('modified'): req.add_header('If-Modified-Since', previous['modified'])
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                body = resp.read()
+                etag, modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                # Feed tidak berubah -> pakai hasil parsing sebelumnya
+                return previous.get('news', [])
+            raise
+        news = extract_news(feedparser.parse(body), source['name'])
+        self._per_source[url] = {'etag': etag, 'modified': modified, 'news': news}
+        return news
+
+    def refresh(self):
+        """Ambil semua sumber secara paralel. Sumber yang gagal/timeout dilewati."""
+        futures = {self._executor.submit(self._fetch_source, s): s for s in self.sources}
+        aggregated_news = []
+        for future, source in futures.items():
+            try:
+                aggregated_news.extend(future.result(timeout=self.timeout * 2))
+            except Exception as e:
+                print(f"Skip source {source['name']}: {e}")
+                aggregated_news.extend(self._per_source.get(source['url'], {}).get('news', []))
+
+        # Sorting: Urutkan dari yang paling baru (timestamp terbesar), ambil 4 teratas
+        aggregated_news.sort(key=lambda x: x['timestamp'], reverse=True)
+        with self._lock:
+            self._news = aggregated_news[:4]
+            self._fetched_at = time.monotonic()
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing: return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"News refresh error: {e}")
+                with self._lock: self._refreshing = False
+        threading.Thread(target=run, name='news-refresh', daemon=True).start()
+
+    def get_news(self):
+        """Hanya membaca cache; refresh berjalan di background jika cache kosong/basi."""
+        if self._news is None or time.monotonic() - self._fetched_at > self.ttl:
+            self._refresh_in_background()
+        return self._news or FALLBACK_NEWS
@@ -0,0 +1,149 @@
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import HTTPProvider, IPCProvider, WebsocketProvider
+from web3.providers.base import BaseProvider
+import metrics
+
+# --- KONFIGURASI PROVIDER WEB3 ---
+# Daftar endpoint dipisah koma, urut prioritas. Skema: http(s)://, ws(s)://, ipc:// atau path file .ipc
+PRIMARY_URIS = os.environ.get('WEB3_PROVIDER_URIS', '')     # Kosong = GANACHE_URL
+READ_URIS = os.environ.get('WEB3_READ_URIS', '')            # Replika baca (opsional)
+POOL_SIZE = int(os.environ.get('WEB3_POOL_SIZE', '32'))     # Koneksi keep-alive per endpoint (~ jumlah thread worker)
+RETRIES = int(os.environ.get('WEB3_RETRIES', '2'))          # Percobaan ulang untuk method baca
+BACKOFF_BASE = float(os.environ.get('WEB3_BACKOFF', '0.2'))  # Detik, dikali 2^percobaan dengan jitter
+ENDPOINT_COOLDOWN = 10       # Detik endpoint dilewati setelah gagal (kecuali semua endpoint sedang gagal)
+DEFAULT_TIMEOUT = 10
+
+# Timeout per method (detik, hanya HTTP; WebSocket/IPC memakai timeout tetap per koneksi)
+METHOD_TIMEOUTS = {
+    'eth_blockNumber': 3, 'eth_chainId': 3, 'net_version': 3, 'web3_clientVersion': 3, 'eth_gasPrice': 3,
+    'eth_getBalance': 5, 'eth_call': 10, 'eth_estimateGas': 10,
+    'eth_getLogs': 30, 'eth_sendRawTransaction': 30, 'eth_sendTransaction': 30,
+}
+
+# Method yang mengubah state / bergantung pada akun & nonce di node utama: selalu ke primary,
+# tidak pernah diulang otomatis (bisa terkirim dua kali)
+WRITE_METHODS = {'eth_sendTransaction', 'eth_sendRawTransaction', 'eth_sign', 'eth_signTransaction',
+                 'eth_signTypedData', 'personal_sendTransaction', 'personal_sign'}
+# Baca yang harus konsisten dengan transaksi yang baru dikirim (replika bisa tertinggal)
+PRIMARY_READS = {'eth_accounts', 'eth_coinbase', 'eth_getTransactionCount', 'eth_getTransactionReceipt',
+                 'eth_getTransactionByHash'}
+
+TRANSIENT_ERRORS = (requests.RequestException, OSError, TimeoutError)
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """HTTPProvider dengan session keep-alive sendiri (pool sesuai jumlah thread) dan timeout per method."""
+
+    def __init__(self, endpoint_uri, pool_size=POOL_SIZE, timeouts=METHOD_TIMEOUTS):
+        super().__init__(endpoint_uri)
+        self.timeouts = timeouts
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def make_request(self, method, params):
+        resp = self.session.post(self.endpoint_uri, data=self.encode_rpc_request(method, params),
+                                 headers=self.get_request_headers(), timeout=self.timeouts.get(method, DEFAULT_TIMEOUT))
+        resp.raise_for_status()
+        return self.decode_rpc_response(resp.content)
+
+
+def make_provider(uri):
+    if uri.startswith(('http://', 'https://')):
+        return PooledHTTPProvider(uri)
+    if uri.startswith(('ws://', 'wss://')):
+        return WebsocketProvider(uri, websocket_timeout=DEFAULT_TIMEOUT)
+    return IPCProvider(uri[len('ipc://'):] if uri.startswith('ipc://') else uri, timeout=DEFAULT_TIMEOUT)
+
+
+class _Endpoint:
+    def __init__(self, uri):
+        self.uri = uri
+        self.provider = make_provider(uri)
+        self.down_until = 0
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.down_until
+
+
+class NodePool(BaseProvider):
+    """Provider gabungan: failover berurutan antar endpoint, retry baca dengan jitter, baca ke replika.
+
+    Transaksi & baca yang terkait nonce/receipt selalu ke primary; method tulis tidak pernah
+    diulang otomatis. Endpoint yang gagal dilewati selama ENDPOINT_COOLDOWN detik.
+    """
+
+    def __init__(self, primary_uris, read_uris=(), retries=RETRIES, backoff=BACKOFF_BASE):
+        if not primary_uris:
+            raise ValueError("Minimal satu endpoint node (WEB3_PROVIDER_URIS / GANACHE_URL)")
+        self.primary = [_Endpoint(u) for u in primary_uris]
+        self.replicas = [_Endpoint(u) for u in read_uris]
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+
+    def batch_endpoint(self):
+        """(uri, session) HTTP sehat pertama di jalur baca, untuk JSON-RPC batch CampaignLoader."""
+        for ep in self._ordered(self.replicas + self.primary):
+            if isinstance(ep.provider, PooledHTTPProvider):
+                return ep.uri, ep.provider.session
+        return None
+
+    def _ordered(self, endpoints):
+        # Endpoint sehat sesuai urutan konfigurasi, lalu yang sedang cooldown sebagai upaya terakhir
+        return [ep for ep in endpoints if ep.healthy] + [ep for ep in endpoints if not ep.healthy]
+
+    def _mark_down(self, ep, error):
+        with self._lock:
+            was_healthy = ep.healthy
+            ep.down_until = time.monotonic() + ENDPOINT_COOLDOWN
+        if was_healthy:
+            print(f"Web3 Provider: endpoint {ep.uri} gagal ({error}), dialihkan selama {ENDPOINT_COOLDOWN} detik")
+
+    def make_request(self, method, params):
+        if method in WRITE_METHODS:
+            ep = self._ordered(self.primary)[0]
+            try:
+                return ep.provider.make_request(method, params)
+            except TRANSIENT_ERRORS as e:
+                self._mark_down(ep, e)
+                raise
+
+        endpoints = self.primary if method in PRIMARY_READS or not self.replicas else self.replicas + self.primary
+        last_error = None
+        for attempt in range(self.retries + 1):
+            for ep in self._ordered(endpoints):
+                try:
+                    response = ep.provider.make_request(method, params)
+                    ep.down_until = 0
+                    return response
+                except TRANSIENT_ERRORS as e:
+                    last_error = e
+                    self._mark_down(ep, e)
+                    metrics.RPC_FAILOVERS.inc((method,))
+            if attempt < self.retries:
+                # Full jitter: hindari semua thread mencoba ulang bersamaan
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        raise last_error
+
+    def reset(self):
+        # Setelah fork: buat ulang provider (pool socket baru), status endpoint dimulai dari sehat
+        for ep in self.primary + self.replicas:
+            ep.provider = make_provider(ep.uri)
+            ep.down_until = 0
+
+    def is_connected(self, show_traceback=False):
+        return any(ep.provider.is_connected() for ep in self.primary + self.replicas)
+
+
+def build_provider(default_uri):
+    primary = [u.strip() for u in PRIMARY_URIS.split(',') if u.strip()] or [default_uri]
+    replicas = [u.strip() for u in READ_URIS.split(',') if u.strip()]
+    return NodePool(primary, replicas)
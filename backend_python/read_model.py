@@ -0,0 +1,183 @@
+import threading
+from web3 import Web3
+import db
+from campaign_loader import STATUS_MASK_ALL, is_listed
+
+# Event yang mengubah isi struct Campaign (hasil indexer di tabel chain_events)
+CAMPAIGN_EVENTS = ('CampaignCreated', 'DonationReceived', 'CampaignStatusChanged', 'CampaignEdited')
+
+
+class CampaignReadModel:
+    """Cache in-process berisi kampanye yang sudah di-decode + join campaign_details.
+
+    Kampanye dimuat sesuai kebutuhan (per halaman / per detail). Hanya kampanye yang sudah ada
+    di cache dan tersentuh event baru (atau di-invalidate manual) yang dibaca ulang dari node,
+    sehingga render halaman dalam kondisi stabil tidak melakukan RPC sama sekali.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._records = {}
+        self._dirty = set()
+        self._loaded = False
+        self.count = 0
+        self._event_cursor = 0
+        self._details_cursor = 0
+        self._synced_block = -1
+        self._lock = threading.RLock()
+        self.last_errors = {}
+        self.counters = {'hits': 0, 'misses': 0, 'refreshed': 0}
+
+    # --- KONVERSI STRUCT -> RECORD ---
+    def _build(self, c, detail):
+        return {
+            'id': c[0], 'creator': c[1], 'title': c[2], 'desc': c[3],
+            'target_wei': c[4], 'collected_wei': c[5],
+            'target': Web3.from_wei(c[4], 'ether'), 'collected': Web3.from_wei(c[5], 'ether'),
+            'image': c[6], 'deadline': c[7], 'status_code': c[8], 'fundsWithdrawn': c[9],
+            'detail': dict(detail) if detail else None,
+            'partial': c[3] is None   # Dari view ringkasan, description belum dimuat
+        }
+
+    def _store(self, rows, details):
+        for c in rows:
+            old = self._records.get(c[0])
+            record = self._build(c, details.get(c[0]))
+            if record['partial'] and old and not old['partial']:
+                record['desc'] = old['desc']; record['partial'] = False
+            self._records[c[0]] = record
+            self._dirty.discard(c[0])
+
+    def _details_for(self, conn, ids):
+        ids = list(ids)
+        if not ids: return {}
+        return {d['blockchain_id']: d for d in conn.execute(
+            f"SELECT * FROM campaign_details WHERE blockchain_id IN ({','.join('?' * len(ids))})", ids).fetchall()}
+
+    def _refresh(self, conn, ids):
+        ids = sorted(set(ids))
+        if not ids: return
+        loaded, errors = self.loader.load(ids)
+        self._store(loaded.values(), self._details_for(conn, loaded.keys()))
+        self.last_errors = errors
+        self.counters['refreshed'] += len(loaded)
+
+    # --- SINKRONISASI BERBASIS EVENT ---
+    def sync(self):
+        """Terapkan event baru dari indexer. Tanpa event baru, tidak ada RPC yang dikirim."""
+        with self._lock:
+            conn = db.get_connection()
+            state = conn.execute("SELECT last_block FROM indexer_state WHERE id = 1").fetchone()
+            if not self._loaded:
+                self._event_cursor = conn.execute("SELECT COALESCE(MAX(id), 0) FROM chain_events").fetchone()[0]
+                self._details_cursor = conn.execute("SELECT COALESCE(MAX(id), 0) FROM campaign_details").fetchone()[0]
+                self.count = self.loader.contract.functions.getCampaignCount().call()
+                self._loaded = True
+            else:
+                touched = set(self._dirty)
+                rows = conn.execute(f"SELECT id, campaign_id FROM chain_events WHERE id > ? AND event IN ({','.join('?' * len(CAMPAIGN_EVENTS))})",
+                                    (self._event_cursor, *CAMPAIGN_EVENTS)).fetchall()
+                for r in rows:
+                    touched.add(r['campaign_id'])
+                    self._event_cursor = max(self._event_cursor, r['id'])
+                if touched:
+                    self.count = max(self.count, max(touched) + 1)
+                    # Kampanye yang belum pernah dimuat tidak perlu dibaca sekarang (lazy)
+                    self._refresh(conn, [i for i in touched if i in self._records or i in self._dirty])
+
+                # campaign_details baru (kampanye baru dibuat) cukup di-join ulang dari SQLite
+                for d in conn.execute("SELECT * FROM campaign_details WHERE id > ?", (self._details_cursor,)).fetchall():
+                    self._details_cursor = max(self._details_cursor, d['id'])
+                    if d['blockchain_id'] in self._records:
+                        self._records[d['blockchain_id']]['detail'] = dict(d)
+            if state: self._synced_block = state['last_block']
+
+    def invalidate(self, campaign_id):
+        # Dipakai untuk perubahan yang tidak memancarkan event (mis. withdrawFunds) atau sebelum indexer menyusul.
+        # None = buang semua record (muat ulang dari awal saat dipakai)
+        with self._lock:
+            if campaign_id is None:
+                self._records.clear(); self._dirty.clear(); self._loaded = False
+                return
+            self._dirty.add(campaign_id)
+            self.count = max(self.count, campaign_id + 1)
+
+    # --- AKSES DATA ---
+    def get(self, campaign_id):
+        self.sync()
+        with self._lock:
+            record = self._records.get(campaign_id)
+            if record is not None and not record['partial']:
+                self.counters['hits'] += 1
+                return record
+            self.counters['misses'] += 1
+            self._refresh(db.get_connection(), [campaign_id])
+            if campaign_id in self.last_errors:
+                raise RuntimeError(self.last_errors[campaign_id])
+            return self._records[campaign_id]
+
+    def get_many(self, ids):
+        """Record untuk daftar id (urutan dipertahankan, mis. hasil pencarian); id yang gagal dibaca dilewati.
+
+        Record ringkasan (tanpa description) sudah cukup untuk kartu, jadi tidak dibaca ulang.
+        """
+        self.sync()
+        with self._lock:
+            missing = [i for i in ids if i not in self._records]
+            if missing:
+                self.counters['misses'] += 1
+                self._refresh(db.get_connection(), missing)
+            else:
+                self.counters['hits'] += 1
+            return [self._records[i] for i in ids if i in self._records]
+
+    def all(self):
+        self.sync()
+        with self._lock:
+            missing = [i for i in range(self.count) if i not in self._records or self._records[i]['partial']]
+            if missing:
+                self.counters['misses'] += 1
+                self._refresh(db.get_connection(), missing)
+            else:
+                self.counters['hits'] += 1
+            return [self._records[i] for i in sorted(self._records)]
+
+    def _fill_window(self, start):
+        # Fallback kontrak lama: muat satu jendela id berurutan, supaya halaman berikutnya cukup dari memori
+        ids = [i for i in range(start, min(self.count, start + self.loader.chunk_size)) if i not in self._records]
+        self._refresh(db.get_connection(), ids)
+        return start in self._records
+
+    def _load_listed(self, after, limit, status_mask, creator):
+        # Filter status/creator dijalankan view kontrak: hanya kampanye yang lolos yang dikirim node
+        rows, next_after, _ = self.loader.load_page(after, limit, self.count, status_mask, creator)
+        self._store(rows, self._details_for(db.get_connection(), [c[0] for c in rows]))
+        return [self._records[c[0]] for c in rows], next_after
+
+    def page(self, after=-1, limit=12, status_mask=STATUS_MASK_ALL, creator=None):
+        """Keyset pagination (id > after). Mengembalikan (records, next_after, has_more)."""
+        self.sync()
+        with self._lock:
+            result = []; i = after + 1; missed = False
+            while i < self.count and len(result) < limit:
+                record = self._records.get(i)
+                if record is None and self.loader.has_summaries:
+                    missed = True
+                    rows, next_after = self._load_listed(i - 1, limit - len(result), status_mask, creator)
+                    result.extend(rows)
+                    i = next_after + 1
+                    continue
+                if record is None:
+                    missed = True
+                    if not self._fill_window(i):
+                        i += 1   # Gagal dibaca (lihat last_errors), lewati
+                    continue
+                if is_listed(record['status_code'], record['creator'], status_mask, creator):
+                    result.append(record)
+                i += 1
+            self.counters['misses' if missed else 'hits'] += 1
+            return result, i - 1, i < self.count
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, campaigns=len(self._records), synced_block=self._synced_block)
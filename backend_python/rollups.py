@@ -0,0 +1,122 @@
+import time
+
+# --- ROLLUP STATISTIK (MATERIALIZED) ---
+# Diperbarui bertahap dari chain_events (indexer) & tabel donations, dalam transaksi yang sama
+# dengan indexer. Nominal disimpan dalam wei (integer) sebagai TEXT ber-padding nol agar
+# ORDER BY tetap benar untuk nilai di atas batas INTEGER SQLite.
+WEI_DIGITS = 78           # Cukup untuk uint256
+BUCKETS = {'h': 3600, 'd': 86400}   # Bucket volume per jam & per hari (UTC)
+
+
+def to_wei_text(n):
+    return format(int(n), f'0{WEI_DIGITS}d')
+
+def _add(conn, sql_select, params, amount):
+    row = conn.execute(sql_select, params).fetchone()
+    return to_wei_text((int(row[0]) if row and row[0] else 0) + amount)
+
+
+# --- PENERAPAN EVENT ---
+def _ensure_campaign(conn, campaign_id):
+    # Status NULL = baris sudah ada (mis. pesan donasi lebih dulu tercatat) tapi CampaignCreated belum diproses
+    conn.execute("INSERT OR IGNORE INTO campaign_stats (campaign_id, status, total_wei, donation_count, donor_count, message_count) "
+                 "VALUES (?, NULL, ?, 0, 0, 0)", (campaign_id, to_wei_text(0)))
+
+def _on_created(conn, e):
+    _ensure_campaign(conn, e['campaign_id'])
+    cur = conn.execute("UPDATE campaign_stats SET status = 0 WHERE campaign_id = ? AND status IS NULL", (e['campaign_id'],))
+    if cur.rowcount:
+        conn.execute("UPDATE status_counts SET n = n + 1 WHERE status = 0")
+
+def _on_status(conn, e):
+    row = conn.execute("SELECT status FROM campaign_stats WHERE campaign_id = ?", (e['campaign_id'],)).fetchone()
+    if row is None or row['status'] is None or row['status'] == e['status']:
+        return
+    conn.execute("UPDATE status_counts SET n = n - 1 WHERE status = ?", (row['status'],))
+    conn.execute("UPDATE status_counts SET n = n + 1 WHERE status = ?", (e['status'],))
+    conn.execute("UPDATE campaign_stats SET status = ? WHERE campaign_id = ?", (e['status'], e['campaign_id']))
+
+def _on_donation(conn, e):
+    amount = int(e['amount_wei'])
+    cid, donor = e['campaign_id'], e['actor']
+    _ensure_campaign(conn, cid)
+
+    new_pair = conn.execute("INSERT OR IGNORE INTO donor_stats (campaign_id, donor, total_wei, donation_count) VALUES (?, ?, ?, 0)",
+                            (cid, donor, to_wei_text(0))).rowcount
+    conn.execute("UPDATE donor_stats SET total_wei = ?, donation_count = donation_count + 1 WHERE campaign_id = ? AND donor = ?",
+                 (_add(conn, "SELECT total_wei FROM donor_stats WHERE campaign_id = ? AND donor = ?", (cid, donor), amount), cid, donor))
+
+    conn.execute("UPDATE campaign_stats SET total_wei = ?, donation_count = donation_count + 1, donor_count = donor_count + ? WHERE campaign_id = ?",
+                 (_add(conn, "SELECT total_wei FROM campaign_stats WHERE campaign_id = ?", (cid,), amount), new_pair, cid))
+
+    new_donor = conn.execute("INSERT OR IGNORE INTO donor_totals (donor, total_wei, donation_count, campaign_count) VALUES (?, ?, 0, 0)",
+                             (donor, to_wei_text(0))).rowcount
+    conn.execute("UPDATE donor_totals SET total_wei = ?, donation_count = donation_count + 1, campaign_count = campaign_count + ? WHERE donor = ?",
+                 (_add(conn, "SELECT total_wei FROM donor_totals WHERE donor = ?", (donor,), amount), new_pair, donor))
+    conn.execute("UPDATE rollup_state SET donation_count = donation_count + 1, donor_count = donor_count + ? WHERE id = 1", (new_donor,))
+
+    for bucket, size in BUCKETS.items():
+        start = e['timestamp'] - e['timestamp'] % size
+        conn.execute("INSERT OR IGNORE INTO volume_buckets (bucket, start, total_wei, donation_count) VALUES (?, ?, ?, 0)",
+                     (bucket, start, to_wei_text(0)))
+        conn.execute("UPDATE volume_buckets SET total_wei = ?, donation_count = donation_count + 1 WHERE bucket = ? AND start = ?",
+                     (_add(conn, "SELECT total_wei FROM volume_buckets WHERE bucket = ? AND start = ?", (bucket, start), amount), bucket, start))
+
+APPLY = {'CampaignCreated': _on_created, 'CampaignStatusChanged': _on_status, 'DonationReceived': _on_donation}
+
+
+def catch_up(conn):
+    """Terapkan event & pesan donasi baru sejak cursor terakhir. Tidak melakukan commit."""
+    state = conn.execute("SELECT last_event_id, last_donation_id FROM rollup_state WHERE id = 1").fetchone()
+    last_event, last_donation = state['last_event_id'], state['last_donation_id']
+    applied = 0
+    for e in conn.execute("SELECT * FROM chain_events WHERE id > ? ORDER BY id", (last_event,)).fetchall():
+        handler = APPLY.get(e['event'])
+        if handler: handler(conn, e)
+        last_event = e['id']; applied += 1
+    # Pesan donasi off-chain (tabel donations) dihitung per kampanye
+    for d in conn.execute("SELECT id, blockchain_id FROM donations WHERE id > ? ORDER BY id", (last_donation,)).fetchall():
+        _ensure_campaign(conn, d['blockchain_id'])
+        conn.execute("UPDATE campaign_stats SET message_count = message_count + 1 WHERE campaign_id = ?", (d['blockchain_id'],))
+        last_donation = d['id']; applied += 1
+    if applied:
+        conn.execute("UPDATE rollup_state SET last_event_id = ?, last_donation_id = ? WHERE id = 1", (last_event, last_donation))
+    return applied
+
+def rebuild(conn):
+    # Dipakai setelah rollback reorg / reset kontrak: hitung ulang dari chain_events yang tersisa
+    for table in ('campaign_stats', 'donor_stats', 'donor_totals', 'volume_buckets'):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("UPDATE status_counts SET n = 0")
+    conn.execute("UPDATE rollup_state SET last_event_id = 0, last_donation_id = 0, donation_count = 0, donor_count = 0 WHERE id = 1")
+    return catch_up(conn)
+
+
+# --- BACA ROLLUP ---
+def status_counts(conn):
+    return {r['status']: r['n'] for r in conn.execute("SELECT status, n FROM status_counts").fetchall()}
+
+def totals(conn):
+    row = conn.execute("SELECT donation_count, donor_count FROM rollup_state WHERE id = 1").fetchone()
+    return {'donations': row['donation_count'], 'donors': row['donor_count']}
+
+def campaign_stats(conn, ids):
+    ids = list(ids)
+    if not ids: return {}
+    rows = conn.execute(f"SELECT * FROM campaign_stats WHERE campaign_id IN ({','.join('?' * len(ids))})", ids).fetchall()
+    return {r['campaign_id']: dict(r, total_wei=int(r['total_wei'])) for r in rows}
+
+def top_donors(conn, limit=10):
+    rows = conn.execute("SELECT * FROM donor_totals ORDER BY total_wei DESC LIMIT ?", (limit,)).fetchall()
+    return [dict(r, total_wei=int(r['total_wei'])) for r in rows]
+
+def volume(conn, bucket='h', since=None):
+    # Tanpa since: tepat 24 jam terakhir dalam bucket utuh (24 bucket jam / 1 bucket hari, termasuk bucket berjalan).
+    # Dengan since: mulai dari bucket yang memuat since.
+    size = BUCKETS[bucket]
+    if since is None:
+        now = int(time.time())
+        since = now - now % size - (max(86400 // size, 1) - 1) * size
+    rows = conn.execute("SELECT start, total_wei, donation_count FROM volume_buckets WHERE bucket = ? AND start > ? ORDER BY start",
+                        (bucket, since - size)).fetchall()
+    return [dict(r, total_wei=int(r['total_wei'])) for r in rows]
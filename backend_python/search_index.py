@@ -0,0 +1,125 @@
+import re
+from campaign_loader import STATUS_MASK_ALL
+
+# --- INDEKS PENCARIAN KAMPANYE (SQLite FTS5) ---
+# Tabel campaign_search diisi bertahap dari chain_events (judul, creator, status) dan campaign_details
+# (kategori, tagline, rencana penggunaan) dalam transaksi indexer; campaign_fts mengikutinya lewat trigger.
+# Description tidak ada di event, jadi dibaca dari node di background (needs_refresh = 1).
+DESCRIPTION_BATCH = 500   # Kampanye per putaran pengisian description
+MAX_TERMS = 8             # Kata kunci per query (sisanya diabaikan)
+# Bobot bm25 per kolom: title, description, tagline, category, usage_plan
+RANK = 'bm25(campaign_fts, 10.0, 1.0, 4.0, 2.0, 1.0)'
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def match_query(q):
+    """Ubah input bebas pengguna jadi ekspresi MATCH FTS5 yang aman; None jika tidak ada kata kunci.
+
+    Setiap kata di-quote (operator FTS5 seperti NOT / NEAR / kolom: tidak bisa disisipkan) dan
+    kata terakhir dicari sebagai prefix, supaya hasil sudah muncul saat pengguna masih mengetik.
+    """
+    terms = TERM_RE.findall(q or '')[:MAX_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def _statuses(mask):
+    return [s for s in range(4) if mask & (1 << s)]
+
+
+# --- PENERAPAN EVENT & DETAIL ---
+def _on_created(conn, e):
+    conn.execute("INSERT INTO campaign_search (campaign_id, creator, status, title, needs_refresh) VALUES (?, ?, 0, ?, 1) "
+                 "ON CONFLICT (campaign_id) DO UPDATE SET creator = excluded.creator, title = excluded.title, "
+                 "status = COALESCE(status, 0), needs_refresh = 1",
+                 (e['campaign_id'], e['actor'], e['title']))
+
+def _on_edited(conn, e):
+    conn.execute("UPDATE campaign_search SET title = ?, needs_refresh = 1 WHERE campaign_id = ?", (e['title'], e['campaign_id']))
+
+def _on_status(conn, e):
+    conn.execute("UPDATE campaign_search SET status = ? WHERE campaign_id = ?", (e['status'], e['campaign_id']))
+
+APPLY = {'CampaignCreated': _on_created, 'CampaignEdited': _on_edited, 'CampaignStatusChanged': _on_status}
+
+
+def catch_up(conn):
+    """Terapkan event & campaign_details baru sejak cursor terakhir. Tidak melakukan commit."""
+    state = conn.execute("SELECT last_event_id, last_detail_id FROM search_state WHERE id = 1").fetchone()
+    last_event, last_detail = state['last_event_id'], state['last_detail_id']
+    applied = 0
+    for e in conn.execute(f"SELECT * FROM chain_events WHERE id > ? AND event IN ({','.join('?' * len(APPLY))}) ORDER BY id",
+                          (last_event, *APPLY)).fetchall():
+        APPLY[e['event']](conn, e)
+        last_event = e['id']; applied += 1
+    # Detail bisa tercatat sebelum CampaignCreated ter-index -> baris dibuat dulu, status menyusul
+    for d in conn.execute("SELECT * FROM campaign_details WHERE id > ? ORDER BY id", (last_detail,)).fetchall():
+        conn.execute("INSERT INTO campaign_search (campaign_id, category, tagline, usage_plan) VALUES (?, ?, ?, ?) "
+                     "ON CONFLICT (campaign_id) DO UPDATE SET category = excluded.category, tagline = excluded.tagline, "
+                     "usage_plan = excluded.usage_plan",
+                     (d['blockchain_id'], d['category'], d['tagline'], d['usage_plan']))
+        last_detail = d['id']; applied += 1
+    head = conn.execute("SELECT COALESCE(MAX(id), 0) FROM chain_events").fetchone()[0]
+    if applied or head > state['last_event_id']:
+        conn.execute("UPDATE search_state SET last_event_id = ?, last_detail_id = ? WHERE id = 1", (max(last_event, head), last_detail))
+    return applied
+
+def rebuild(conn):
+    # Dipakai setelah rollback reorg / reset kontrak: isi ulang dari chain_events & campaign_details
+    conn.execute("DELETE FROM campaign_search")
+    conn.execute("INSERT INTO campaign_fts (campaign_fts) VALUES ('delete-all')")
+    conn.execute("UPDATE search_state SET last_event_id = 0, last_detail_id = 0 WHERE id = 1")
+    return catch_up(conn)
+
+def fill_descriptions(conn, loader, limit=DESCRIPTION_BATCH):
+    """Baca description kampanye baru/diedit dari node (1 batch RPC per chunk). Melakukan commit.
+
+    Kampanye yang gagal dibaca tetap ditandai dan dicoba lagi di putaran berikutnya.
+    """
+    ids = [r[0] for r in conn.execute("SELECT campaign_id FROM campaign_search WHERE needs_refresh = 1 "
+                                      "ORDER BY campaign_id LIMIT ?", (limit,)).fetchall()]
+    if not ids:
+        return 0
+    loaded, _ = loader.load(ids)
+    conn.executemany("UPDATE campaign_search SET title = ?, description = ?, needs_refresh = 0 WHERE campaign_id = ?",
+                     [(c[2], c[3], i) for i, c in loaded.items()])
+    conn.commit()
+    return len(loaded)
+
+
+# --- QUERY ---
+def search(conn, q=None, category=None, status_mask=STATUS_MASK_ALL, creator=None, statuses=STATUS_MASK_ALL, after=-1, limit=12):
+    """Cari kampanye; mengembalikan (ids, next_after, has_more).
+
+    Visibilitas sama dengan campaign_loader.is_listed (status di status_mask, atau milik creator
+    kecuali DELETED), lalu dipersempit ke `statuses`. Dengan q, hasil diurutkan berdasarkan relevansi
+    dan `after` adalah posisi hasil terakhir yang sudah ditampilkan; tanpa q, `after` adalah id
+    kampanye terakhir (keyset, urut id).
+    """
+    visible = [s for s in _statuses(status_mask) if statuses & (1 << s)]
+    where = [f"s.status IN ({','.join('?' * len(visible)) or 'NULL'})"]
+    params = list(visible)
+    if creator:
+        own = [s for s in _statuses(statuses) if s != 3]
+        where[0] = f"({where[0]} OR (s.creator = ? AND s.status IN ({','.join('?' * len(own)) or 'NULL'})))"
+        params += [creator, *own]
+    if category:
+        where.append("s.category = ?"); params.append(category)
+
+    match = match_query(q)
+    if match:
+        rows = conn.execute(f"SELECT s.campaign_id FROM campaign_fts JOIN campaign_search s ON s.campaign_id = campaign_fts.rowid "
+                            f"WHERE campaign_fts MATCH ? AND {' AND '.join(where)} ORDER BY {RANK}, s.campaign_id LIMIT ? OFFSET ?",
+                            (match, *params, limit + 1, after + 1)).fetchall()
+        ids = [r[0] for r in rows[:limit]]
+        return ids, after + len(ids), len(rows) > limit
+
+    rows = conn.execute(f"SELECT s.campaign_id FROM campaign_search s WHERE s.campaign_id > ? AND {' AND '.join(where)} "
+                        "ORDER BY s.campaign_id LIMIT ?", (after, *params, limit + 1)).fetchall()
+    ids = [r[0] for r in rows[:limit]]
+    return ids, ids[-1] if ids else after, len(rows) > limit
+
+def categories(conn):
+    return [r[0] for r in conn.execute("SELECT DISTINCT category FROM campaign_search WHERE category IS NOT NULL ORDER BY category").fetchall()]
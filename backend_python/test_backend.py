@@ -0,0 +1,529 @@
+"""Test unit/regresi backend tanpa Ganache.
+
+Jalankan dari folder backend_python:
+    python -m unittest test_backend      (atau: python -m pytest test_backend.py)
+
+Test yang butuh chain memakai eth-tester in-process lewat benchmark.boot (dilewati jika
+eth-tester belum terpasang). test_integration.py tetap dijalankan manual terhadap Ganache.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from web3.exceptions import TimeExhausted
+from werkzeug.exceptions import Forbidden, NotFound
+
+# Database sementara untuk semua test (db membaca DATABASE_PATH saat pertama di-import)
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='test_backend_'), 'test.db')
+
+import benchmark
+import db
+import rollups
+from news_service import NewsService
+
+RSS_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Stand-in</title>
+<item><title>Banjir rendam desa {n}</title><link>http://example.test/{n}</link>
+<description>Warga membutuhkan bantuan</description><pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>
+<item><title>Harga saham naik</title><link>http://example.test/saham</link><description>Pasar modal</description></item>
+</channel></rss>"""
+
+
+# --- SUMBER RSS LOKAL (http.server) ---
+class FeedHandler(BaseHTTPRequestHandler):
+    hits = {}   # path -> [jumlah 200, jumlah 304]
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        counts = FeedHandler.hits.setdefault(self.path, [0, 0])
+        if self.path == '/slow':
+            time.sleep(1.5)
+        if self.path == '/error':
+            self.send_response(500); self.end_headers(); return
+        etag = f'"{self.path}-v1"'
+        if self.headers.get('If-None-Match') == etag:
+            counts[1] += 1
+            self.send_response(304); self.send_header('ETag', etag); self.end_headers(); return
+        counts[0] += 1
+        body = RSS_FEED.replace(b'{n}', self.path.strip('/').encode())
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml'); self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body))); self.end_headers()
+        self.wfile.write(body)
+
+
+class NewsServiceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        FeedHandler.hits.clear()
+
+    def sources(self, *paths):
+        return [{'url': self.base + p, 'name': p.strip('/')} for p in paths]
+
+    def test_not_modified_reuses_cached_items(self):
+        service = NewsService(self.sources('/a', '/b'), timeout=1)
+        service.refresh()
+        first = service.get_news()
+        self.assertEqual(sorted(n['source'] for n in first), ['a', 'b'])
+
+        service.refresh()
+        self.assertEqual(service.get_news(), first)
+        # Request kedua dikirim dengan If-None-Match -> 304, feed tidak diunduh/di-parse ulang
+        self.assertEqual(FeedHandler.hits['/a'], [1, 1])
+        self.assertEqual(FeedHandler.hits['/b'], [1, 1])
+
+    def test_slow_and_failing_sources_are_skipped(self):
+        service = NewsService(self.sources('/a', '/slow', '/error', '/b'), timeout=0.5)
+        started = time.monotonic()
+        service.refresh()
+        elapsed = time.monotonic() - started
+
+        news = service.get_news()
+        self.assertEqual(sorted(n['source'] for n in news), ['a', 'b'])
+        self.assertTrue(all('Banjir' in n['title'] for n in news))   # Berita tanpa kata kunci difilter
+        # Sumber diambil paralel: total waktu dibatasi timeout sumber yang lambat, bukan jumlah sumber
+        self.assertLess(elapsed, 1.4)
+
+
+# --- MIGRASI SKEMA ---
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(prefix='test_migrate_'), 'migrate.db')
+
+    def columns(self, table):
+        conn = db.connect(self.path)
+        try:
+            return {r['name'] for r in conn.execute(f"PRAGMA table_info({table})")}
+        finally:
+            conn.close()
+
+    def test_failed_migration_rolls_back_ddl(self):
+        self.assertEqual(db.migrate(self.path), db.SCHEMA_VERSION)
+        broken = ['ALTER TABLE tx_jobs ADD COLUMN probe TEXT', 'INSERT INTO tabel_tidak_ada VALUES (1)']
+        with mock.patch.object(db, 'MIGRATIONS', db.MIGRATIONS + [broken]), \
+             mock.patch.object(db, 'SCHEMA_VERSION', db.SCHEMA_VERSION + 1):
+            with self.assertRaises(Exception):
+                db.migrate(self.path)
+            self.assertNotIn('probe', self.columns('tx_jobs'))
+
+            # Migrasi yang sudah diperbaiki bisa dijalankan ulang (tidak "duplicate column")
+            db.MIGRATIONS[-1] = broken[:1]
+            self.assertEqual(db.migrate(self.path), db.SCHEMA_VERSION)
+        self.assertIn('probe', self.columns('tx_jobs'))
+
+
+# --- ROLLUP VOLUME ---
+class VolumeTest(unittest.TestCase):
+    def test_default_window_is_exactly_24_hours(self):
+        path = os.path.join(tempfile.mkdtemp(prefix='test_volume_'), 'volume.db')
+        db.migrate(path)
+        conn = db.connect(path)
+        now = int(time.time())
+        for bucket, size, count in (('h', 3600, 30), ('d', 86400, 3)):
+            conn.executemany("INSERT INTO volume_buckets (bucket, start, total_wei, donation_count) VALUES (?, ?, ?, 1)",
+                             [(bucket, now - now % size - k * size, rollups.to_wei_text(1)) for k in range(count)])
+        # "Volume 24 jam" admin: 24 bucket jam termasuk jam berjalan, bukan 25
+        self.assertEqual(len(rollups.volume(conn, 'h')), 24)
+        self.assertEqual(len(rollups.volume(conn, 'd')), 1)
+        self.assertEqual(len(rollups.volume(conn, 'h', since=now - 3600)), 2)
+        conn.close()
+
+
+# --- CHAIN IN-PROCESS (eth-tester) ---
+_booted = None
+
+def artifact_functions():
+    # Fungsi kontrak di artifact Truffle yang di-deploy benchmark.boot (fitur baru butuh truffle compile)
+    import contract_data
+    try:
+        with open(contract_data.ARTIFACT_PATH) as f:
+            return {entry.get('name') for entry in json.load(f)['abi'] if entry.get('type') == 'function'}
+    except (OSError, ValueError, KeyError):
+        return set()
+
+ARTIFACT_FUNCTIONS = artifact_functions()
+
+def boot_chain():
+    # app hanya bisa di-import sekali per proses -> satu chain & database untuk semua test chain
+    global _booted
+    if _booted is None:
+        _booted = benchmark.boot(os.environ['DATABASE_PATH'])
+    return _booted
+
+def second_pipeline(w3):
+    # Worker/proses lain yang berbagi database yang sama (import setelah boot: db membaca DATABASE_PATH saat import)
+    from tx_pipeline import TxPipeline
+    return TxPipeline(w3, workers=1)
+
+
+@unittest.skipIf(benchmark.EthereumTesterProvider is None, 'eth-tester belum terpasang')
+class ChainTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app, cls.w3, cls.contract = boot_chain()
+        cls.accounts = cls.w3.eth.accounts
+        cls.conn = cls.app.db.connect()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def create_campaign(self, creator, title='Kampanye Test'):
+        self.contract.functions.createCampaign(title, 'Deskripsi', self.w3.to_wei(5, 'ether'), '', 600).transact({'from': creator})
+        campaign_id = self.contract.functions.getCampaignCount().call() - 1
+        self.contract.functions.approveCampaign(campaign_id).transact({'from': self.accounts[0]})
+        return campaign_id
+
+    def count(self, sql, *params):
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def statuses(self):
+        return [self.contract.functions.getCampaign(i).call()[8] for i in range(self.contract.functions.getCampaignCount().call())]
+
+
+class ReadModelPageTest(ChainTestCase):
+    APPROVED_MASK = 1 << 1
+
+    def setUp(self):
+        self.create_campaign(self.accounts[1], 'Disetujui')
+        self.contract.functions.createCampaign('Menunggu', 'Deskripsi', 1, '', 600).transact({'from': self.accounts[4]})
+        rejected = self.create_campaign(self.accounts[1], 'Ditolak')
+        self.contract.functions.rejectCampaign(rejected).transact({'from': self.accounts[0]})
+        self.app.indexer.poll_once()
+        self.app.read_model.invalidate(None)
+
+    def test_page_filters_by_status_and_creator(self):
+        statuses = self.statuses()
+        page, _, has_more = self.app.read_model.page(-1, 100, status_mask=self.APPROVED_MASK)
+        self.assertEqual([r['id'] for r in page], [i for i, s in enumerate(statuses) if s == 1])
+        self.assertFalse(has_more)
+
+        # Kampanye PENDING milik creator ikut tampil di daftarnya sendiri
+        page, _, _ = self.app.read_model.page(-1, 100, status_mask=self.APPROVED_MASK, creator=self.accounts[4])
+        self.assertIn(len(statuses) - 2, [r['id'] for r in page])
+
+    @unittest.skipUnless('getCampaignSummaries' in ARTIFACT_FUNCTIONS, 'artifact belum memuat getCampaignSummaries (jalankan truffle compile)')
+    def test_page_uses_summary_view(self):
+        loader = self.app.read_model.loader
+        self.assertTrue(loader.has_summaries)
+        statuses = self.statuses()
+        # Jalur ringkasan: satu eth_call dengan mask status, tanpa getCampaign per id
+        with mock.patch.object(loader, 'load', side_effect=AssertionError('fallback getCampaign dipakai')), \
+             mock.patch.object(loader, 'load_page', wraps=loader.load_page) as load_page:
+            page, next_after, _ = self.app.read_model.page(-1, 2, status_mask=self.APPROVED_MASK)
+        self.assertEqual([r['id'] for r in page], [i for i, s in enumerate(statuses) if s == 1][:2])
+        self.assertEqual(load_page.call_count, 1)
+        self.assertEqual(load_page.call_args.args[3], self.APPROVED_MASK)
+        self.assertEqual(next_after, page[-1]['id'])
+        self.assertIsNone(page[0]['desc'])   # Ringkasan tidak membawa description
+
+
+class BasketCheckoutTest(ChainTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        keys = {k.public_key.to_checksum_address(): k.to_hex() for k in cls.w3.provider.ethereum_tester.backend.account_keys}
+        cls.wallet = cls.accounts[8]
+        cls.conn.execute("INSERT OR IGNORE INTO users (username, email, password, role, wallet_address, private_key, profile_pic) "
+                         "VALUES ('donatur keranjang', 'keranjang@test.local', 'test', 'donatur', ?, ?, 'default_user.png')",
+                         (cls.wallet, keys[cls.wallet]))
+        cls.conn.commit()
+        cls.user_id = cls.count("SELECT id FROM users WHERE wallet_address = ?", cls.wallet)
+
+    @classmethod
+    def count(cls, sql, *params):
+        return cls.conn.execute(sql, params).fetchone()[0]
+
+    def checkout(self, basket):
+        self.app.indexer.poll_once()
+        with self.app.app.test_request_context('/basket/checkout', method='POST', data={'message': 'Semangat'}):
+            self.app.session.update(role='donatur', user_id=self.user_id, wallet=self.wallet, basket=basket)
+            self.app.app.view_functions['basket_checkout']()
+        jobs = self.conn.execute("SELECT id, kind, tx_hash FROM tx_jobs WHERE wallet = ? ORDER BY created_at, rowid", (self.wallet,)).fetchall()[-len(basket):]
+        deadline = time.monotonic() + 30
+        while self.count("SELECT COUNT(*) FROM tx_jobs WHERE status = 'submitted' AND wallet = ?", self.wallet) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return jobs
+
+    def collected(self, campaign_id):
+        return self.contract.functions.getCampaign(campaign_id).call()[5]
+
+    def test_checkout_records_every_leg(self):
+        ids = [self.create_campaign(self.accounts[1]) for _ in range(2)]
+        self.checkout({str(ids[0]): '0.25', str(ids[1]): '0.000000000000000001'})
+        self.assertEqual([self.collected(i) for i in ids], [self.w3.to_wei('0.25', 'ether'), 1])
+        rows = self.conn.execute("SELECT blockchain_id, amount FROM donations WHERE blockchain_id IN (?, ?) ORDER BY blockchain_id", ids).fetchall()
+        self.assertEqual([tuple(r) for r in rows], [(ids[0], 0.25), (ids[1], 1e-18)])
+
+    @unittest.skipUnless('donateToCampaigns' in ARTIFACT_FUNCTIONS, 'artifact belum memuat donateToCampaigns (jalankan truffle compile)')
+    def test_checkout_sends_one_basket_transaction(self):
+        self.assertTrue(self.app.has_basket_donation())
+        ids = [self.create_campaign(self.accounts[1]) for _ in range(3)]
+        block = self.w3.eth.block_number
+        jobs = self.checkout({str(i): '0.1' for i in ids})
+        self.assertEqual(self.w3.eth.block_number - block, 1)
+        self.assertEqual(jobs[-1]['kind'], 'donate_basket')
+        tx_hash = jobs[-1]['tx_hash']
+        self.assertEqual(self.count("SELECT COUNT(*) FROM donations WHERE tx_hash = ?", tx_hash), 3)
+        self.assertEqual({self.collected(i) for i in ids}, {self.w3.to_wei('0.1', 'ether')})
+
+
+class DonationExportTest(ChainTestCase):
+    def donate(self, campaign_id, donor):
+        tx_hash = self.w3.to_hex(self.contract.functions.donateToCampaign(campaign_id).transact({'from': donor, 'value': 1}))
+        self.conn.execute("INSERT INTO donations (blockchain_id, donor_name, amount, message, timestamp, tx_hash) VALUES (?, 'x', 1, '', '', ?)",
+                          (campaign_id, tx_hash))
+        self.conn.commit()
+        block = self.w3.eth.get_block('latest')
+        return tx_hash, block['number'], block['timestamp']
+
+    def exported(self, **args):
+        import export
+        where, params = export.donation_filters(args)
+        upto = export.head_id(self.conn, 'donations')
+        return [r['tx_hash'] for rows in export.iter_chunks('donations', 'id, tx_hash', where, params, -1, upto) for r in rows]
+
+    def test_filters_by_donor_address_block_and_time(self):
+        campaign_id = self.create_campaign(self.accounts[1])
+        first, first_block, first_time = self.donate(campaign_id, self.accounts[2])
+        self.w3.provider.ethereum_tester.time_travel(first_time + 60)
+        second, second_block, second_time = self.donate(campaign_id, self.accounts[3])
+        self.app.indexer.poll_once()
+
+        self.assertEqual(self.exported(campaign=str(campaign_id), donor=self.accounts[3].lower()), [second])
+        self.assertEqual(self.exported(campaign=str(campaign_id), from_block=str(second_block)), [second])
+        self.assertEqual(self.exported(campaign=str(campaign_id), to_block=str(first_block)), [first])
+        self.assertEqual(self.exported(campaign=str(campaign_id), since=str(first_time), until=str(second_time)), [first])
+        self.assertEqual(self.exported(campaign=str(campaign_id), since=str(second_time)), [second])
+
+
+class IndexerReorgTest(ChainTestCase):
+    def index_snapshot(self):
+        return (self.count("SELECT COUNT(*) FROM chain_events"),
+                self.count("SELECT COUNT(*) FROM indexer_checkpoints"),
+                self.count("SELECT last_block FROM indexer_state WHERE id = 1"))
+
+    def test_unreachable_node_keeps_index(self):
+        self.create_campaign(self.accounts[1])
+        self.app.indexer.poll_once()
+        before = self.index_snapshot()
+        self.assertGreater(before[0], 0)
+
+        # Node mati saat cek reorg: error diteruskan ke pemanggil, bukan dianggap reorg
+        with mock.patch.object(self.app.indexer.web3.eth, 'get_block', side_effect=requests.exceptions.ConnectionError('node mati')):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.app.indexer.poll_once()
+        self.assertEqual(self.index_snapshot(), before)
+
+    def test_reorg_rolls_back_orphaned_events(self):
+        tester = self.w3.provider.ethereum_tester
+        campaign_id = self.create_campaign(self.accounts[1])
+        self.app.indexer.poll_once()
+        snapshot = tester.take_snapshot()
+
+        orphan = self.w3.to_hex(self.contract.functions.donateToCampaign(campaign_id).transact(
+            {'from': self.accounts[2], 'value': self.w3.to_wei(1, 'ether')}))
+        self.app.indexer.poll_once()
+        self.assertEqual(self.count("SELECT COUNT(*) FROM chain_events WHERE tx_hash = ?", orphan), 1)
+
+        # Chain alternatif dengan tinggi yang sama: blok donasi diganti blok lain
+        tester.revert_to_snapshot(snapshot)
+        replacement = self.w3.to_hex(self.contract.functions.createCampaign('Fork', 'Deskripsi', 1, '', 600).transact({'from': self.accounts[3]}))
+        self.app.indexer.poll_once()
+        self.assertEqual(self.count("SELECT COUNT(*) FROM chain_events WHERE tx_hash = ?", orphan), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM chain_events WHERE tx_hash = ?", replacement), 1)
+        self.assertEqual(self.count("SELECT last_block FROM indexer_state WHERE id = 1"), self.w3.eth.block_number)
+
+
+class ModerationTest(ChainTestCase):
+    def pending_campaigns(self, n):
+        ids = []
+        for _ in range(n):
+            self.contract.functions.createCampaign('Moderasi', 'Deskripsi', 1, '', 600).transact({'from': self.accounts[1]})
+            ids.append(self.contract.functions.getCampaignCount().call() - 1)
+        return ids
+
+    def test_single_moderation_requires_admin(self):
+        campaign_id = self.pending_campaigns(1)[0]
+        for endpoint in ('approve_campaign', 'reject_campaign', 'delete_campaign'):
+            with self.app.app.test_request_context():
+                self.assertEqual(self.app.app.view_functions[endpoint](id=campaign_id), "Akses Ditolak")
+        self.assertEqual(self.statuses()[campaign_id], 0)
+
+    def test_bulk_moderation_reports_unknown_ids(self):
+        ids = self.pending_campaigns(3)
+        succeeded, failed = self.app.moderator.run('approve', ids + [10 ** 6], self.accounts[0])
+        self.assertEqual(succeeded, ids)
+        self.assertEqual(list(failed), [10 ** 6])
+        self.assertEqual({self.statuses()[i] for i in ids}, {1})
+
+    @unittest.skipUnless({'approveCampaigns', 'rejectCampaigns', 'deleteCampaigns'} <= ARTIFACT_FUNCTIONS,
+                         'artifact belum memuat fungsi moderasi batch (jalankan truffle compile)')
+    def test_bulk_moderation_sends_one_transaction_per_chunk(self):
+        self.assertTrue(self.app.moderator.has_batch)
+        ids = self.pending_campaigns(3)
+        block = self.w3.eth.block_number
+        succeeded, failed = self.app.moderator.run('reject', ids, self.accounts[0])
+        self.assertEqual((succeeded, failed), (ids, {}))
+        self.assertEqual(self.w3.eth.block_number - block, 1)   # eth-tester: satu blok per transaksi
+        self.assertEqual({self.statuses()[i] for i in ids}, {2})
+
+
+class MetricsAccessTest(ChainTestCase):
+    def scrape(self, headers=None, remote_addr='203.0.113.7', role=None):
+        with self.app.app.test_request_context('/metrics', headers=headers or {}, environ_base={'REMOTE_ADDR': remote_addr}):
+            if role: self.app.session['role'] = role
+            return self.app.app.view_functions['metrics_endpoint']()
+
+    def test_anonymous_scrape_is_forbidden(self):
+        with self.assertRaises(Forbidden):
+            self.scrape()
+        with mock.patch.object(self.app.metrics, 'METRICS_TOKEN', 'rahasia'), self.assertRaises(Forbidden):
+            self.scrape({'Authorization': 'Bearer salah'})
+
+    def test_token_allowlist_and_admin_can_scrape(self):
+        with mock.patch.object(self.app.metrics, 'METRICS_TOKEN', 'rahasia'):
+            self.assertEqual(self.scrape({'Authorization': 'Bearer rahasia'}).status_code, 200)
+        with mock.patch.object(self.app.metrics, 'METRICS_ALLOW_IPS', {'10.0.0.5'}):
+            self.assertEqual(self.scrape(remote_addr='10.0.0.5').status_code, 200)
+        self.assertIn(b'http_requests_total', self.scrape(role='admin').data)
+
+
+class ContractReloadTest(ChainTestCase):
+    def write_artifact(self, abi, mtime):
+        with open(self.artifact_path, 'w') as f:
+            json.dump({'abi': abi, 'networks': {}}, f)
+        os.utime(self.artifact_path, (mtime, mtime))
+
+    def test_abi_derived_features_follow_reloaded_artifact(self):
+        import contract_data
+        from campaign_loader import CampaignLoader
+        from indexer import EventIndexer
+        from moderation import BulkModerator, ACTIONS
+
+        workdir = tempfile.mkdtemp(prefix='test_reload_')
+        self.artifact_path = os.path.join(workdir, 'DonationPlatform.json')
+        new_functions = ['getCampaignSummaries'] + [batch for batch, _, _ in ACTIONS.values()]
+        old_abi = [f for f in self.contract.abi if f.get('name') not in new_functions and f.get('name') != 'CampaignEdited']
+        self.write_artifact(old_abi, 1000)
+        registry = contract_data.ContractRegistry(self.w3, self.artifact_path, os.path.join(workdir, 'abi.json'), self.contract.address)
+        lazy = contract_data.LazyContract(registry)
+        loader, moderator, indexer = CampaignLoader(self.w3, lazy), BulkModerator(self.w3, lazy), EventIndexer(self.w3, lazy)
+        self.assertFalse(loader.has_summaries or moderator.has_batch)
+        self.assertNotIn('CampaignEdited', indexer._events().values())
+
+        # Artifact baru (truffle migrate --reset) dimuat registry tanpa restart
+        extra = [{'type': 'function', 'name': name, 'inputs': [], 'outputs': [], 'stateMutability': 'view'} for name in new_functions]
+        self.write_artifact(list(self.contract.abi) + extra, 2000)
+        with mock.patch.object(contract_data, 'ARTIFACT_CHECK_INTERVAL', 0):
+            registry.get()
+        self.assertTrue(loader.has_summaries and moderator.has_batch)
+        self.assertIn('CampaignEdited', indexer._events().values())
+        self.assertEqual(len(loader.output_types), 1)
+
+
+class StaticTraversalTest(ChainTestCase):
+    def test_precompressed_lookup_stays_in_dist(self):
+        # File .gz di luar static/dist tidak boleh ikut tersaji lewat varian terkompresi
+        with tempfile.NamedTemporaryFile(suffix='.gz') as secret:
+            target = os.path.relpath(secret.name[:-len('.gz')], os.path.join(self.app.app.static_folder, 'dist'))
+            with self.app.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+                with self.assertRaises(NotFound):
+                    self.app.app.view_functions['static'](filename='dist/' + target)
+
+
+class TxJobClaimTest(ChainTestCase):
+    def setUp(self):
+        self.other = second_pipeline(self.w3)
+
+    def tearDown(self):
+        self.other._executor.shutdown(wait=True)
+
+    def insert_job(self, tx_hash='0x' + '00' * 32, owner=None, lease_until=None, payload='{}', campaign_id=None):
+        job_id = os.urandom(8).hex()
+        self.conn.execute("INSERT INTO tx_jobs (id, kind, wallet, campaign_id, tx_hash, status, payload, created_at, updated_at, owner, lease_until) "
+                          "VALUES (?, 'donate', ?, ?, ?, 'submitted', ?, '', '', ?, ?)",
+                          (job_id, self.accounts[7], campaign_id, tx_hash, payload, owner, lease_until))
+        self.conn.commit()
+        return job_id
+
+    def wait_for(self, pipeline, job_id, timeout=30):
+        deadline = time.monotonic() + timeout
+        while pipeline.get(job_id)['status'] == 'submitted' and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return pipeline.get(job_id)
+
+    def test_only_one_pipeline_claims_a_job(self):
+        job_id = self.insert_job()
+        self.assertTrue(self.app.tx_pipeline._claim(job_id))
+        self.assertFalse(self.other._claim(job_id))   # Lease masih berlaku -> tidak direbut
+
+    def test_expired_lease_is_reclaimed(self):
+        job_id = self.insert_job(owner='proses-mati', lease_until=time.time() - 1)
+        self.assertTrue(self.other._claim(job_id))
+        self.assertEqual(self.other.get(job_id)['owner'], self.other.owner)
+
+    def test_receipt_timeout_keeps_job_submitted(self):
+        # Transaksi masih dikenal node (pending) -> job tidak digagalkan, dipantau ulang setelah lease habis
+        tx_hash = self.w3.to_hex(self.w3.eth.send_transaction({'from': self.accounts[7], 'to': self.accounts[6], 'value': 1}))
+        job_id = self.insert_job(tx_hash=tx_hash, owner=self.other.owner, lease_until=time.time() + 60)
+        with mock.patch.object(self.w3.eth, 'wait_for_transaction_receipt', side_effect=TimeExhausted('timeout')):
+            self.other._watch(job_id)
+        self.assertEqual(self.other.get(job_id)['status'], 'submitted')
+
+        # Transaksi tidak dikenal node (di-drop) -> gagal permanen
+        job_id = self.insert_job(owner=self.other.owner, lease_until=time.time() + 60)
+        with mock.patch.object(self.w3.eth, 'wait_for_transaction_receipt', side_effect=TimeExhausted('timeout')):
+            self.other._watch(job_id)
+        self.assertEqual(self.other.get(job_id)['status'], 'failed')
+
+    def test_released_nonce_is_reused_without_reissuing_held_ones(self):
+        nonces = self.other.nonces
+        wallet = self.accounts[9]
+        first, second = nonces.allocate(wallet), nonces.allocate(wallet)
+        self.assertEqual(second, first + 1)
+        nonces.release(wallet, first)                     # Worker lain masih memegang `second`
+        self.assertEqual(nonces.allocate(wallet), first)
+        self.assertEqual(nonces.allocate(wallet), second + 1)
+        nonces.release(wallet, second + 1)                # Alokasi terakhir -> next_nonce dikembalikan
+        self.assertEqual(nonces.allocate(wallet), second + 1)
+
+    def test_reprocessed_donation_is_recorded_once(self):
+        keys = {k.public_key.to_checksum_address(): k.to_hex() for k in self.w3.provider.ethereum_tester.backend.account_keys}
+        campaign_id = self.create_campaign(self.accounts[1])
+        payload = {'donor_name': 'donatur test', 'amount': '0.5', 'message': 'Semangat'}
+        job_id = self.app.tx_pipeline.submit('donate', self.accounts[7], keys[self.accounts[7]],
+                                             self.contract.functions.donateToCampaign(campaign_id),
+                                             value=self.w3.to_wei(0.5, 'ether'), payload=payload, campaign_id=campaign_id)
+        job = self.wait_for(self.app.tx_pipeline, job_id)
+        self.assertEqual(job['status'], 'confirmed')
+
+        # Simulasi crash sebelum status tercatat: job kembali 'submitted' dengan lease habis
+        self.conn.execute("UPDATE tx_jobs SET status = 'submitted', lease_until = ? WHERE id = ?", (time.time() - 1, job_id))
+        self.conn.commit()
+        self.other.register_handler('donate', self.app.on_donation_confirmed)
+        self.assertEqual(self.other.resume_pending(force=True), 1)
+        self.assertEqual(self.app.tx_pipeline.resume_pending(force=True), 0)   # Sudah diklaim pipeline lain
+        self.assertEqual(self.wait_for(self.other, job_id)['status'], 'confirmed')
+        self.assertEqual(self.count("SELECT COUNT(*) FROM donations WHERE tx_hash = ?", job['tx_hash']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
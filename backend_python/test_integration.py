@@ -23,7 +23,10 @@ def run_tests():
         old_count = contract.functions.getCampaignCount().call()
         
         tx_hash = contract.functions.createCampaign(
-            "Test Campaign Otomatis", 
+            "Test Campaign Otomatis",
+            "Deskripsi campaign dari integration test",
+            web3.to_wei(5, 'ether'),  # target
+            "",                       # gambar
             60 # durasi 60 menit
         ).transact({'from': CREATOR})
         web3.eth.wait_for_transaction_receipt(tx_hash)
@@ -44,8 +47,8 @@ def run_tests():
         web3.eth.wait_for_transaction_receipt(tx_hash)
         
         camp_data = contract.functions.getCampaign(campaign_id).call()
-        # Status: 0=Pending, 1=Approved
-        assert camp_data[4] == 1 
+        # Struct Campaign: index 8 = status (0=Pending, 1=Approved)
+        assert camp_data[8] == 1 
         print(f"✅ SUKSES: Campaign #{campaign_id} statusnya sekarang APPROVED.")
     except Exception as e:
         print(f"❌ GAGAL: {e}")
@@ -54,7 +57,7 @@ def run_tests():
     # 3. TEST DONASI
     print("\n[TEST 3] Donasi 1 ETH...")
     try:
-        initial_balance = contract.functions.getCampaign(campaign_id).call()[3]
+        initial_balance = contract.functions.getCampaign(campaign_id).call()[5]  # collectedAmount
         donation_amount = web3.to_wei(1, 'ether')
         
         tx_hash = contract.functions.donateToCampaign(campaign_id).transact({
@@ -63,7 +66,7 @@ def run_tests():
         })
         web3.eth.wait_for_transaction_receipt(tx_hash)
         
-        final_balance = contract.functions.getCampaign(campaign_id).call()[3]
+        final_balance = contract.functions.getCampaign(campaign_id).call()[5]
         
         assert final_balance == initial_balance + donation_amount
         print(f"✅ SUKSES: Saldo campaign bertambah 1 ETH.")
@@ -0,0 +1,192 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from web3.exceptions import TimeExhausted, TransactionNotFound
+import db
+
+# --- KONFIGURASI PIPELINE TRANSAKSI ---
+TX_WORKERS = int(os.environ.get('TX_WORKERS', '4'))            # Thread pemantau receipt
+RECEIPT_TIMEOUT = int(os.environ.get('TX_RECEIPT_TIMEOUT', '180'))
+DEFAULT_GAS = 2000000
+# Job diklaim satu proses (worker gunicorn) selama lease; lease yang habis (proses mati) diambil alih
+LEASE_SECONDS = RECEIPT_TIMEOUT + 60
+RESUME_INTERVAL = 30   # Detik antar pengecekan job yang belum punya pemantau
+
+# Status job: submitted -> confirmed / failed
+STATUS_SUBMITTED = 'submitted'
+STATUS_CONFIRMED = 'confirmed'
+STATUS_FAILED = 'failed'
+
+
+class NonceManager:
+    """Alokasi nonce per wallet lewat SQLite, sehingga semua thread & worker gunicorn berbagi urutan yang sama.
+
+    Nonce = max(jumlah transaksi pending di node, nonce berikutnya yang sudah dialokasikan), dalam satu
+    statement upsert (atomik). Transaksi yang baru dikirim worker lain tetapi belum terlihat di node
+    tetap tidak mendapat nonce yang sama. Nonce dari pengiriman yang gagal dilepas satu per satu
+    (`release`) dan dipakai ulang lebih dulu, supaya tidak ada celah yang menahan transaksi sesudahnya.
+    """
+
+    def __init__(self, web3):
+        self.web3 = web3
+
+    def allocate(self, wallet):
+        pending = self.web3.eth.get_transaction_count(wallet, 'pending')
+        conn = db.get_connection()
+        # Celah di bawah jumlah pending sudah terisi di node (mis. kiriman "gagal" yang ternyata sampai)
+        conn.execute("DELETE FROM wallet_nonce_gaps WHERE wallet = ? AND nonce < ?", (wallet, pending))
+        row = conn.execute("""DELETE FROM wallet_nonce_gaps WHERE rowid =
+                                (SELECT rowid FROM wallet_nonce_gaps WHERE wallet = ? ORDER BY nonce LIMIT 1)
+                             RETURNING nonce""", (wallet,)).fetchone()
+        if row is None:
+            row = conn.execute("""INSERT INTO wallet_nonces (wallet, next_nonce) VALUES (?, ?)
+                                  ON CONFLICT (wallet) DO UPDATE SET next_nonce = MAX(next_nonce, excluded.next_nonce - 1) + 1
+                                  RETURNING next_nonce - 1""", (wallet, pending + 1)).fetchone()
+        conn.commit()
+        return row[0]
+
+    def release(self, wallet, nonce):
+        # Pengiriman gagal: hanya nonce ini yang dikembalikan. Nonce milik worker lain yang belum terkirim tetap aman.
+        conn = db.get_connection()
+        rolled_back = conn.execute("UPDATE wallet_nonces SET next_nonce = ? WHERE wallet = ? AND next_nonce = ?",
+                                   (nonce, wallet, nonce + 1)).rowcount
+        if not rolled_back:
+            conn.execute("INSERT OR IGNORE INTO wallet_nonce_gaps (wallet, nonce) VALUES (?, ?)", (wallet, nonce))
+        conn.commit()
+
+
+class TxPipeline:
+    """Kirim transaksi bertanda tangan lalu kembalikan ID pelacakan; receipt dipantau worker pool.
+
+    Efek samping setelah konfirmasi (insert ke SQLite, invalidasi cache) didaftarkan per jenis
+    job lewat `register_handler`, sehingga job yang belum selesai bisa dilanjutkan setelah restart.
+    """
+
+    def __init__(self, web3, gas_price_fn=None, workers=TX_WORKERS):
+        self.web3 = web3
+        self.nonces = NonceManager(web3)
+        self.gas_price_fn = gas_price_fn or (lambda: web3.eth.gas_price)
+        self._chain_id = None
+        self._handlers = {}
+        self._token = uuid.uuid4().hex[:8]
+        self._next_resume = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tx-receipt')
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.web3.eth.chain_id
+        return self._chain_id
+
+    def register_handler(self, kind, on_confirm):
+        # on_confirm(job, receipt): job berisi kolom tx_jobs + payload (dict). Handler harus idempoten
+        # (mis. INSERT OR IGNORE dengan tx_hash unik): job bisa diproses ulang setelah crash / lease habis.
+        self._handlers[kind] = on_confirm
+
+    @property
+    def owner(self):
+        # Per proses: objek dibuat sebelum fork (preload gunicorn), pid membedakan worker
+        return f"{os.getpid()}-{self._token}"
+
+    # --- SUBMIT ---
+    def submit(self, kind, wallet, private_key, contract_fn, value=0, payload=None, campaign_id=None):
+        """Tanda tangani & kirim transaksi, kembalikan ID job tanpa menunggu receipt."""
+        nonce = self.nonces.allocate(wallet)
+        try:
+            tx_params = {'chainId': self.chain_id, 'gas': DEFAULT_GAS, 'gasPrice': self.gas_price_fn(), 'nonce': nonce}
+            if value: tx_params['value'] = value
+            txn = contract_fn.build_transaction(tx_params)
+            signed_txn = self.web3.eth.account.sign_transaction(txn, private_key=private_key)
+            tx_hash = self.web3.to_hex(self.web3.eth.send_raw_transaction(signed_txn.raw_transaction))
+        except Exception:
+            self.nonces.release(wallet, nonce)
+            raise
+
+        job_id = uuid.uuid4().hex
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = db.get_connection()
+        # Job baru langsung diklaim proses pengirim
+        conn.execute('''INSERT INTO tx_jobs (id, kind, wallet, campaign_id, tx_hash, status, payload, created_at, updated_at, owner, lease_until)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                     (job_id, kind, wallet, campaign_id, tx_hash, STATUS_SUBMITTED, json.dumps(payload or {}), now, now,
+                      self.owner, time.time() + LEASE_SECONDS))
+        conn.commit()
+        self._executor.submit(self._watch, job_id)
+        return job_id
+
+    # --- WORKER ---
+    def _claim(self, job_id):
+        # Atomik: hanya satu proses yang berhasil mengubah baris (job belum diklaim, milik sendiri, atau lease habis)
+        conn = db.get_connection()
+        now = time.time()
+        claimed = conn.execute("UPDATE tx_jobs SET owner = ?, lease_until = ? WHERE id = ? AND status = ? "
+                               "AND (owner IS NULL OR owner = ? OR lease_until < ?)",
+                               (self.owner, now + LEASE_SECONDS, job_id, STATUS_SUBMITTED, self.owner, now)).rowcount
+        conn.commit()
+        return claimed == 1
+
+    def _finish(self, job_id, status, error=None):
+        conn = db.get_connection()
+        conn.execute("UPDATE tx_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                     (status, error, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), job_id))
+        conn.commit()
+
+    def _watch(self, job_id):
+        job = self.get(job_id)
+        # Job hanya gagal permanen jika transaksi di-revert atau hilang dari node. Timeout / node mati:
+        # job tetap 'submitted' dan dipantau ulang oleh resume_pending setelah lease habis.
+        try:
+            receipt = self.web3.eth.wait_for_transaction_receipt(job['tx_hash'], timeout=RECEIPT_TIMEOUT)
+        except TimeExhausted:
+            if self._dropped(job['tx_hash']):
+                self._finish(job_id, STATUS_FAILED, "Transaksi tidak lagi dikenal node (di-drop dari mempool)")
+            else:
+                print(f"TxPipeline: {job['tx_hash']} masih pending setelah {RECEIPT_TIMEOUT} detik, dipantau ulang setelah lease habis")
+            return
+        except Exception as e:
+            print(f"TxPipeline: receipt {job['tx_hash']} belum bisa dicek ({e}), dipantau ulang setelah lease habis")
+            return
+        if receipt['status'] != 1:
+            # Nonce transaksi yang di-revert tetap terpakai -> tidak dilepas
+            self._finish(job_id, STATUS_FAILED, "Transaksi di-revert oleh kontrak")
+            return
+        try:
+            handler = self._handlers.get(job['kind'])
+            if handler: handler(job, receipt)
+            self._finish(job_id, STATUS_CONFIRMED)
+        except Exception as e:
+            print(f"TxPipeline handler error ({job['kind']}): {e}")
+            self._finish(job_id, STATUS_FAILED, f"Terkonfirmasi, tapi gagal dicatat: {e}")
+
+    def _dropped(self, tx_hash):
+        try:
+            self.web3.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            return True
+        except Exception:
+            return False   # Node tidak bisa dihubungi -> belum bisa dipastikan
+        return False
+
+    def resume_pending(self, force=False):
+        """Pantau job yang belum selesai dan belum dipantau proses lain (restart, worker mati). Mengembalikan jumlah job yang diklaim."""
+        now = time.monotonic()
+        if not force and now < self._next_resume:
+            return 0
+        self._next_resume = now + RESUME_INTERVAL
+        rows = db.get_connection().execute("SELECT id FROM tx_jobs WHERE status = ? AND (owner IS NULL OR lease_until < ?)",
+                                           (STATUS_SUBMITTED, time.time())).fetchall()
+        claimed = [r['id'] for r in rows if self._claim(r['id'])]
+        for job_id in claimed:
+            self._executor.submit(self._watch, job_id)
+        return len(claimed)
+
+    def get(self, job_id):
+        row = db.get_connection().execute("SELECT * FROM tx_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'] or '{}')
+        return job
@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+import db
+
+UNKNOWN_USER = "Unknown User"
+CACHE_SIZE = 4096
+SQLITE_MAX_PARAMS = 900   # Batas aman jumlah parameter `?` per query SQLite
+
+
+class UsernameResolver:
+    """Resolusi wallet -> username secara batch (1 query untuk banyak alamat) dengan cache LRU."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, wallet, username):
+        self._cache[wallet] = username
+        self._cache.move_to_end(wallet)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def resolve_many(self, wallets):
+        wanted = {w for w in wallets if w}
+        result = {}
+        with self._lock:
+            for w in list(wanted):
+                if w in self._cache:
+                    self._cache.move_to_end(w)
+                    result[w] = self._cache[w]
+                    wanted.discard(w)
+        if wanted:
+            missing = sorted(wanted)
+            found = {}
+            conn = db.get_connection()
+            for start in range(0, len(missing), SQLITE_MAX_PARAMS):
+                chunk = missing[start:start + SQLITE_MAX_PARAMS]
+                rows = conn.execute(f"SELECT wallet_address, username FROM users WHERE wallet_address IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                found.update((r['wallet_address'], r['username']) for r in rows)
+            with self._lock:
+                for w in missing:
+                    # Alamat tanpa akun juga di-cache, di-invalidate saat ada registrasi
+                    username = found.get(w, UNKNOWN_USER)
+                    self._remember(w, username)
+                    result[w] = username
+        return result
+
+    def resolve(self, wallet):
+        return self.resolve_many([wallet]).get(wallet, UNKNOWN_USER)
+
+    def invalidate(self, wallet):
+        # None = kosongkan seluruh cache
+        with self._lock:
+            if wallet is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(wallet, None)
@@ -17,6 +17,19 @@ contract DonationPlatform {
 
     enum CampaignStatus { PENDING, APPROVED, REJECTED, DELETED }
 
+    // Ringkasan kampanye untuk halaman daftar (tanpa description yang panjang)
+    struct CampaignSummary {
+        uint256 id;
+        address creator;
+        string title;
+        uint256 targetAmount;
+        uint256 collectedAmount;
+        string imageHash;
+        uint256 deadline;
+        CampaignStatus status;
+        bool fundsWithdrawn;
+    }
+
     mapping(uint256 => Campaign) public campaigns;
     uint256 public campaignCount = 0;
     address public admin;
@@ -72,6 +85,29 @@ contract DonationPlatform {
         emit DonationReceived(_id, msg.sender, msg.value, block.timestamp);
     }
 
+    // --- DONASI KERANJANG ---
+    // Satu transaksi untuk beberapa kampanye: _amounts[i] untuk _ids[i], jumlahnya harus sama
+    // dengan msg.value. Satu kampanye tidak valid membatalkan seluruh keranjang.
+
+    function donateToCampaigns(uint256[] calldata _ids, uint256[] calldata _amounts) external payable {
+        require(_ids.length > 0, "Basket is empty");
+        require(_ids.length == _amounts.length, "Length mismatch");
+
+        uint256 total = 0;
+        for (uint256 i = 0; i < _ids.length; i++) {
+            require(_ids[i] < campaignCount, "Campaign does not exist");
+            Campaign storage campaign = campaigns[_ids[i]];
+            require(campaign.status == CampaignStatus.APPROVED, "Campaign is not active");
+            require(block.timestamp < campaign.deadline, "Campaign has ended");
+            require(_amounts[i] > 0, "Donation must be greater than 0");
+
+            campaign.collectedAmount += _amounts[i];
+            total += _amounts[i];
+            emit DonationReceived(_ids[i], msg.sender, _amounts[i], block.timestamp);
+        }
+        require(total == msg.value, "Amounts do not match value");
+    }
+
     // --- FITUR BARU UNTUK ADMIN ---
 
     function approveCampaign(uint256 _id) public onlyAdmin {
@@ -90,6 +126,31 @@ contract DonationPlatform {
         emit CampaignStatusChanged(_id, CampaignStatus.DELETED, block.timestamp);
     }
 
+    // --- MODERASI BATCH (Hanya Admin) ---
+    // Satu transaksi untuk banyak id. Id yang tidak ada atau statusnya sudah sama dilewati
+    // (tanpa revert), jadi id yang berhasil = id yang memancarkan CampaignStatusChanged.
+
+    function approveCampaigns(uint256[] calldata _ids) external onlyAdmin {
+        _moderate(_ids, CampaignStatus.APPROVED);
+    }
+
+    function rejectCampaigns(uint256[] calldata _ids) external onlyAdmin {
+        _moderate(_ids, CampaignStatus.REJECTED);
+    }
+
+    function deleteCampaigns(uint256[] calldata _ids) external onlyAdmin {
+        _moderate(_ids, CampaignStatus.DELETED);
+    }
+
+    function _moderate(uint256[] calldata _ids, CampaignStatus _status) internal {
+        for (uint256 i = 0; i < _ids.length; i++) {
+            uint256 id = _ids[i];
+            if (id >= campaignCount || campaigns[id].status == _status) continue;
+            campaigns[id].status = _status;
+            emit CampaignStatusChanged(id, _status, block.timestamp);
+        }
+    }
+
     // Fitur Edit Campaign (Hanya Admin - karena di blockchain data user immutable, admin yg punya kuasa override)
     function editCampaign(
         uint256 _id,
@@ -121,4 +182,51 @@ contract DonationPlatform {
     function getCampaignCount() public view returns (uint256) {
         return campaignCount;
     }
+
+    // Halaman ringkasan kampanye mulai dari _fromId (keyset pagination).
+    // _statusMask: bit ke-n aktif = status n ikut ditampilkan (1 << uint8(status)).
+    // _creator != address(0): kampanye milik _creator ikut ditampilkan walau statusnya tidak ada di mask (kecuali DELETED).
+    // nextId = id pertama yang belum diperiksa (== campaignCount jika sudah habis).
+    function getCampaignSummaries(
+        uint256 _fromId,
+        uint256 _limit,
+        uint8 _statusMask,
+        address _creator
+    ) public view returns (CampaignSummary[] memory page, uint256 nextId) {
+        CampaignSummary[] memory buffer = new CampaignSummary[](_limit);
+        uint256 found = 0;
+        uint256 i = _fromId;
+        while (i < campaignCount && found < _limit) {
+            if (_isListed(campaigns[i], _statusMask, _creator)) {
+                buffer[found] = _summary(campaigns[i]);
+                found++;
+            }
+            i++;
+        }
+
+        page = new CampaignSummary[](found);
+        for (uint256 j = 0; j < found; j++) {
+            page[j] = buffer[j];
+        }
+        nextId = i;
+    }
+
+    function _isListed(Campaign storage c, uint8 _statusMask, address _creator) internal view returns (bool) {
+        if ((_statusMask & (uint8(1) << uint8(c.status))) != 0) return true;
+        return _creator != address(0) && c.creator == _creator && c.status != CampaignStatus.DELETED;
+    }
+
+    function _summary(Campaign storage c) internal view returns (CampaignSummary memory) {
+        return CampaignSummary(
+            c.id,
+            c.creator,
+            c.title,
+            c.targetAmount,
+            c.collectedAmount,
+            c.imageHash,
+            c.deadline,
+            c.status,
+            c.fundsWithdrawn
+        );
+    }
 }
\ No newline at end of file